@@ -1,10 +1,16 @@
+import os
+import time
+from functools import lru_cache
+
 import dash
-from dash import dcc, html, Input, Output, callback
+from dash import dcc, html, Input, Output, State, Patch, ClientsideFunction, callback, clientside_callback, ctx, no_update
 import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+import plotly.graph_objects as go
+from flask import Response, request
+
+from market_core import (DAY_SECONDS, NS_PER_SECOND, SHM_ENV, TICK_INTERVAL, WINDOWS, OhlcPyramid, SharedTickStore,
+                         TickBroadcaster, TickProducer, TickRingBuffer, lttb, to_series)
 
 # -----------------------------------------------------------------------------
 # 典型用途：企业级实时监控看板 (Enterprise Dashboard)
@@ -18,15 +24,82 @@ from datetime import datetime, timedelta
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG])
 server = app.server
 
-# 模拟实时数据生成
-def generate_data():
-    now = datetime.now()
-    times = [now - timedelta(minutes=i) for i in range(60)][::-1]
-    prices = 100 + np.cumsum(np.random.randn(60))
-    volumes = np.random.randint(100, 1000, 60)
-    return pd.DataFrame({'time': times, 'price': prices, 'volume': volumes})
+# 模拟实时行情：24h 环形缓冲区，回调只读取所需窗口
+# - gunicorn（gunicorn.conf.py）：主进程启动唯一的生产进程写入共享内存，各 worker 按名称只读打开
+# - 直接运行 python app.py：本进程内的生产线程每秒写入一个 tick
+# 推送模式：每批新 tick 只编码一次，经 /stream（SSE）广播给所有打开推送的页面
+if os.environ.get(SHM_ENV):
+    feed = SharedTickStore.attach(os.environ[SHM_ENV])
+    producer = None
+    broadcaster = TickBroadcaster(feed)
+    broadcaster.follow()
+else:
+    feed = TickRingBuffer()
+    producer = TickProducer(feed, interval=TICK_INTERVAL)
+    producer.backfill(DAY_SECONDS)
+    broadcaster = TickBroadcaster(feed)
+    producer.listeners.append(broadcaster.publish)
+    producer.start()
+
+# 长窗口 / 缩放：多级 K 线增量聚合，按可见范围与图表宽度选择级别，返回的点数只与像素宽度有关
+pyramid = OhlcPyramid(feed)
+# 折线模式：原始数据不超过 宽度 × 4 时直接降采样，否则改用满足该上限的最细 K 线级别的收盘价
+LINE_SOURCE_PER_PIXEL = 4
+# K 线模式：每根 K 线至少占 4 像素
+CANDLE_PIXELS = 4
+# 聚合级别的图表每隔 5 秒整体刷新一次（新 tick 只影响最后一根 K 线）
+REFRESH_SECONDS = 5
+
+
+@server.route('/stream')
+def stream():
+    """SSE 行情流；每个连接占用一个线程，部署时使用线程型 worker（见 gunicorn.conf.py）"""
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(broadcaster.stream(last_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# 图表布局只构建一次：页面加载时随布局下发，之后每个 tick 只发送新增的数据点
+def build_price_figure():
+    fig = go.Figure(go.Scatter(
+        x=[], y=[],
+        mode='lines', fill='tozeroy',
+        line=dict(color='#00D9FF', width=2),
+        name='Price'
+    ))
+    fig.update_layout(
+        template='plotly_dark',
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(type='date', showgrid=False, rangeslider=dict(visible=False)),
+        yaxis=dict(showgrid=True, gridcolor='#444'),
+        # 数据替换时保留用户的缩放，切换窗口 / 图表类型时更换 uirevision 复位
+        uirevision='1 小时|line'
+    )
+    return fig
+
+
+def build_volume_figure():
+    fig = go.Figure(go.Bar(
+        x=[], y=[],
+        marker_color='#FF6B6B'
+    ))
+    fig.update_layout(
+        template='plotly_dark',
+        margin=dict(l=0, r=0, t=0, b=0),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis=dict(type='date', showticklabels=False),
+        yaxis=dict(showgrid=False),
+        uirevision='1 小时|line'
+    )
+    return fig
+
+
+PRICE_FIGURE = build_price_figure()
+VOLUME_FIGURE = build_volume_figure()
 
-df_initial = generate_data()
 
 # 布局定义
 app.layout = dbc.Container([
@@ -67,8 +140,17 @@ app.layout = dbc.Container([
         # 左侧：K线图/趋势图
         dbc.Col([
             dbc.Card([
-                dbc.CardHeader("价格趋势 (实时刷新)"),
-                dbc.CardBody(dcc.Graph(id="price-chart", style={"height": "400px"}))
+                dbc.CardHeader(dbc.Row([
+                    dbc.Col("价格趋势 (实时刷新)"),
+                    dbc.Col(dbc.RadioItems(
+                        id="chart-type", options=[{"label": "折线", "value": "line"}, {"label": "K线", "value": "candle"}],
+                        value="line", inline=True,
+                    ), width="auto"),
+                    dbc.Col(dbc.RadioItems(
+                        id="window-select", options=list(WINDOWS), value="1 小时", inline=True,
+                    ), width="auto"),
+                ], justify="between")),
+                dbc.CardBody(dcc.Graph(id="price-chart", figure=PRICE_FIGURE, style={"height": "400px"}))
             ], color="secondary", inverse=True)
         ], width=8),
 
@@ -76,7 +158,7 @@ app.layout = dbc.Container([
         dbc.Col([
             dbc.Card([
                 dbc.CardHeader("交易分布"),
-                dbc.CardBody(dcc.Graph(id="volume-chart", style={"height": "200px"}))
+                dbc.CardBody(dcc.Graph(id="volume-chart", figure=VOLUME_FIGURE, style={"height": "200px"}))
             ], color="secondary", inverse=True, className="mb-3"),
             
             dbc.Card([
@@ -84,6 +166,8 @@ app.layout = dbc.Container([
                 dbc.CardBody([
                     html.Label("刷新频率 (ms):"),
                     dcc.Slider(500, 5000, step=500, value=1000, id='interval-slider'),
+                    dbc.Switch(id='push-mode', label="推送模式 (SSE，服务器主动推送，无需轮询)", value=False),
+                    html.Small(id='stream-status', className="text-muted"),
                     html.Hr(),
                     dbc.Button("导出报告", color="info", className="w-100")
                 ])
@@ -92,66 +176,184 @@ app.layout = dbc.Container([
     ]),
 
     # 定时器组件，用于模拟实时数据推送
-    dcc.Interval(id='interval-component', interval=1000, n_intervals=0)
+    dcc.Interval(id='interval-component', interval=1000, n_intervals=0),
+    # 客户端已收到的行情序号与当前视图（窗口、图表类型、级别、缩放范围），用于只发送增量
+    dcc.Store(id='feed-state'),
+    # 价格图的像素宽度，决定返回的点数上限（窗口尺寸变化时更新）
+    dcc.Store(id='chart-width')
 
 ], fluid=True)
 
 # 回调逻辑
+@callback(
+    [Output('interval-component', 'interval'),
+     Output('interval-component', 'disabled')],
+    [Input('interval-slider', 'value'),
+     Input('push-mode', 'value')]
+)
+def update_interval(interval_val, push):
+    # 推送模式下停止轮询，行情由 assets/stream.js 经 SSE 直接追加到图表
+    return interval_val, bool(push)
+
+
+clientside_callback(
+    ClientsideFunction(namespace='stream', function_name='sync'),
+    Output('stream-status', 'children'),
+    [Input('push-mode', 'value'),
+     Input('window-select', 'value'),
+     Input('feed-state', 'data')]
+)
+
+# 图表宽度：切换窗口时测量，浏览器窗口尺寸变化时由 assets/chart.js 写回
+clientside_callback(
+    ClientsideFunction(namespace='chart', function_name='width'),
+    Output('chart-width', 'data'),
+    Input('window-select', 'value')
+)
+
+
+def parse_range(relayout, current):
+    """从 relayoutData 读取 x 轴缩放范围（epoch 毫秒）；双击复位返回 None，其他交互保持当前范围"""
+    if not relayout:
+        return current
+    if relayout.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout:
+        bounds = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    elif 'xaxis.range' in relayout:
+        bounds = relayout['xaxis.range']
+    else:
+        return current
+    # date 轴的范围是 "2024-01-01 12:00:00.123" 形式的字符串
+    return sorted(int(b) if isinstance(b, (int, float))
+                  else int(np.datetime64(str(b).replace(' ', 'T'), 'ms').astype(np.int64)) for b in bounds)
+
+
+def build_traces(chart, level, t0, t1, width):
+    """[t0, t1]（纳秒）内的价格与成交量 trace：原始 tick 或指定级别的 K 线，折线再以 LTTB 压到图表宽度"""
+    if level == 0:
+        ts, close, volume = feed.between(t0, t1)
+        bars = None
+    else:
+        ts, bars = pyramid.levels[level].range(t0, t1)
+        close, volume = bars[3], bars[4]
+    times, volume_values = to_series(ts, volume, 0)
+    if chart == 'candle':
+        open_, high, low, close = (to_series(ts, bars[i], 2)[1] for i in range(4))
+        price_trace = go.Candlestick(
+            x=times, open=open_, high=high, low=low, close=close,
+            increasing_line_color='#00D9FF', decreasing_line_color='#FF6B6B', name='Price'
+        )
+    else:
+        keep = lttb(ts, close, width)
+        line_times, line_values = to_series(ts[keep], close[keep], 2)
+        price_trace = go.Scatter(
+            x=line_times, y=line_values,
+            mode='lines', fill='tozeroy',
+            line=dict(color='#00D9FF', width=2),
+            name='Price'
+        )
+    volume_trace = go.Bar(x=times, y=volume_values, marker_color='#FF6B6B')
+    return price_trace.to_plotly_json(), volume_trace.to_plotly_json()
+
+
+@lru_cache(maxsize=32)
+def live_traces(chart, level, window, width, seq, t1):
+    """
+    实时视图只取决于行情序号：同一时刻观看同一窗口的会话共用一次计算
+    t1 为与 seq 同一快照的最新 tick 时间（feed.snapshot()），不在此处重新读取行情
+    """
+    return build_traces(chart, level, t1 - int(WINDOWS[window] * NS_PER_SECOND), t1, width)
+
+
 @callback(
     [Output('price-chart', 'figure'),
+     Output('price-chart', 'extendData'),
      Output('volume-chart', 'figure'),
+     Output('volume-chart', 'extendData'),
      Output('kpi-price', 'children'),
      Output('kpi-change', 'children'),
      Output('kpi-volume', 'children'),
-     Output('interval-component', 'interval')],
+     Output('feed-state', 'data')],
     [Input('interval-component', 'n_intervals'),
-     Input('interval-slider', 'value')]
+     Input('window-select', 'value'),
+     Input('chart-type', 'value'),
+     Input('price-chart', 'relayoutData'),
+     Input('chart-width', 'data')],
+    State('feed-state', 'data')
 )
-def update_metrics(n, interval_val):
-    # 模拟新数据
-    df = generate_data()
-    current_price = df['price'].iloc[-1]
-    start_price = df['price'].iloc[0]
-    change = (current_price - start_price) / start_price
-    current_vol = df['volume'].iloc[-1]
-
-    # 价格图表 (Plotly Dark Template)
-    fig_price = go.Figure()
-    fig_price.add_trace(go.Scatter(
-        x=df['time'], y=df['price'],
-        mode='lines', fill='tozeroy',
-        line=dict(color='#00D9FF', width=2),
-        name='Price'
-    ))
-    fig_price.update_layout(
-        template='plotly_dark',
-        margin=dict(l=0, r=0, t=0, b=0),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=True, gridcolor='#444')
-    )
+def update_metrics(n, window, chart, relayout, width, state):
+    # 视图 = 窗口 + 图表类型 + 缩放范围，按可见跨度与宽度选择数据级别，三种更新方式：
+    # - extend：实时的原始 tick 且点数不超过宽度，只把上次之后的新 tick 以 extendData 追加
+    # - refresh：实时但使用聚合级别（或原始 tick 需降采样），每 REFRESH_SECONDS 秒整体替换一次
+    # - static：缩放到的历史区间不随 tick 变化，只更新 KPI
+    # 视图变化时以 Patch 替换整条 trace（不重发布局），点数上限与窗口长度无关
+    state = state or {}
+    width = int(width or 800)
+    pyramid.sync()
+    same_base = state.get('window') == window and state.get('chart') == chart
+    view_range = state.get('range') if same_base else None
+    if ctx.triggered_id == 'price-chart':
+        view_range = parse_range(relayout, view_range)
 
-    # 成交量图表
-    fig_vol = go.Figure(go.Bar(
-        x=df['time'], y=df['volume'],
-        marker_color='#FF6B6B'
-    ))
-    fig_vol.update_layout(
-        template='plotly_dark',
-        margin=dict(l=0, r=0, t=0, b=0),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        xaxis=dict(showticklabels=False),
-        yaxis=dict(showgrid=False)
-    )
+    # 序号与窗口终点取自同一快照，之后新写入的 tick 留给下一次更新
+    snapshot_seq, latest_ts = feed.snapshot()
+    if view_range is None:
+        t1 = latest_ts
+        t0 = t1 - int(WINDOWS[window] * NS_PER_SECOND)
+    else:
+        t0, t1 = (int(v) * 1_000_000 for v in view_range)
+    seconds = (t1 - t0) / NS_PER_SECOND
+    if chart == 'candle':
+        level = pyramid.choose(seconds, max(width // CANDLE_PIXELS, 10), raw=False)
+    else:
+        level = pyramid.choose(seconds, width * LINE_SOURCE_PER_PIXEL)
+    if view_range is not None:
+        mode = 'static'
+    elif level == 0 and seconds / TICK_INTERVAL <= width:
+        mode = 'extend'
+    else:
+        mode = 'refresh'
+    same_view = (same_base and state.get('level') == level and state.get('range') == view_range
+                 and state.get('width') == width)
+
+    seq, refreshed = snapshot_seq, time.time()
+    price_fig = volume_fig = price_ext = volume_ext = no_update
+    update = None
+    if same_view and mode == 'extend' and ctx.triggered_id == 'interval-component':
+        update = feed.since(state['seq'])
+    if update is not None:
+        seq, ts, prices, volumes = update
+        refreshed = state['refreshed']
+        if len(ts):
+            times, price_values = to_series(ts, prices, 2)
+            _, volume_values = to_series(ts, volumes, 0)
+            max_points = int(WINDOWS[window] / TICK_INTERVAL)
+            price_ext = (dict(x=[times], y=[price_values]), [0], max_points)
+            volume_ext = (dict(x=[times], y=[volume_values]), [0], max_points)
+    elif same_view and (mode == 'static' or (mode == 'refresh' and refreshed - state['refreshed'] < REFRESH_SECONDS)):
+        seq, refreshed = state['seq'], state['refreshed']
+    else:
+        if view_range is None:
+            price_trace, volume_trace = live_traces(chart, level, window, width, seq, t1)
+        else:
+            price_trace, volume_trace = build_traces(chart, level, t0, t1, width)
+        price_fig, volume_fig = Patch(), Patch()
+        price_fig['data'][0], volume_fig['data'][0] = price_trace, volume_trace
+        if not same_base:
+            price_fig['layout']['uirevision'] = volume_fig['layout']['uirevision'] = f'{window}|{chart}'
 
-    # 格式化 KPI
+    # 格式化 KPI（涨跌幅按真实的 24h 历史计算）
+    _, current_price, current_vol = feed.latest()
+    change = feed.change(DAY_SECONDS) or 0.0
     kpi_p = f"${current_price:.2f}"
     kpi_c = f"{change:+.2%}"
-    kpi_v = f"{current_vol:,}"
+    kpi_v = f"{current_vol:,.0f}"
 
-    return fig_price, fig_vol, kpi_p, kpi_c, kpi_v, interval_val
+    state = {'seq': seq, 'window': window, 'chart': chart, 'level': level, 'range': view_range,
+             'width': width, 'mode': mode, 'refreshed': refreshed, 'refresh': REFRESH_SECONDS,
+             'points': int(WINDOWS[window] / TICK_INTERVAL)}
+    return price_fig, price_ext, volume_fig, volume_ext, kpi_p, kpi_c, kpi_v, state
 
 if __name__ == '__main__':
     app.run_server(debug=True)
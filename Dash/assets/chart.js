@@ -0,0 +1,31 @@
+// 价格图的像素宽度（chart-width）：切换窗口时由回调测量，浏览器窗口尺寸变化后（防抖）主动写回，
+// 服务器据此重新选择 K 线级别与 LTTB 降采样的点数
+(function () {
+    var timer = null;
+    var measured = null;
+
+    function measure() {
+        var el = document.getElementById('price-chart');
+        return el && el.offsetWidth ? el.offsetWidth : 800;
+    }
+
+    window.addEventListener('resize', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            var width = measure();
+            if (width !== measured && window.dash_clientside.set_props) {
+                measured = width;
+                window.dash_clientside.set_props('chart-width', {data: width});
+            }
+        }, 250);
+    });
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        chart: {
+            width: function () {
+                measured = measure();
+                return measured;
+            }
+        }
+    });
+})();
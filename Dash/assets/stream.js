@@ -0,0 +1,123 @@
+// 推送模式：通过 SSE（/stream）接收共享行情，直接追加到图表并更新 KPI，不经过 Dash 回调
+// feed-state 中的 seq 始终表示图表已包含的行情序号：
+// 整窗加载（切换窗口）由服务器回调写入，推送追加后由本脚本写回；
+// 出现缺口（断线、reset 事件）时触发一次 interval-component，由服务器回调按 seq 补发缺失的点
+// 只有视图为 extend（实时的原始 tick）时才追加；refresh（聚合级别）每隔 refresh 秒请求服务器整体刷新一次；
+// static（缩放到的历史区间）只更新 KPI
+(function () {
+    var source = null;
+    var synced = null;
+    var view = null;
+    var refreshedAt = 0;
+    // 补发请求发出的时间：等待服务器写回 feed-state 期间不再追加，以免重复
+    var pendingSince = 0;
+
+    function graph(id) {
+        return document.querySelector('#' + id + ' .js-plotly-plot');
+    }
+
+    function setText(id, text) {
+        var el = document.getElementById(id);
+        if (el) {
+            el.textContent = text;
+        }
+    }
+
+    function setState() {
+        view = Object.assign({}, view, {seq: synced});
+        window.dash_clientside.set_props('feed-state', {data: view});
+    }
+
+    function updateKpi(msg) {
+        var last = msg.price[msg.price.length - 1];
+        setText('kpi-price', '$' + last.toFixed(2));
+        if (msg.change !== null) {
+            setText('kpi-change', (msg.change >= 0 ? '+' : '') + (100 * msg.change).toFixed(2) + '%');
+        }
+        setText('kpi-volume', msg.volume[msg.volume.length - 1].toLocaleString('en-US'));
+    }
+
+    function catchUp() {
+        if (Date.now() - pendingSince < 5000) {
+            return;
+        }
+        pendingSince = Date.now();
+        window.dash_clientside.set_props('interval-component', {n_intervals: Date.now()});
+    }
+
+    function apply(msg) {
+        if (synced === null || Date.now() - pendingSince < 5000) {
+            return;
+        }
+        updateKpi(msg);
+        if (view.mode === 'refresh' && Date.now() - refreshedAt >= 1000 * view.refresh) {
+            catchUp();
+            return;
+        }
+        if (view.mode !== 'extend') {
+            return;
+        }
+        if (msg.start > synced) {
+            catchUp();
+            return;
+        }
+        var skip = synced - msg.start;
+        if (skip >= msg.x.length) {
+            return;
+        }
+        var x = msg.x.slice(skip);
+        var price = graph('price-chart');
+        var volume = graph('volume-chart');
+        if (price) {
+            Plotly.extendTraces(price, {x: [x], y: [msg.price.slice(skip)]}, [0], view.points);
+        }
+        if (volume) {
+            Plotly.extendTraces(volume, {x: [x], y: [msg.volume.slice(skip)]}, [0], view.points);
+        }
+        synced = msg.seq;
+        setState();
+    }
+
+    function open() {
+        source = new EventSource('/stream');
+        source.addEventListener('tick', function (e) {
+            apply(JSON.parse(e.data));
+        });
+        source.addEventListener('reset', catchUp);
+    }
+
+    function close() {
+        if (source) {
+            source.close();
+            source = null;
+        }
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        stream: {
+            sync: function (push, label, state) {
+                var current = state && state.window === label;
+                if (current && (!view || view.refreshed !== state.refreshed)) {
+                    refreshedAt = Date.now();
+                }
+                view = current ? state : null;
+                synced = current ? state.seq : null;
+                pendingSince = 0;
+                if (push && !source) {
+                    open();
+                } else if (!push) {
+                    close();
+                }
+                if (!push) {
+                    return '';
+                }
+                if (!view) {
+                    return '🟢 推送中';
+                }
+                var detail = {extend: view.points + ' 点窗口', refresh: '每 ' + view.refresh + ' 秒刷新 K 线级别',
+                              static: '历史区间，仅更新指标'}[view.mode];
+                return '🟢 推送中（' + detail + '）';
+            }
+        }
+    });
+})();
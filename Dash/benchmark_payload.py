@@ -0,0 +1,163 @@
+"""
+实时看板每个 tick 的响应体积与回调耗时基准测试
+
+通过 Flask 测试客户端向 /_dash-update-component 发送与浏览器相同的回调请求，对比：
+- full：原做法，每个 tick 重新构建两个完整的 go.Figure（含布局与窗口内全部数据点）
+- incremental：当前做法，布局只下发一次；短窗口每个 tick 以 extendData 只发送新增的数据点，
+  长窗口按图表宽度选择 K 线级别并以 LTTB 降采样，每 5 秒整体刷新一次
+  （首次加载 / 切换窗口时发送一次视图，点数不超过图表宽度，单独列出）
+
+生产线程在测试期间停止，每次请求前手动写入一个 tick，两种做法读取相同的数据。
+
+运行（在 Dash 目录下）：
+    python benchmark_payload.py
+    python benchmark_payload.py --windows "1 分钟" "1 小时" --ticks 50 --json payload.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import dash
+import plotly.graph_objects as go
+from dash import dcc, html, Input, Output
+
+import app as dashboard
+from market_core import DAY_SECONDS, WINDOWS
+
+
+def build_full_app() -> dash.Dash:
+    """原做法：每个 tick 返回完整的价格图与成交量图"""
+    legacy = dash.Dash(__name__)
+    legacy.layout = html.Div([
+        dcc.Graph(id="price-chart"), dcc.Graph(id="volume-chart"),
+        html.H2(id="kpi-price"), html.H2(id="kpi-change"), html.H2(id="kpi-volume"),
+        dcc.Interval(id="interval-component"), dcc.RadioItems(id="window-select", options=list(WINDOWS)),
+    ])
+
+    @legacy.callback(
+        [Output("price-chart", "figure"), Output("volume-chart", "figure"),
+         Output("kpi-price", "children"), Output("kpi-change", "children"), Output("kpi-volume", "children")],
+        [Input("interval-component", "n_intervals"), Input("window-select", "value")],
+    )
+    def update_metrics(n, window):
+        ts, prices, volumes = dashboard.feed.window(WINDOWS[window])
+        times = ts.astype("datetime64[ns]")
+        _, current_price, current_vol = dashboard.feed.latest()
+        change = dashboard.feed.change(DAY_SECONDS) or 0.0
+        fig_price = go.Figure(go.Scatter(x=times, y=prices, mode="lines", fill="tozeroy",
+                                         line=dict(color="#00D9FF", width=2), name="Price"))
+        fig_price.update_layout(template="plotly_dark", margin=dict(l=0, r=0, t=0, b=0),
+                                paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+                                xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor="#444"))
+        fig_vol = go.Figure(go.Bar(x=times, y=volumes, marker_color="#FF6B6B"))
+        fig_vol.update_layout(template="plotly_dark", margin=dict(l=0, r=0, t=0, b=0),
+                              paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+                              xaxis=dict(showticklabels=False), yaxis=dict(showgrid=False))
+        return fig_price, fig_vol, f"${current_price:.2f}", f"{change:+.2%}", f"{current_vol:,.0f}"
+
+    return legacy
+
+
+def callback_request(outputs: List[str], n: int, window: str, state: Optional[Dict[str, Any]] = None,
+                     triggered: str = "interval-component.n_intervals", chart: str = "line",
+                     relayout: Optional[Dict[str, Any]] = None, width: int = 800) -> Dict[str, Any]:
+    """构造与浏览器相同的多输出回调请求体（对照应用只有前两个输入）"""
+    inputs = [
+        {"id": "interval-component", "property": "n_intervals", "value": n},
+        {"id": "window-select", "property": "value", "value": window},
+    ]
+    if "feed-state.data" in outputs:
+        inputs += [
+            {"id": "chart-type", "property": "value", "value": chart},
+            {"id": "price-chart", "property": "relayoutData", "value": relayout},
+            {"id": "chart-width", "property": "data", "value": width},
+        ]
+    body = {
+        "output": ".." + "...".join(outputs) + "..",
+        "outputs": [dict(zip(("id", "property"), o.rsplit(".", 1))) for o in outputs],
+        "inputs": inputs,
+        "changedPropIds": [triggered],
+    }
+    if state is not None or "feed-state.data" in outputs:
+        body["state"] = [{"id": "feed-state", "property": "data", "value": state}]
+    return body
+
+
+def post(client, body: Dict[str, Any]):
+    started = time.perf_counter()
+    response = client.post("/_dash-update-component", json=body)
+    seconds = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f"回调失败（HTTP {response.status_code}）：{response.get_data(as_text=True)[:500]}")
+    return response, seconds
+
+
+def summarize(sizes: List[int], seconds: List[float]) -> Dict[str, float]:
+    return {
+        "bytes_per_tick": round(statistics.mean(sizes)),
+        "ms_per_tick": round(1000 * statistics.median(seconds), 2),
+    }
+
+
+def bench_window(window: str, ticks: int) -> Dict[str, Any]:
+    # 与浏览器一样先请求回调依赖（Dash 在首次请求时注册回调）；
+    # 看板先于对照应用完成注册，否则 @callback 注册的全局回调会被对照应用取走
+    client = dashboard.server.test_client()
+    client.get("/_dash-dependencies")
+    full_client = build_full_app().server.test_client()
+    full_client.get("/_dash-dependencies")
+    full_outputs = ["price-chart.figure", "volume-chart.figure", "kpi-price.children",
+                    "kpi-change.children", "kpi-volume.children"]
+    sizes, seconds = [], []
+    for n in range(ticks):
+        dashboard.producer.tick()
+        response, s = post(full_client, callback_request(full_outputs, n, window))
+        sizes.append(len(response.data))
+        seconds.append(s)
+    full = summarize(sizes, seconds)
+
+    outputs = ["price-chart.figure", "price-chart.extendData", "volume-chart.figure", "volume-chart.extendData",
+               "kpi-price.children", "kpi-change.children", "kpi-volume.children", "feed-state.data"]
+    response, s = post(client, callback_request(outputs, 0, window, None, "window-select.value"))
+    initial = {"bytes": len(response.data), "ms": round(1000 * s, 2)}
+    state = response.get_json()["response"]["feed-state"]["data"]
+    sizes, seconds = [], []
+    for n in range(1, ticks + 1):
+        dashboard.producer.tick()
+        response, s = post(client, callback_request(outputs, n, window, state))
+        state = response.get_json()["response"]["feed-state"]["data"]
+        sizes.append(len(response.data))
+        seconds.append(s)
+    incremental = summarize(sizes, seconds)
+    return {"window": window, "points": len(dashboard.feed.window(WINDOWS[window])[0]),
+            "full": full, "incremental": incremental, "initial_load": initial}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="对比完整重建图表与 extendData 增量更新的每 tick 开销")
+    parser.add_argument("--windows", nargs="+", default=["1 分钟", "1 小时", "24 小时"], choices=list(WINDOWS))
+    parser.add_argument("--ticks", type=int, default=20, help="每种做法测量的 tick 数")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    dashboard.producer.stop()
+    results = []
+    for window in args.windows:
+        result = bench_window(window, args.ticks)
+        results.append(result)
+        full, inc = result["full"], result["incremental"]
+        print(f"{window}（{result['points']} 点）：完整重建 {full['bytes_per_tick']:,} 字节 / {full['ms_per_tick']} ms；"
+              f"增量 {inc['bytes_per_tick']:,} 字节 / {inc['ms_per_tick']} ms；"
+              f"首次加载 {result['initial_load']['bytes']:,} 字节 / {result['initial_load']['ms']} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+轮询与服务器推送（SSE）在多个观看者下的服务器 CPU 基准测试
+
+在子进程中启动看板（werkzeug 多线程服务器），主进程模拟 N 个浏览器：
+- poll：每个客户端每 interval 秒发送一次 update_metrics 回调请求（dcc.Interval 的做法，携带上次的 feed-state）
+- push：每个客户端保持一个 /stream 连接，只接收生产线程广播的 tick 事件
+
+统计服务器进程在测量期间的 CPU 占用（读取 /proc/<pid>/stat，仅限 Linux），
+以及每个客户端实际收到的更新次数。客户端运行在另一个进程中，不计入服务器 CPU。
+
+运行（在 Dash 目录下）：
+    python benchmark_stream.py
+    python benchmark_stream.py --clients 1 10 50 100 200 --duration 20 --json stream.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from benchmark_payload import callback_request
+
+
+OUTPUTS = ["price-chart.figure", "price-chart.extendData", "volume-chart.figure", "volume-chart.extendData",
+           "kpi-price.children", "kpi-change.children", "kpi-volume.children", "feed-state.data"]
+WINDOW = "1 小时"
+
+
+def serve(port: int) -> None:
+    from werkzeug.serving import make_server
+
+    import app as dashboard
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, dashboard.server, threaded=True).serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cpu_seconds(pid: int) -> float:
+    """进程（含全部线程）累计的用户态 + 内核态 CPU 秒数"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def poll_client(url: str, interval: float, stop: threading.Event, counts: List[int], i: int) -> None:
+    session = requests.Session()
+    state, n = None, 0
+    next_at = time.monotonic()
+    while not stop.is_set():
+        triggered = "interval-component.n_intervals" if state else "window-select.value"
+        response = session.post(f"{url}/_dash-update-component",
+                                json=callback_request(OUTPUTS, n, WINDOW, state, triggered))
+        state = response.json()["response"]["feed-state"]["data"]
+        counts[i] += 1
+        n += 1
+        next_at += interval
+        stop.wait(max(0.0, next_at - time.monotonic()))
+
+
+def push_client(url: str, stop: threading.Event, counts: List[int], i: int) -> None:
+    with requests.get(f"{url}/stream", stream=True, timeout=30) as response:
+        for line in response.iter_lines():
+            if stop.is_set():
+                break
+            if line == b"event: tick":
+                counts[i] += 1
+
+
+def run(url: str, pid: int, mode: str, n_clients: int, duration: float, interval: float) -> Dict[str, Any]:
+    stop = threading.Event()
+    counts = [0] * n_clients
+    if mode == "poll":
+        threads = [threading.Thread(target=poll_client, args=(url, interval, stop, counts, i), daemon=True)
+                   for i in range(n_clients)]
+    else:
+        threads = [threading.Thread(target=push_client, args=(url, stop, counts, i), daemon=True)
+                   for i in range(n_clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(2.0)  # 连接建立、首次整窗加载不计入
+    start_counts, start_cpu, started = sum(counts), cpu_seconds(pid), time.monotonic()
+    time.sleep(duration)
+    cpu, elapsed = cpu_seconds(pid) - start_cpu, time.monotonic() - started
+    updates = sum(counts) - start_counts
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    return {
+        "mode": mode,
+        "clients": n_clients,
+        "server_cpu_percent": round(100 * cpu / elapsed, 1),
+        "updates_per_client_per_second": round(updates / n_clients / elapsed, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="对比轮询与 SSE 推送在 N 个观看者下的服务器 CPU")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 10, 50, 100])
+    parser.add_argument("--duration", type=float, default=10.0, help="每项测量的秒数")
+    parser.add_argument("--interval", type=float, default=1.0, help="轮询间隔（秒），与 dcc.Interval 默认一致")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.serve:
+        serve(args.serve)
+        return 0
+    if not os.path.exists("/proc/self/stat"):
+        print("❌ 需要 Linux 的 /proc 统计服务器 CPU", file=sys.stderr)
+        return 2
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port)])
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f"{url}/_dash-dependencies", timeout=1)  # 同时完成回调注册
+                break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        results = []
+        for n_clients in args.clients:
+            for mode in ("poll", "push"):
+                result = run(url, server.pid, mode, n_clients, args.duration, args.interval)
+                results.append(result)
+                print(f"{mode:>4} × {n_clients:<4} 服务器 CPU {result['server_cpu_percent']:5.1f}%  "
+                      f"每客户端 {result['updates_per_client_per_second']:.2f} 次更新/秒")
+    finally:
+        server.terminate()
+        server.wait()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
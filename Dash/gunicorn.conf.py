@@ -0,0 +1,33 @@
+"""
+gunicorn 配置：主进程启动时创建唯一的行情源（共享内存 + 独立的生产进程），
+所有 worker 按名称只读打开同一份行情，数据生成只进行一次，与 worker 数和会话数无关
+
+运行（在 Dash 目录下）：
+    gunicorn app:server -c gunicorn.conf.py
+    WEB_CONCURRENCY=8 GUNICORN_THREADS=200 gunicorn app:server -c gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+from market_core import SHM_ENV, SharedFeed
+
+bind = os.environ.get("BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# 推送模式的每个 SSE 连接占用一个线程，使用线程型 worker
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 100))
+# SSE 连接不会自行结束，关闭时最多等待 5 秒（浏览器的 EventSource 会自动重连到新的 worker）
+graceful_timeout = 5
+# 不使用 preload：worker 在 fork 之后导入应用，各自打开共享内存
+
+feed = SharedFeed()
+
+
+def on_starting(server):
+    """在创建任何 worker 之前回填 24h 历史并启动生产进程；worker 从环境变量继承共享内存名称"""
+    os.environ[SHM_ENV] = feed.start()
+    server.log.info("行情生产进程已启动（pid %s，共享内存 %s）", feed.process.pid, os.environ[SHM_ENV])
+
+
+def on_exit(server):
+    feed.stop()
@@ -0,0 +1,559 @@
+"""
+实时行情核心类库
+包含：TickRingBuffer, SharedTickStore, TickProducer, SharedFeed, TickBroadcaster, OhlcLevel, OhlcPyramid,
+      WINDOWS, to_series, lttb
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+NS_PER_SECOND = 1_000_000_000
+# 可选时间窗口（秒）
+WINDOWS: Dict[str, int] = {
+    "1 分钟": 60,
+    "15 分钟": 15 * 60,
+    "1 小时": 60 * 60,
+    "6 小时": 6 * 60 * 60,
+    "24 小时": 24 * 60 * 60,
+}
+DAY_SECONDS = WINDOWS["24 小时"]
+# 行情间隔（秒）
+TICK_INTERVAL = 1.0
+# K 线金字塔的各级周期（秒），均由原始 tick 增量聚合
+OHLC_RESOLUTIONS = (5, 15, 60, 300, 900, 3600)
+# 共享行情所在共享内存段的名称（gunicorn 主进程设置，worker 继承）
+SHM_ENV = "MARKET_SHM_NAME"
+
+
+def to_series(ts: np.ndarray, values: np.ndarray, decimals: int) -> Tuple[list, list]:
+    """时间戳转为毫秒（date 轴按 epoch 毫秒解析，比 ISO 字符串短一半），数值按显示精度取整"""
+    return (ts // 1_000_000).tolist(), np.round(values.astype(np.float64), decimals).tolist()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标（含首尾）
+    中间的点均分为 threshold - 2 个桶，每桶保留与上一保留点、下一桶均值构成三角形面积最大的点，
+    折线的峰谷形状得以保留
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        # 不足以分桶：只保留末点（threshold=1）或首尾两点
+        return np.array([0, n - 1], dtype=np.int64)[2 - max(threshold, 0):]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _tail_bounds(n: int, count: int, capacity: int) -> Tuple[int, int]:
+    """镜像布局中最近 n 个元素的 [start, stop)：以后半段为终点，最新元素之前的 capacity 个位置总是连续"""
+    n = min(n, count, capacity - 1)
+    if count == 0:
+        return 0, 0
+    stop = (count - 1) % capacity + 1 + capacity
+    return stop - n, stop
+
+
+class TickRingBuffer:
+    """
+    定长环形缓冲区：时间戳 int64（纳秒）、价格与成交量 float32
+    采用镜像布局：每个 tick 同时写入 i 与 i + capacity 两个位置，
+    因此最近任意 n 个 tick 总是一段连续内存，窗口读取返回视图而不拷贝、不拼接
+    - append：O(1)，单个写入者（行情生产线程）
+    - count：累计写入的 tick 数（序号），写入者先写数据再递增；读者先取序号快照再切片，不需要加锁
+    - 读取最多 capacity - 1 个 tick，下一次写入将覆盖的最旧位置不会出现在视图中；
+      视图在此后再写入 capacity - 1 个 tick 之前有效，需要长期保存时应拷贝
+    """
+
+    def __init__(self, capacity: int = DAY_SECONDS + 2):
+        self.capacity = capacity
+        self.ts = np.zeros(2 * capacity, dtype=np.int64)
+        self.price = np.zeros(2 * capacity, dtype=np.float32)
+        self.volume = np.zeros(2 * capacity, dtype=np.float32)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity - 1)
+
+    def append(self, ts: int, price: float, volume: float) -> None:
+        i = self.count % self.capacity
+        for j in (i, i + self.capacity):
+            self.ts[j] = ts
+            self.price[j] = price
+            self.volume[j] = volume
+        self.count += 1
+
+    def extend(self, ts, price, volume) -> None:
+        """
+        批量写入（如回填历史）：count 按全部输入递增，序号与逐个 append 相同；
+        超出容量的部分反正会被覆盖，只写入最后 capacity 个
+        """
+        total = len(ts)
+        ts, price, volume = (np.asarray(a)[-self.capacity:] for a in (ts, price, volume))
+        n = len(ts)
+        positions = (self.count + total - n + np.arange(n)) % self.capacity
+        for offset in (0, self.capacity):
+            self.ts[positions + offset] = ts
+            self.price[positions + offset] = price
+            self.volume[positions + offset] = volume
+        self.count += total
+
+    def _bounds(self, n: int, count: Optional[int] = None) -> Tuple[int, int]:
+        """最近 n 个 tick 在镜像数组中的 [start, stop)"""
+        return _tail_bounds(n, self.count if count is None else count, self.capacity)
+
+    def last(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """最近 n 个 tick 的 (时间戳, 价格, 成交量) 视图，按时间升序"""
+        start, stop = self._bounds(n)
+        return self.ts[start:stop], self.price[start:stop], self.volume[start:stop]
+
+    def since(self, seq: int) -> Optional[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        序号 seq 之后新写入的 tick：返回 (当前序号, 时间戳, 价格, 成交量) 视图
+        seq 已被覆盖（落后超过缓冲区容量）时返回 None，调用方应改为整窗读取
+        """
+        count = self.count
+        if seq > count or count - seq > self.capacity - 1:
+            return None
+        start, stop = self._bounds(count - seq, count)
+        return count, self.ts[start:stop], self.price[start:stop], self.volume[start:stop]
+
+    def window(self, seconds: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """最近 seconds 秒内的 tick 视图（以最新 tick 的时间为终点）"""
+        ts, price, volume = self.last(self.capacity)
+        if len(ts) == 0:
+            return ts, price, volume
+        start = int(np.searchsorted(ts, ts[-1] - int(seconds * NS_PER_SECOND), side="left"))
+        return ts[start:], price[start:], volume[start:]
+
+    def between(self, t0: int, t1: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """时间戳在 [t0, t1] 内的 tick 视图（缩放到历史区间时使用）"""
+        ts, price, volume = self.last(self.capacity)
+        lo, hi = np.searchsorted(ts, t0, side="left"), np.searchsorted(ts, t1, side="right")
+        return ts[lo:hi], price[lo:hi], volume[lo:hi]
+
+    def snapshot(self) -> Tuple[int, int]:
+        """(序号, 该序号时最新 tick 的时间戳)：取自同一次序号读取，可作为缓存键与窗口终点"""
+        count = self.count
+        start, stop = self._bounds(1, count)
+        return count, int(self.ts[stop - 1]) if stop > start else 0
+
+    def latest(self) -> Optional[Tuple[int, float, float]]:
+        if self.count == 0:
+            return None
+        ts, price, volume = self.last(1)
+        return int(ts[0]), float(price[0]), float(volume[0])
+
+    def change(self, seconds: float = DAY_SECONDS) -> Optional[float]:
+        """
+        最近 seconds 秒的涨跌幅：最新价相对窗口起点（不晚于 最新时间 - seconds 的最后一个 tick）
+        历史不足时以最早的 tick 为起点
+        """
+        ts, price, _ = self.last(self.capacity)
+        if len(ts) < 2:
+            return None
+        start = int(np.searchsorted(ts, ts[-1] - int(seconds * NS_PER_SECOND), side="right")) - 1
+        base = float(price[max(start, 0)])
+        return (float(price[-1]) - base) / base if base else None
+
+
+class SharedTickStore(TickRingBuffer):
+    """
+    共享内存中的环形缓冲区，布局与 TickRingBuffer 相同，供多个进程读取同一份行情：
+    [头部 int64 × 2：capacity, count][ts int64 × 2C][price float32 × 2C][volume float32 × 2C]
+    - 序号 count 保存在共享内存中，写入者（唯一的生产进程）先写数据再更新 count（对齐的 8 字节写入）；
+      各进程读取时与 TickRingBuffer 相同，先取序号快照再切片，不加锁
+    - 窗口读取直接返回共享内存上的视图，不拷贝
+    create() 由主进程调用并负责 unlink；attach() 在 worker 中按名称打开
+    """
+
+    HEADER = 2
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray(self.HEADER, dtype=np.int64, buffer=shm.buf)
+        self.capacity = int(self._header[0])
+        n = 2 * self.capacity
+        offset = self._header.nbytes
+        self.ts = np.ndarray(n, dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self.ts.nbytes
+        self.price = np.ndarray(n, dtype=np.float32, buffer=shm.buf, offset=offset)
+        offset += self.price.nbytes
+        self.volume = np.ndarray(n, dtype=np.float32, buffer=shm.buf, offset=offset)
+
+    @classmethod
+    def nbytes_for(cls, capacity: int) -> int:
+        return 8 * cls.HEADER + 2 * capacity * (8 + 4 + 4)
+
+    @classmethod
+    def create(cls, capacity: int = DAY_SECONDS + 2, name: Optional[str] = None) -> "SharedTickStore":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.nbytes_for(capacity))
+        if sys.version_info < (3, 13):
+            # 3.13 之前 attach 无法关闭跟踪，只能打开后立即注销；resource_tracker 按名称去重，
+            # 创建者若保留登记，fork 出的 worker 注销时会把它一并删除，因此创建者也不登记，由 close() 负责删除
+            resource_tracker.unregister(shm._name, "shared_memory")
+        header = np.ndarray(cls.HEADER, dtype=np.int64, buffer=shm.buf)
+        header[:] = (capacity, 0)
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedTickStore":
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            # 只读取的进程不应在退出时由 resource_tracker 删除共享内存段
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def count(self) -> int:
+        return int(self._header[1])
+
+    @count.setter
+    def count(self, value: int) -> None:
+        self._header[1] = value
+
+    def close(self) -> None:
+        """释放本进程的映射；创建者另外删除共享内存段（之前返回的视图不能再使用）"""
+        self._header = self.ts = self.price = self.volume = None
+        self.shm.close()
+        if self.owner:
+            if sys.version_info < (3, 13):
+                resource_tracker.register(self.shm._name, "shared_memory")
+            self.shm.unlink()
+
+
+class TickProducer:
+    """
+    模拟行情的生产线程：每 interval 秒生成一个 tick（价格随机游走）写入缓冲区
+    所有回调只读取缓冲区，行情生成与页面刷新频率、会话数量无关；
+    listeners 中的函数在每次写入后以当前序号调用（如 TickBroadcaster.publish）
+    """
+
+    def __init__(self, buffer: TickRingBuffer, interval: float = TICK_INTERVAL, start_price: float = 100.0,
+                 seed: Optional[int] = None):
+        self.buffer = buffer
+        self.interval = interval
+        self.price = start_price
+        self.rng = np.random.default_rng(seed)
+        self.listeners: List[Callable[[int], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _next_price(self, n: int) -> np.ndarray:
+        prices = self.price * np.exp(np.cumsum(self.rng.normal(0.0, 0.0002, n)))
+        self.price = float(prices[-1])
+        return prices
+
+    def _next_volume(self, n: int) -> np.ndarray:
+        return self.rng.integers(100, 1000, n).astype(np.float32)
+
+    def backfill(self, seconds: int) -> None:
+        """一次性生成截至当前的 seconds 秒历史（启动时填充 24h 窗口）"""
+        n = int(seconds / self.interval)
+        if n <= 0:
+            return
+        step = int(self.interval * NS_PER_SECOND)
+        now = time.time_ns()
+        ts = now - step * np.arange(n, 0, -1, dtype=np.int64)
+        self.buffer.extend(ts, self._next_price(n), self._next_volume(n))
+
+    def tick(self) -> None:
+        self.buffer.append(time.time_ns(), self._next_price(1)[0], self._next_volume(1)[0])
+        for listener in self.listeners:
+            listener(self.buffer.count)
+
+    def _run(self) -> None:
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            self.tick()
+            next_at += self.interval
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
+
+    def start(self) -> "TickProducer":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tick-producer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def _produce(name: str, interval: float, start_price: float) -> None:
+    """生产进程：打开共享内存，按间隔写入 tick，直到被主进程终止（没有需要落盘的状态）"""
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    store = SharedTickStore.attach(name)
+    producer = TickProducer(store, interval=interval, start_price=start_price)
+    next_at = time.monotonic()
+    while True:
+        producer.tick()
+        next_at += interval
+        time.sleep(max(0.0, next_at - time.monotonic()))
+
+
+class SharedFeed:
+    """
+    唯一的行情来源：创建共享内存、回填历史，并启动一个独立的生产进程持续写入
+    gunicorn 主进程在启动时创建（见 gunicorn.conf.py），所有 worker 按 SHM_ENV 中的名称 attach，
+    行情生成只发生一次，与 worker 数和会话数无关
+    """
+
+    def __init__(self, interval: float = TICK_INTERVAL, backfill: int = DAY_SECONDS,
+                 capacity: int = DAY_SECONDS + 2):
+        self.interval = interval
+        self.backfill = backfill
+        self.capacity = capacity
+        self.store: Optional[SharedTickStore] = None
+        self.process = None
+
+    def start(self) -> str:
+        """回填完成后才启动生产进程并返回共享内存名称，worker 打开时即有完整的 24h 历史"""
+        self.store = SharedTickStore.create(self.capacity)
+        warmup = TickProducer(self.store, interval=self.interval)
+        warmup.backfill(self.backfill)
+        # 独立的解释器进程（而非 multiprocessing 子进程），fork 出的 worker 不会继承对它的管理
+        self.process = subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), self.store.name, str(self.interval), repr(warmup.price),
+        ])
+        return self.store.name
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            self.process = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+
+class TickBroadcaster:
+    """
+    服务器推送（SSE）：每批新 tick 只编码一次，所有连接共用同一条消息，
+    每增加一个观看者只增加一次套接字写入，不再有轮询回调
+    - publish()：由生产线程在写入后调用（或由 follow() 轮询共享序号），把上次发布之后的 tick 编码为一条 tick 事件
+    - stream(last_id)：每个连接一个生成器，等待新消息后原样写出，空闲时定期发送心跳注释；
+      断线重连时按 Last-Event-ID 补发最近的消息，落后过多时发送 reset 事件，由客户端整窗重新加载；
+      Last-Event-ID 大于当前序号（服务器重启后回填，序号从头计）时同样发送 reset，并从当前序号继续
+    消息中的 start / seq 为这批 tick 的序号范围 [start, seq)，客户端据此去掉已通过其他途径收到的点
+    """
+
+    def __init__(self, buffer: TickRingBuffer, history: int = 120, heartbeat: float = 15.0):
+        self.buffer = buffer
+        self.heartbeat = heartbeat
+        self.clients = 0
+        self._seq = buffer.count
+        # 最近的消息 (start, seq, 编码后的事件)
+        self._messages: deque = deque(maxlen=history)
+        self._cond = threading.Condition()
+
+    def encode(self, start: int, seq: int, ts: np.ndarray, price: np.ndarray, volume: np.ndarray) -> bytes:
+        x, prices = to_series(ts, price, 2)
+        _, volumes = to_series(ts, volume, 0)
+        payload = {"start": start, "seq": seq, "x": x, "price": prices, "volume": volumes,
+                   "change": self.buffer.change(DAY_SECONDS)}
+        data = json.dumps(payload, separators=(",", ":"))
+        return f"id: {seq}\nevent: tick\ndata: {data}\n\n".encode()
+
+    def publish(self, seq: Optional[int] = None) -> None:
+        update = self.buffer.since(self._seq)
+        if update is None:
+            # 发布者落后超过缓冲区容量（不应发生），从最新一个 tick 重新开始
+            update = self.buffer.since(self.buffer.count - 1)
+        count, ts, price, volume = update
+        if len(ts) == 0:
+            return
+        message = self.encode(count - len(ts), count, ts, price, volume)
+        with self._cond:
+            self._messages.append((count - len(ts), count, message))
+            self._seq = count
+            self._cond.notify_all()
+
+    def follow(self, poll: float = 0.05) -> threading.Thread:
+        """
+        生产者在其他进程中时（SharedTickStore），后台线程轮询共享序号，有新 tick 时发布
+        每次只读取一个整数，开销与观看者数无关
+        """
+        def run():
+            while True:
+                if self.buffer.count != self._seq:
+                    self.publish()
+                time.sleep(poll)
+
+        thread = threading.Thread(target=run, name="tick-follower", daemon=True)
+        thread.start()
+        return thread
+
+    def stream(self, last_id: Optional[int] = None) -> Iterator[bytes]:
+        with self._cond:
+            self.clients += 1
+            ahead = last_id is not None and last_id > self._seq
+            sent = self._seq if last_id is None or ahead else last_id
+        try:
+            yield b"retry: 3000\n\n"
+            if ahead:
+                yield f"id: {sent}\nevent: reset\ndata: {{}}\n\n".encode()
+            while True:
+                with self._cond:
+                    if not self._messages or self._messages[-1][1] <= sent:
+                        self._cond.wait(self.heartbeat)
+                    pending = [m for m in self._messages if m[1] > sent]
+                if not pending:
+                    yield b": ping\n\n"
+                    continue
+                if pending[0][0] > sent:
+                    yield f"id: {pending[-1][1]}\nevent: reset\ndata: {{}}\n\n".encode()
+                    pending = pending[-1:]
+                for _, _, message in pending:
+                    yield message
+                sent = pending[-1][1]
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+
+class OhlcLevel:
+    """
+    一级 K 线：按 resolution 秒对齐的 OHLC 与成交量，镜像布局的定长环形数组（与 TickRingBuffer 相同）
+    extend() 增量聚合一批 tick：落在最后一根 K 线周期内的 tick 就地更新该 K 线，其余追加为新 K 线
+    """
+
+    FIELDS = ("open", "high", "low", "close", "volume")
+
+    def __init__(self, resolution: float, capacity: int):
+        self.resolution = resolution
+        self.step = int(resolution * NS_PER_SECOND)
+        self.capacity = capacity
+        self.ts = np.zeros(2 * capacity, dtype=np.int64)
+        self.values = np.zeros((len(self.FIELDS), 2 * capacity), dtype=np.float32)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity - 1)
+
+    def _write(self, positions: np.ndarray, ts: np.ndarray, values: np.ndarray) -> None:
+        for offset in (0, self.capacity):
+            self.ts[positions + offset] = ts
+            self.values[:, positions + offset] = values
+
+    def extend(self, ts: np.ndarray, price: np.ndarray, volume: np.ndarray) -> None:
+        if len(ts) == 0:
+            return
+        buckets = ts // self.step * self.step
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        bars = np.vstack([
+            price[starts],
+            np.maximum.reduceat(price, starts),
+            np.minimum.reduceat(price, starts),
+            price[ends],
+            np.add.reduceat(volume.astype(np.float64), starts),
+        ]).astype(np.float32)
+        bar_ts = buckets[starts]
+        if self.count and bar_ts[0] == self.ts[_tail_bounds(1, self.count, self.capacity)[0]]:
+            # 与最后一根 K 线同一周期：合并后就地写回
+            last = _tail_bounds(1, self.count, self.capacity)[0] % self.capacity
+            current = self.values[:, last]
+            merged = np.array([current[0], max(current[1], bars[1, 0]), min(current[2], bars[2, 0]),
+                               bars[3, 0], current[4] + bars[4, 0]], dtype=np.float32)
+            self._write(np.array([last]), bar_ts[:1], merged[:, None])
+            bar_ts, bars = bar_ts[1:], bars[:, 1:]
+        bar_ts, bars = bar_ts[-(self.capacity - 1):], bars[:, -(self.capacity - 1):]
+        positions = (self.count + np.arange(len(bar_ts))) % self.capacity
+        self._write(positions, bar_ts, bars)
+        self.count += len(bar_ts)
+
+    def range(self, t0: int, t1: int) -> Tuple[np.ndarray, np.ndarray]:
+        """起始时间在 [t0, t1] 内的 K 线：(时间戳, (5, n) 的 OHLCV) 视图"""
+        start, stop = _tail_bounds(self.capacity, self.count, self.capacity)
+        ts = self.ts[start:stop]
+        lo = int(np.searchsorted(ts, t0 - self.step + 1, side="left"))
+        hi = int(np.searchsorted(ts, t1, side="right"))
+        return ts[lo:hi], self.values[:, start + lo:start + hi]
+
+
+class OhlcPyramid:
+    """
+    多级 K 线金字塔：在 tick 缓冲区之上按 OHLC_RESOLUTIONS 各级增量聚合，
+    按可见时间跨度与图表宽度选择级别，任何缩放范围下返回的点数都有上限
+    - sync()：读取上次之后的新 tick 并更新各级（落后超过缓冲区时从缓冲区全量重建）；线程安全
+    - choose()：满足点数上限的最细级别，0 表示直接使用原始 tick
+    每个进程各自维护（共享内存模式下由共享 tick 计算），开销与会话数无关
+    """
+
+    def __init__(self, buffer: TickRingBuffer, resolutions: Sequence[float] = OHLC_RESOLUTIONS,
+                 tick_interval: float = TICK_INTERVAL):
+        self.buffer = buffer
+        self.tick_interval = tick_interval
+        self.levels: Dict[float, OhlcLevel] = {
+            r: OhlcLevel(r, int(DAY_SECONDS / r) + 2) for r in sorted(resolutions)
+        }
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def sync(self) -> None:
+        with self._lock:
+            update = self.buffer.since(self._seq)
+            if update is None:
+                for resolution, level in self.levels.items():
+                    self.levels[resolution] = OhlcLevel(resolution, level.capacity)
+                # 只取一次序号快照并按它切片，避免两次读取之间新写入的 tick 在下次 since() 时被重复聚合
+                count = self.buffer.count
+                start, stop = self.buffer._bounds(self.buffer.capacity, count)
+                ts, price, volume = (self.buffer.ts[start:stop], self.buffer.price[start:stop],
+                                     self.buffer.volume[start:stop])
+            else:
+                count, ts, price, volume = update
+            for level in self.levels.values():
+                level.extend(ts, price, volume)
+            self._seq = count
+
+    def choose(self, seconds: float, max_points: int, raw: bool = True) -> float:
+        if raw and seconds / self.tick_interval <= max_points:
+            return 0
+        for resolution in self.levels:
+            if seconds / resolution <= max_points:
+                return resolution
+        return max(self.levels)
+
+
+if __name__ == "__main__":
+    # SharedFeed 启动的生产进程：python market_core.py <共享内存名称> <间隔秒数> <起始价格>
+    _produce(sys.argv[1], float(sys.argv[2]), float(sys.argv[3]))
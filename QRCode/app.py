@@ -10,10 +10,14 @@
 import streamlit as st
 import io
 import os
+import tempfile
 from typing import Optional, List, Dict, Any
 import json
 
-from qrcode_core import QRCodeConfig, QRCodeStyle, QRCodeGenerator, VCardBuilder
+from qrcode_core import (
+    QRCodeConfig, QRCodeStyle, CapacityPlanner, QRCapacityError, QRRenderCache,
+    RenderProfiler, QRCodeGenerator, VCardBuilder
+)
 
 
 # 设置页面配置
@@ -26,6 +30,23 @@ st.markdown("生成个性化二维码，支持自定义颜色、样式、中心
 st.info("👤 **作者主页**: [点击访问 NEGIAO 主页](https://negiao-pages.share.connect.posit.cloud/) | 💬 欢迎联系交流与反馈")
 
 
+@st.cache_resource
+def get_render_cache() -> QRRenderCache:
+    """进程级渲染缓存：所有会话共享，页面重跑与重复下载不再重新渲染"""
+    return QRRenderCache(
+        max_bytes=128 * 1024 * 1024,
+        disk_dir=os.environ.get("QRCODE_CACHE_DIR") or None,
+    )
+
+
+render_cache = get_render_cache()
+
+# 批量模式下网格预览的最大数量
+BATCH_PREVIEW_LIMIT = 12
+# 批量压缩包在内存中保留的上限，超出后转存为匿名临时文件（关闭或会话回收时由系统删除，不在磁盘上遗留）
+BATCH_ZIP_MEMORY_BYTES = 64 * 1024 * 1024
+
+
 # ========== UI 配置部分 ==========
 # 侧边栏配置
 st.sidebar.header("⚙️ 二维码配置")
@@ -76,6 +97,13 @@ else:
     config.content = content
     config.batch_mode = False
 
+if content_type in ("文本", "联系方式/名片"):
+    config.compact_url = st.sidebar.checkbox(
+        "紧凑网址（压缩编码）",
+        value=False,
+        help="将数据压缩后放入网址片段，中文或名片内容可显著降低二维码版本；需较新的手机浏览器解码"
+    )
+
 # 2. 预设样式选择
 st.sidebar.subheader("🎨 样式配置")
 style_choice = st.sidebar.selectbox(
@@ -176,6 +204,27 @@ if config.top_text or config.bottom_text:
     if not config.font_file:
         st.sidebar.caption("💡 未上传字体将尝试使用系统默认字体")
 
+# 6. 性能分析
+st.sidebar.subheader("⏱️ 性能分析 (可选)")
+profile_enabled = st.sidebar.checkbox("显示渲染耗时分析", value=False, help="记录各阶段耗时；开启时跳过渲染缓存")
+
+
+def show_stage_table(profiler: RenderProfiler) -> None:
+    """以表格展示各阶段耗时汇总（输出尺寸取最近一次渲染）"""
+    last_sizes = profiler.records[-1]["sizes"]
+    rows = [
+        {
+            "阶段": name,
+            "次数": stats["count"],
+            "平均 (ms)": round(stats["mean_ms"], 2),
+            "P95 (ms)": round(stats["p95_ms"], 2),
+            "合计 (ms)": round(stats["total_ms"], 2),
+            "输出尺寸": " x ".join(map(str, last_sizes.get(name, []))),
+        }
+        for name, stats in profiler.summary().items()
+    ]
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
 
 # ========== 主界面渲染 ==========
 if config.content:
@@ -203,63 +252,88 @@ if config.content:
                 if config.top_text or config.bottom_text:
                     st.write(f"- **文字说明**: 顶部: {config.top_text or '无'} | 底部: {config.bottom_text or '无'}")
             
-            # 生成所有二维码
-            qr_images = []
-            for idx, url in enumerate(urls, 1):
-                try:
-                    # 为每个URL创建单独的配置
-                    url_config = QRCodeConfig(
-                        content=url,
-                        content_type="网址",
-                        style_preset=config.style_preset,
-                        fill_color=config.fill_color,
-                        back_color=config.back_color,
-                        box_size=config.box_size,
-                        border=config.border,
-                        dpi=config.dpi,
-                        error_correction=config.error_correction,
-                        logo_option=config.logo_option,
-                        logo_size=config.logo_size,
-                        logo_file=config.logo_file,
-                        top_text=config.top_text,
-                        bottom_text=config.bottom_text,
-                        font_size=config.font_size,
-                        text_color=config.text_color,
-                        font_file=config.font_file
-                    )
-                    url_generator = QRCodeGenerator(url_config)
-                    qr_img = url_generator.generate(use_default_logo=use_default_logo)
-                    qr_url = url_generator.generate_qr_content()  # 获取二维码实际URL
-                    qr_images.append((url, qr_img, qr_url))
-                except Exception as e:
-                    st.error(f"❌ 第 {idx} 个网址生成失败: {url}\n错误: {str(e)}")
+            # 相同网址列表与配置只生成一次，下载按钮触发的重跑直接复用压缩包
+            batch_key = QRRenderCache.make_key(config, "\n".join(urls), use_default_logo) + str(profile_enabled)
+            batch = st.session_state.get("batch_zip")
+            if batch is None or batch["key"] != batch_key:
+                if batch is not None:
+                    batch["file"].close()
+
+                previews = {}
+                errors = {}
+                progress_state = {"done": 0}
+                progress = st.progress(0.0, text="正在生成二维码...")
+
+                def on_result(idx, result):
+                    if isinstance(result, Exception):
+                        errors[idx] = str(result)
+                    elif idx < BATCH_PREVIEW_LIMIT:
+                        previews[idx] = result
+                    progress_state["done"] += 1
+                    progress.progress(progress_state["done"] / len(urls),
+                                      text=f"正在生成二维码... {progress_state['done']}/{len(urls)}")
+
+                # 多进程并行生成，PNG 逐个写入压缩包，不在内存中保留全部图像
+                generator.profiler = RenderProfiler() if profile_enabled else None
+                zip_file = tempfile.SpooledTemporaryFile(max_size=BATCH_ZIP_MEMORY_BYTES)
+                summary = generator.write_zip(
+                    urls, zip_file, use_default_logo=use_default_logo, on_result=on_result
+                )
+                progress.empty()
+
+                batch = {
+                    "key": batch_key,
+                    "file": zip_file,
+                    "summary": summary,
+                    "previews": previews,
+                    "errors": errors,
+                    "profiler": generator.profiler,
+                }
+                st.session_state["batch_zip"] = batch
+
+            for idx, error in sorted(batch["errors"].items()):
+                st.error(f"❌ 第 {idx + 1} 个网址生成失败: {urls[idx]}\n错误: {error}")
+
+            # 一键下载全部（含 manifest.csv 清单）
+            batch["file"].seek(0)
+            st.download_button(
+                label=f"📦 下载全部二维码 (ZIP, {batch['summary']['succeeded']} 个)",
+                data=batch["file"].read(),
+                file_name="qrcodes.zip",
+                mime="application/zip",
+                type="primary"
+            )
             
-            # 网格展示
+            # 网格预览（仅展示前若干个）
+            if len(urls) > BATCH_PREVIEW_LIMIT:
+                st.caption(f"仅预览前 {BATCH_PREVIEW_LIMIT} 个二维码，完整结果请下载压缩包")
+            preview_items = sorted(batch["previews"].items())
             cols_per_row = 3
-            for i in range(0, len(qr_images), cols_per_row):
+            for i in range(0, len(preview_items), cols_per_row):
                 cols = st.columns(cols_per_row)
-                for j, (url, qr_img, qr_url) in enumerate(qr_images[i:i+cols_per_row]):
+                for j, (idx, png) in enumerate(preview_items[i:i+cols_per_row]):
+                    url = urls[idx]
                     with cols[j]:
-                        st.image(qr_img, use_container_width=True)
-                        st.caption(f"🔗 原始网址: {url[:40]}{'...' if len(url) > 40 else ''}")
-                        
-                        # 下载按钮
-                        buf = io.BytesIO()
-                        qr_img.save(buf, format='PNG', dpi=(config.dpi, config.dpi))
-                        st.download_button(
-                            label="📥 下载",
-                            data=buf.getvalue(),
-                            file_name=f"qrcode_{i+j+1}.png",
-                            mime="image/png",
-                            key=f"download_{i+j}"
-                        )
+                        st.image(png, use_container_width=True)
+                        st.caption(f"🔗 {QRCodeGenerator.zip_member_name(idx)}: {url[:40]}{'...' if len(url) > 40 else ''}")
                         
-                        # 显示二维码中的URL
+                        # 显示二维码中的URL（批量网址直接作为二维码内容）
                         with st.expander("🔍 查看二维码URL"):
-                            st.code(qr_url, language="text")
+                            st.code(url, language="text")
                             st.caption("扫描二维码后访问此URL")
             
-            st.success(f"✅ 成功生成 {len(qr_images)} 个二维码")
+            st.success(f"✅ 成功生成 {batch['summary']['succeeded']} 个二维码")
+
+            # 批量耗时分析
+            if batch["profiler"] is not None and batch["profiler"].records:
+                st.subheader("⏱️ 渲染耗时分析")
+                show_stage_table(batch["profiler"])
+                st.download_button(
+                    label="📊 导出耗时直方图 (JSON)",
+                    data=batch["profiler"].to_json(),
+                    file_name="render_profile.json",
+                    mime="application/json"
+                )
         else:
             st.warning("请输入至少一个网址")
     
@@ -295,31 +369,53 @@ if config.content:
             st.code(qr_url, language="text")
             if config.content_type == "网址":
                 st.caption("💡 网址类型：直接使用您输入的网址")
+            elif "#z=" in qr_url:
+                st.caption("💡 已将数据压缩编码到网址片段中，扫描后由部署的网页在本地解压解析")
             else:
                 st.caption("💡 已将数据编码到URL参数中，扫描后访问部署的网页自动解析")
+
+            # 容量规划：渲染前即可确定版本或给出超限提示
+            plan = CapacityPlanner.plan(qr_url, config.error_correction)
+            if plan.fits:
+                modules = plan.version * 4 + 17
+                st.caption(
+                    f"📏 二维码版本 {plan.version}（{modules}×{modules} 模块），"
+                    f"已用容量 {plan.needed_bits / plan.capacity_bits:.0%}"
+                )
         
         with col2:
             st.subheader("🖼️ 二维码预览")
             
-            try:
-                # 生成二维码
-                qr_img = generator.generate(use_default_logo=use_default_logo)
+            if not plan.fits:
+                st.error(str(QRCapacityError(plan)))
+            else:
+                try:
+                    # 生成二维码（相同配置直接命中缓存）
+                    if profile_enabled:
+                        with generator.profile() as profiler:
+                            byte_img = generator.render_png(use_default_logo=use_default_logo)
+                    else:
+                        byte_img = generator.render_png(use_default_logo=use_default_logo, cache=render_cache)
                 
-                # 显示二维码
-                st.image(qr_img, use_container_width=True)
+                    # 显示二维码
+                    st.image(byte_img, use_container_width=True)
                 
-                # 下载按钮
-                byte_img = generator.save_to_buffer(qr_img)
-                st.download_button(
-                    label=f"📥 下载二维码 ({config.dpi} DPI)",
-                    data=byte_img,
-                    file_name=f"qrcode_{config.dpi}dpi.png",
-                    mime="image/png",
-                    type="primary"
-                )
+                    # 下载按钮
+                    st.download_button(
+                        label=f"📥 下载二维码 ({config.dpi} DPI)",
+                        data=byte_img,
+                        file_name=f"qrcode_{config.dpi}dpi.png",
+                        mime="image/png",
+                        type="primary"
+                    )
+
+                    # 分阶段耗时
+                    if profile_enabled:
+                        st.subheader("⏱️ 渲染耗时分析")
+                        show_stage_table(profiler)
             
-            except Exception as e:
-                st.error(f"生成失败: {str(e)}")
+                except Exception as e:
+                    st.error(f"生成失败: {str(e)}")
 else:
     st.info("👈 请在左侧输入内容以生成二维码")
     
@@ -343,7 +439,7 @@ else:
                 error_correction="中 (M - 15%)"
             )
             example_gen = QRCodeGenerator(example_config)
-            example_qr = example_gen.generate()
+            example_qr = example_gen.render_png(cache=render_cache)
             st.image(example_qr, width=180)
     
     # 第二行
@@ -364,9 +460,16 @@ else:
                 error_correction="中 (M - 15%)"
             )
             example_gen = QRCodeGenerator(example_config)
-            example_qr = example_gen.generate()
+            example_qr = example_gen.render_png(cache=render_cache)
             st.image(example_qr, width=180)
 
+# 缓存统计
+cache_stats = render_cache.stats()
+st.sidebar.caption(
+    f"⚡ 渲染缓存: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']} "
+    f"({cache_stats['entries']} 项, {cache_stats['bytes'] / 1024:.0f} KB)"
+)
+
 # 页脚说明
 st.markdown("---")
 st.markdown("""
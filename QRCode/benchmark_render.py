@@ -0,0 +1,179 @@
+"""
+二维码渲染性能基准测试（pytest-benchmark）
+
+覆盖 QRCodeGenerator.generate / _add_logo / _add_text / save_to_buffer 以及批量生成，
+参数维度：内容长度（直至版本 40）、容错级别、像素块大小、码点样式、批量数量。
+
+运行方式（在 QRCode 目录下）：
+    pip install -r requirements-dev.txt
+    pytest benchmark_render.py --benchmark-json=benchmark_results.json
+    pytest benchmark_render.py --benchmark-autosave          # 保存到 .benchmarks/ 便于跨提交对比
+    pytest-benchmark compare 0001 0002 --group-by=group      # 对比两次保存的结果
+
+每项结果的 extra_info 中记录：
+- tracemalloc_peak_kb：单次调用中 Python/NumPy 分配的峰值内存
+- max_rss_kb：进程迄今为止的峰值常驻内存（建议按分组单独运行以便比较）
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import pytest
+import qrcode
+
+pytest.importorskip("pytest_benchmark")
+
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块，不记录峰值常驻内存
+    resource = None
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from qrcode_core import QRCodeConfig, QRCodeStyle, QRCodeGenerator
+
+
+ERROR_LEVELS = list(QRCodeStyle.ERROR_CORRECTION_MAP.keys())
+MODULE_DRAWERS = list(QRCodeStyle.MODULE_DRAWERS.keys())
+
+
+@pytest.fixture(autouse=True)
+def app_dir(monkeypatch):
+    """默认图标与本地字体按应用目录的相对路径查找"""
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+
+def max_payload_bytes(error_correction: str) -> int:
+    """版本 40 在字节模式下可容纳的最大字节数"""
+    level = QRCodeStyle.ERROR_CORRECTION_MAP[error_correction]
+    # 4 位模式指示 + 16 位长度字段
+    return (qrcode.util.BIT_LIMIT_TABLE[level][40] - 20) // 8
+
+
+def make_payload(length: int) -> str:
+    """生成指定字节长度的网址样式内容（小写字母走字节模式）"""
+    prefix = "https://example.com/?q="
+    return (prefix + "x" * length)[:length]
+
+
+def max_rss_kb():
+    """进程峰值常驻内存（KB，Linux）"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def record_memory(benchmark, func, *args, **kwargs):
+    """额外执行一次调用，记录内存峰值"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["tracemalloc_peak_kb"] = round(peak / 1024, 1)
+    benchmark.extra_info["max_rss_kb"] = max_rss_kb()
+
+
+@pytest.mark.benchmark(group="generate-content")
+@pytest.mark.parametrize("error_correction", ERROR_LEVELS)
+@pytest.mark.parametrize("length", [20, 200, 1000, "max"])
+def test_generate_by_content(benchmark, length, error_correction):
+    """内容长度 × 容错级别（length=max 对应版本 40）"""
+    if length == "max":
+        length = max_payload_bytes(error_correction)
+    elif length > max_payload_bytes(error_correction):
+        pytest.skip("超出该容错级别的容量")
+
+    data = make_payload(length)
+    generator = QRCodeGenerator(QRCodeConfig(box_size=10, error_correction=error_correction))
+
+    img = benchmark(generator.generate, data=data)
+    benchmark.extra_info["image_size"] = img.size
+    record_memory(benchmark, generator.generate, data=data)
+
+
+@pytest.mark.benchmark(group="generate-style")
+@pytest.mark.parametrize("module_drawer", MODULE_DRAWERS)
+@pytest.mark.parametrize("box_size", [10, 20, 30])
+def test_generate_by_style(benchmark, box_size, module_drawer):
+    """像素块大小 × 码点样式"""
+    data = make_payload(200)
+    generator = QRCodeGenerator(QRCodeConfig(box_size=box_size, module_drawer=module_drawer))
+
+    img = benchmark(generator.generate, data=data)
+    benchmark.extra_info["image_size"] = img.size
+    record_memory(benchmark, generator.generate, data=data)
+
+
+@pytest.mark.benchmark(group="generate-color")
+@pytest.mark.parametrize("module_drawer", ["方块 (默认)", "间隙方块 (Gapped)", "圆点 (Circle)"])
+def test_generate_colored(benchmark, module_drawer):
+    """彩色预设（非黑白配色需要颜色蒙版）"""
+    fill, back = QRCodeStyle.get_colors("商务蓝")
+    data = make_payload(50)
+    generator = QRCodeGenerator(QRCodeConfig(
+        box_size=10, module_drawer=module_drawer, fill_color=fill, back_color=back
+    ))
+
+    benchmark(generator.generate, data=data)
+    record_memory(benchmark, generator.generate, data=data)
+
+
+@pytest.mark.benchmark(group="add-logo")
+@pytest.mark.parametrize("box_size", [10, 20, 30])
+def test_add_logo(benchmark, box_size):
+    """中心图标合成（默认图标）"""
+    config = QRCodeConfig(box_size=box_size, logo_option="使用默认图标")
+    generator = QRCodeGenerator(config)
+    base = QRCodeGenerator(QRCodeConfig(box_size=box_size)).generate(data=make_payload(200))
+
+    benchmark(lambda: generator._add_logo(base.copy(), True))
+    record_memory(benchmark, generator._add_logo, base.copy(), True)
+
+
+@pytest.mark.benchmark(group="add-text")
+@pytest.mark.parametrize("text", ["Scan me", "扫描二维码 关注公众号"])
+@pytest.mark.parametrize("is_bold", [False, True])
+def test_add_text(benchmark, text, is_bold):
+    """顶部/底部文字排版"""
+    config = QRCodeConfig(box_size=15, top_text=text, bottom_text=text, is_bold=is_bold)
+    generator = QRCodeGenerator(config)
+    base = QRCodeGenerator(QRCodeConfig(box_size=15)).generate(data=make_payload(200))
+
+    benchmark(generator._add_text, base)
+    record_memory(benchmark, generator._add_text, base)
+
+
+@pytest.mark.benchmark(group="save-to-buffer")
+@pytest.mark.parametrize("dpi", [72, 300])
+@pytest.mark.parametrize("box_size", [10, 30])
+def test_save_to_buffer(benchmark, box_size, dpi):
+    """PNG 编码"""
+    generator = QRCodeGenerator(QRCodeConfig(box_size=box_size, dpi=dpi))
+    img = generator.generate(data=make_payload(1000))
+
+    data = benchmark(generator.save_to_buffer, img)
+    benchmark.extra_info["png_bytes"] = len(data)
+    record_memory(benchmark, generator.save_to_buffer, img)
+
+
+@pytest.mark.benchmark(group="batch")
+@pytest.mark.parametrize("batch_size", [1, 8, 32, 128])
+def test_batch_write_zip(benchmark, batch_size):
+    """批量生成并写入 ZIP（进程池）"""
+    generator = QRCodeGenerator(QRCodeConfig(box_size=15))
+    urls = [f"https://example.com/item/{i}" for i in range(batch_size)]
+
+    def run():
+        with tempfile.TemporaryFile() as f:
+            return generator.write_zip(urls, f)
+
+    summary = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert summary["failed"] == 0
+    # --benchmark-disable 时只运行一次、不统计（stats 为 None）
+    if benchmark.stats:
+        benchmark.extra_info["codes_per_second"] = round(batch_size / benchmark.stats.stats.mean, 1)
+    benchmark.extra_info["max_rss_kb"] = max_rss_kb()
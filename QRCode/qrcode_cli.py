@@ -0,0 +1,250 @@
+"""
+二维码批量生成命令行工具（无界面）
+
+从 CSV 或 JSONL 读取内容，使用预热的进程池并行渲染，输出 ZIP 或图片目录（附 manifest.csv），
+并报告吞吐量。
+
+示例（在 QRCode 目录下）：
+    python qrcode_cli.py urls.csv -o codes.zip --column url --workers 8
+    python qrcode_cli.py rows.jsonl -o out/ --style 商务蓝 --drawer circle --error-correction M
+    python qrcode_cli.py notes.csv -o notes.zip --text --compact --bottom-text "扫码查看"
+    python qrcode_cli.py - --format csv -o codes.zip < urls.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from dataclasses import replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from qrcode_core import QRCodeConfig, QRCodeGenerator, QRCodeStyle
+
+
+DEFAULT_LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icon.jpg")
+CONTENT_COLUMNS = ("content", "url")
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """按参数或扩展名确定输入格式"""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    return "jsonl" if ext in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def iter_rows(stream: Iterable[str], fmt: str, column: Optional[str] = None) -> Iterator[str]:
+    """
+    逐行读取待生成内容（空内容跳过）
+    - csv：按列名取值，默认依次尝试 content / url，均不存在时取第一列
+    - jsonl：每行为 JSON 字符串，或包含该列的对象
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        names = reader.fieldnames or []
+        if column is None:
+            column = next((name for name in CONTENT_COLUMNS if name in names), names[0] if names else None)
+        if column not in names:
+            raise ValueError(f"CSV 中没有列 {column!r}，可用列：{', '.join(names)}")
+        for row in reader:
+            value = (row.get(column) or "").strip()
+            if value:
+                yield value
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第 {line_no} 行不是有效的 JSON：{e}") from e
+            if isinstance(item, dict):
+                keys = (column,) if column else CONTENT_COLUMNS
+                item = next((item[key] for key in keys if key in item), None)
+                if item is None:
+                    raise ValueError(f"第 {line_no} 行缺少字段 {' / '.join(keys)}")
+            value = str(item).strip()
+            if value:
+                yield value
+    else:
+        raise ValueError(f"不支持的输入格式 {fmt!r}")
+
+
+def read_rows(data: bytes, fmt: str, column: Optional[str] = None) -> List[str]:
+    """从字节内容读取全部待生成内容（兼容 UTF-8 BOM）"""
+    return list(iter_rows(io.StringIO(data.decode("utf-8-sig")), fmt, column))
+
+
+def encode_contents(config: QRCodeConfig, rows: List[str], as_text: bool) -> List[str]:
+    """
+    计算二维码实际内容
+    - 默认每行内容直接作为二维码数据（网址）
+    - as_text=True 时按“文本”类型编码为解码页网址（遵循 config.compact_url）
+    """
+    if not as_text:
+        return rows
+    generator = QRCodeGenerator(replace(config, content_type="文本"))
+    encoded = []
+    for row in rows:
+        generator.config.content = row
+        encoded.append(generator.generate_qr_content())
+    return encoded
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="批量生成二维码（CSV/JSONL → ZIP 或图片目录）")
+    parser.add_argument("input", help="输入文件路径，- 表示标准输入")
+    parser.add_argument("-o", "--output", required=True, help="输出路径：以 .zip 结尾写压缩包，否则写入目录")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--column", help="内容所在列/字段（默认 content 或 url）")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    parser.add_argument("--text", action="store_true", help="按文本类型编码为解码页网址")
+    parser.add_argument("--compact", action="store_true", help="文本使用紧凑网址（压缩编码）")
+    parser.add_argument("--json", action="store_true", help="完成后以 JSON 输出统计信息")
+
+    style = parser.add_argument_group("样式")
+    style.add_argument("--style", default="经典黑白", choices=list(QRCodeStyle.PRESETS), help="预设样式")
+    style.add_argument("--fill", help="前景色，如 #000000（覆盖预设）")
+    style.add_argument("--back", help="背景色，如 #FFFFFF（覆盖预设）")
+    style.add_argument("--drawer", default="间隙方块 (Gapped)",
+                       help="码点样式：完整名称或简写 square/circle/rounded/gapped/vertical/horizontal")
+    style.add_argument("--error-correction", default="H", help="容错级别：L / M / Q / H")
+    style.add_argument("--box-size", type=int, default=15, help="像素块大小")
+    style.add_argument("--border", type=int, default=4, help="边框宽度（模块数）")
+    style.add_argument("--dpi", type=int, default=300, help="输出 DPI")
+
+    decor = parser.add_argument_group("图标与文字")
+    decor.add_argument("--logo", help="中心图标文件路径")
+    decor.add_argument("--default-logo", action="store_true", help="使用默认图标 icon.jpg")
+    decor.add_argument("--logo-size", type=int, default=20, help="图标大小比例 (%%)")
+    decor.add_argument("--top-text", default="", help="顶部文字")
+    decor.add_argument("--bottom-text", default="", help="底部文字")
+    decor.add_argument("--font", help="字体文件路径 (TTF)")
+    decor.add_argument("--font-size", type=int, default=30, help="字体大小")
+    decor.add_argument("--text-color", default="#000000", help="文字颜色")
+    decor.add_argument("--bold", action="store_true", help="文字加粗")
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> QRCodeConfig:
+    """由命令行参数创建配置"""
+    options: Dict[str, Any] = {
+        "content_type": "网址",
+        "style_preset": args.style,
+        "module_drawer": args.drawer,
+        "error_correction": args.error_correction,
+        "box_size": args.box_size,
+        "border": args.border,
+        "dpi": args.dpi,
+        "logo_size": args.logo_size,
+        "top_text": args.top_text,
+        "bottom_text": args.bottom_text,
+        "font_size": args.font_size,
+        "text_color": args.text_color,
+        "is_bold": args.bold,
+        "compact_url": args.compact,
+        "batch_mode": True,
+    }
+    if args.fill:
+        options["fill_color"] = args.fill
+    if args.back:
+        options["back_color"] = args.back
+    logo = DEFAULT_LOGO if args.default_logo else args.logo
+    if logo:
+        options["logo_file"] = logo
+    if args.font:
+        options["font_file"] = args.font
+    return QRCodeConfig.from_dict(options)
+
+
+class ThroughputReporter:
+    """按固定间隔向标准错误输出进度与吞吐量"""
+
+    def __init__(self, total: int, interval: float = 1.0, stream=sys.stderr):
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.done = 0
+        self.failed = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """重新开始计时"""
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def __call__(self, index: int, result) -> None:
+        self.done += 1
+        if isinstance(result, Exception):
+            self.failed += 1
+            print(f"⚠️ 第 {index + 1} 行生成失败：{result}", file=self.stream)
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            print(f"已完成 {self.done}/{self.total}（{self.rate:.1f} 个/秒）", file=self.stream)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        config = config_from_args(args)
+        fmt = detect_format(args.input, args.format)
+        if args.input == "-":
+            rows = list(iter_rows(io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig"), fmt, args.column))
+        else:
+            with open(args.input, encoding="utf-8-sig", newline="") as f:
+                rows = list(iter_rows(f, fmt, args.column))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    if not rows:
+        print("❌ 输入中没有可生成的内容", file=sys.stderr)
+        return 1
+
+    generator = QRCodeGenerator(config)
+    contents = encode_contents(config, rows, args.text)
+    reporter = ThroughputReporter(len(contents))
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(contents)))
+
+    with generator.create_executor(workers) as executor:
+        # 等待各子进程完成预热（导入依赖、加载字体与图标），预热时间不计入吞吐量
+        for future in [executor.submit(len, "") for _ in range(workers)]:
+            future.result()
+        reporter.reset()
+        if args.output.lower().endswith(".zip"):
+            with open(args.output, "wb") as f:
+                summary = generator.write_zip(contents, f, executor=executor,
+                                              on_result=reporter, sources=rows)
+        else:
+            summary = generator.write_files(contents, args.output, executor=executor,
+                                            on_result=reporter, sources=rows)
+
+    summary["seconds"] = round(reporter.elapsed, 3)
+    summary["codes_per_second"] = round(reporter.rate, 1)
+    summary["workers"] = workers
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print(
+            f"✅ 共 {summary['total']} 个，成功 {summary['succeeded']}，失败 {summary['failed']}，"
+            f"用时 {summary['seconds']} 秒（{summary['codes_per_second']} 个/秒，{workers} 进程）→ {args.output}",
+            file=sys.stderr,
+        )
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
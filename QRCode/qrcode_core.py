@@ -1,6 +1,6 @@
 """
 核心二维码类库
-包含：QRCodeConfig, QRCodeStyle, QRCodeGenerator, VCardBuilder
+包含：QRCodeConfig, QRCodeStyle, CapacityPlanner, AssetRegistry, QRRenderCache, RenderProfiler, QRCodeGenerator, VCardBuilder
 """
 import qrcode
 from qrcode.image.styledpil import StyledPilImage, SolidFillColorMask
@@ -13,12 +13,25 @@ from qrcode.image.styles.moduledrawers import (
     HorizontalBarsDrawer
 )
 from PIL import Image, ImageDraw, ImageFont
+import numpy as np
 import io
 import os
+import csv
+import time
+import zipfile
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, Executor, wait, FIRST_COMPLETED
 from urllib.parse import urlencode, quote
-from dataclasses import dataclass, field
-from typing import Optional, Dict, Any
+from dataclasses import dataclass, field, fields, replace
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple, Union, Callable, BinaryIO, List
+from bisect import bisect_left
 import json
+import zlib
+import base64
 
 
 @dataclass
@@ -61,6 +74,9 @@ class QRCodeConfig:
     
     # 批量模式
     batch_mode: bool = False
+
+    # 紧凑网址：数据压缩后放入 URL 片段（#z=...），解码页在浏览器端解压
+    compact_url: bool = False
     
     def to_url_params(self) -> str:
         """将用户关键信息转换为URL参数（不包含样式配置）"""
@@ -78,6 +94,81 @@ class QRCodeConfig:
         
         return urlencode(params, quote_via=quote)
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QRCodeConfig":
+        """
+        由字典创建配置（命令行与 HTTP 接口共用）
+        - 键名与字段名一致，未知键直接报错
+        - 容错级别与码点样式可使用简写（见 QRCodeStyle.resolve_name）
+        - 指定 style_preset 而未给出颜色时，使用预设颜色
+        """
+        names = {f.name for f in fields(cls)}
+        unknown = set(data) - names
+        if unknown:
+            raise ValueError(f"未知配置项：{', '.join(sorted(unknown))}")
+
+        values = dict(data)
+        if "error_correction" in values:
+            values["error_correction"] = QRCodeStyle.resolve_name(
+                QRCodeStyle.ERROR_CORRECTION_MAP, values["error_correction"])
+        if "module_drawer" in values:
+            values["module_drawer"] = QRCodeStyle.resolve_name(
+                QRCodeStyle.MODULE_DRAWERS, values["module_drawer"])
+        if "style_preset" in values:
+            if values["style_preset"] not in QRCodeStyle.PRESETS:
+                raise ValueError(f"未知样式预设 {values['style_preset']!r}")
+            fill, back = QRCodeStyle.get_colors(values["style_preset"])
+            values.setdefault("fill_color", fill)
+            values.setdefault("back_color", back)
+        if values.get("logo_file") and "logo_option" not in values:
+            values["logo_option"] = "上传自定义图标"
+        return cls(**values)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """紧凑模式的数据载荷（vcard 直接以对象保存，避免二次转义）"""
+        payload: Dict[str, Any] = {'type': self.content_type}
+        if self.vcard_data:
+            payload['vcard'] = self.vcard_data
+        elif self.content:
+            payload['content'] = self.content
+        return payload
+
+    @staticmethod
+    def compress_payload(payload: Dict[str, Any]) -> str:
+        """
+        JSON → raw deflate → base64url（去掉填充），结果只含 URL 安全字符
+        浏览器端用 DecompressionStream('deflate-raw') 即可还原
+        """
+        raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        packed = compressor.compress(raw) + compressor.flush()
+        return base64.urlsafe_b64encode(packed).rstrip(b'=').decode('ascii')
+
+    @staticmethod
+    def decompress_payload(token: str) -> Dict[str, Any]:
+        """compress_payload 的逆操作（用于测试与服务端校验）"""
+        packed = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return json.loads(zlib.decompress(packed, -15).decode('utf-8'))
+
+    def to_url_suffix(self, extra: Optional[Dict[str, str]] = None) -> str:
+        """
+        生成部署URL之后的部分（含 ? 或 #）
+        - 普通模式：?type=...&content=...（百分号编码，每个汉字占 9 字节）
+        - 紧凑模式：#z=<压缩数据>；若压缩后反而更长（短 ASCII 文本），仍使用普通模式
+        """
+        query = self.to_url_params()
+        if extra:
+            query += '&' + urlencode(extra, quote_via=quote)
+        plain = f"?{query}"
+        if not self.compact_url:
+            return plain
+
+        payload = self.to_payload()
+        if extra:
+            payload.update(extra)
+        compact = f"#z={self.compress_payload(payload)}"
+        return compact if len(compact) < len(plain) else plain
+
 
 class QRCodeStyle:
     """二维码样式管理类"""
@@ -107,6 +198,9 @@ class QRCodeStyle:
         "横条纹 (Horizontal)": HorizontalBarsDrawer()
     }
     
+    # 括号内无英文简写的选项
+    NAME_ALIASES = {"square": "方块 (默认)"}
+
     @classmethod
     def get_colors(cls, preset: str) -> tuple:
         """获取预设样式的颜色"""
@@ -118,15 +212,568 @@ class QRCodeStyle:
         """获取样式描述"""
         return cls.PRESETS.get(preset, {}).get("desc", "")
 
+    @staticmethod
+    def resolve_name(options: Dict[str, Any], name: str) -> str:
+        """
+        按名称查找选项键，便于命令行/接口传参
+        支持完整键名、括号内的简写（不区分大小写，如 "H"、"gapped"、"circle"）或 NAME_ALIASES
+        """
+        if name in options:
+            return name
+        wanted = name.strip().lower()
+        if wanted in QRCodeStyle.NAME_ALIASES:
+            return QRCodeStyle.NAME_ALIASES[wanted]
+        for key in options:
+            if "(" in key:
+                short = key.split("(", 1)[1].rstrip(")").split("-")[0].strip().lower()
+                if wanted == short:
+                    return key
+        raise ValueError(f"未知选项 {name!r}，可选：{', '.join(options)}")
+
+
+@dataclass
+class CapacityPlan:
+    """容量规划结果"""
+    error_correction: str
+    # 最小可用版本（1-40），超出容量时为 None
+    version: Optional[int]
+    # 所需数据位数（按所选版本计；超出容量时按版本 40 计）
+    needed_bits: int
+    # 所选版本（超出容量时为版本 40）的数据容量位数
+    capacity_bits: int
+    # 分段结果 (模式名, 字节数)
+    segments: List[Tuple[str, int]]
+    # 超出容量时，可容纳该内容的最高容错级别（均无法容纳时为 None）
+    suggested_error_correction: Optional[str] = None
+    # 已分段的数据，可直接交给 QRCode.add_data 复用
+    chunks: List[Any] = field(default_factory=list, repr=False)
+
+    @property
+    def fits(self) -> bool:
+        return self.version is not None
+
+    @property
+    def overshoot_bytes(self) -> int:
+        """超出版本 40 容量的字节数"""
+        return max(0, -(-(self.needed_bits - self.capacity_bits) // 8))
+
+
+class QRCapacityError(ValueError):
+    """内容超出二维码最大容量"""
+
+    def __init__(self, plan: CapacityPlan):
+        self.plan = plan
+        lines = [
+            "内容过多，无法生成二维码。",
+            f"超出容量约 {plan.overshoot_bytes} 字节（容错级别: {plan.error_correction}）。",
+            "建议：",
+            "1. 减少文字内容",
+        ]
+        if plan.suggested_error_correction:
+            lines.append(f"2. 降低容错级别（如改为'{plan.suggested_error_correction}'）")
+        else:
+            lines.append("2. 降低容错级别（如改为'低'）")
+        super().__init__("\n".join(lines))
+
+    def __reduce__(self):
+        # 批量生成时需跨进程传递，按规划结果重建异常
+        return (type(self), (self.plan,))
+
+
+class CapacityPlanner:
+    """
+    二维码容量规划
+    - 按 qrcode 的最优模式分段计算所需位数，直接求出最小版本
+    - 与 QRCode.make(fit=True) 的结果一致，但无需逐级试探，超出容量时提前给出结构化错误
+    """
+
+    # qrcode 默认的分段阈值（QRCode.add_data 的 optimize 参数）
+    OPTIMIZE_MINIMUM = 20
+
+    # 不同版本区间的字符计数位数不同，需分别计算
+    VERSION_CLASSES = ((1, 9), (10, 26), (27, 40))
+
+    MODE_NAMES = {
+        qrcode.util.MODE_NUMBER: "数字",
+        qrcode.util.MODE_ALPHA_NUM: "字母数字",
+        qrcode.util.MODE_8BIT_BYTE: "字节",
+        qrcode.util.MODE_KANJI: "汉字",
+    }
+
+    @staticmethod
+    def data_bits(mode: int, length: int) -> int:
+        """数据段本身占用的位数（不含模式与长度字段）"""
+        if mode == qrcode.util.MODE_NUMBER:
+            return 10 * (length // 3) + (0, 4, 7)[length % 3]
+        if mode == qrcode.util.MODE_ALPHA_NUM:
+            return 11 * (length // 2) + 6 * (length % 2)
+        if mode == qrcode.util.MODE_KANJI:
+            return 13 * length
+        return 8 * length
+
+    @classmethod
+    def needed_bits(cls, chunks: List[Any], version: int) -> int:
+        """在指定版本下编码所有数据段所需的位数"""
+        mode_sizes = qrcode.util.mode_sizes_for_version(version)
+        return sum(
+            4 + mode_sizes[chunk.mode] + cls.data_bits(chunk.mode, len(chunk))
+            for chunk in chunks
+        )
+
+    @classmethod
+    def minimal_version(cls, chunks: List[Any], level: int) -> Tuple[Optional[int], int]:
+        """返回 (最小版本或 None, 对应所需位数)"""
+        limits = qrcode.util.BIT_LIMIT_TABLE[level]
+        needed = 0
+        for first, last in cls.VERSION_CLASSES:
+            needed = cls.needed_bits(chunks, first)
+            version = bisect_left(limits, needed, first, last + 1)
+            if version <= last:
+                return version, needed
+        return None, needed
+
+    @classmethod
+    def plan(cls, content: str, error_correction: str) -> CapacityPlan:
+        """计算内容在指定容错级别下的最小版本"""
+        chunks = list(qrcode.util.optimal_data_chunks(content, minimum=cls.OPTIMIZE_MINIMUM))
+        level = QRCodeStyle.ERROR_CORRECTION_MAP[error_correction]
+        version, needed = cls.minimal_version(chunks, level)
+        limits = qrcode.util.BIT_LIMIT_TABLE[level]
+
+        suggestion = None
+        if version is None:
+            # 从高到低找可以容纳的容错级别
+            for name in reversed(list(QRCodeStyle.ERROR_CORRECTION_MAP)):
+                if cls.minimal_version(chunks, QRCodeStyle.ERROR_CORRECTION_MAP[name])[0]:
+                    suggestion = name
+                    break
+
+        return CapacityPlan(
+            error_correction=error_correction,
+            version=version,
+            needed_bits=needed,
+            capacity_bits=limits[version or 40],
+            segments=[(cls.MODE_NAMES.get(chunk.mode, str(chunk.mode)), len(chunk)) for chunk in chunks],
+            suggested_error_correction=suggestion,
+            chunks=chunks,
+        )
+
+
+class AssetRegistry:
+    """
+    进程级字体与图标资源缓存
+    - 默认字体按 (文字类型, 字号) 只查找一次，上传字体按 (文件哈希, 字号) 缓存
+    - 图标按 (来源哈希, 目标尺寸, 背景色) 缓存解码、缩放并加底色后的结果
+    - 批量生成时每个工作进程各自持有一份，同一进程内的后续任务直接复用
+    """
+
+    # 中文优先字体列表
+    CJK_FONTS = [
+        "fonts/SimHei.ttf", "fonts/msyh.ttc", "fonts/simsun.ttc", "fonts/NotoSansSC-Regular.ttf",
+        "SimHei.ttf", "msyh.ttc",
+        "simsun.ttc", "simsun.ttf", "Microsoft YaHei.ttf", "SimHei.ttf", "STSong.ttf", "arial.ttf",
+        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "wqy-zenhei.ttc", "wqy-microhei.ttc", "DroidSansFallbackFull.ttf"
+    ]
+
+    # 英文优先字体列表
+    LATIN_FONTS = [
+        "fonts/times.ttf", "fonts/arial.ttf", "fonts/TimesNewRoman.ttf",
+        "times.ttf", "Times New Roman.ttf", "arial.ttf", 
+        "DejaVuSans.ttf", "FreeSans.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    ]
+
+    # 缓存的字体与图标数量上限（按最近使用淘汰；字体按 文字类型/上传字体哈希 × 字号 各占一项）
+    MAX_FONTS = 64
+    MAX_LOGOS = 64
+
+    def __init__(self):
+        self._font_paths: Dict[str, Optional[str]] = {}
+        self._fonts: "OrderedDict[Tuple[str, int], Any]" = OrderedDict()
+        self._logos: "OrderedDict[Tuple[str, int, str], Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def has_chinese(text: str) -> bool:
+        """检查是否包含中文字符"""
+        return any('\u4e00' <= char <= '\u9fff' for char in text)
+
+    @staticmethod
+    def _read_bytes(source) -> bytes:
+        """读取路径、字节或文件对象的内容"""
+        if isinstance(source, bytes):
+            return source
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return f.read()
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        data = source.read()
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return data
+
+    def get_font(self, text: str, size: int, font_file: Optional[Any] = None):
+        """获取字体：优先使用上传字体，否则按文字内容选择默认字体（加粗通过描边实现，与字体无关）"""
+        try:
+            if font_file:
+                data = self._read_bytes(font_file)
+                key = (hashlib.sha256(data).hexdigest(), size)
+                with self._lock:
+                    font = self._fonts.get(key)
+                if font is None:
+                    font = ImageFont.truetype(io.BytesIO(data), size)
+            else:
+                # 如果包含中文，优先使用宋体/黑体；如果是纯英文，优先使用 Times New Roman
+                script = "cjk" if self.has_chinese(text) else "latin"
+                key = (script, size)
+                with self._lock:
+                    font = self._fonts.get(key)
+                if font is None:
+                    font = self._load_default_font(script, size)
+        except Exception:
+            return ImageFont.load_default()
+
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.MAX_FONTS:
+                self._fonts.popitem(last=False)
+        return font
+
+    def _load_default_font(self, script: str, size: int):
+        """按候选列表查找可用字体，找到的路径按文字类型记住"""
+        if script in self._font_paths:
+            path = self._font_paths[script]
+            # 如果找不到系统字体，使用默认字体（不支持大小调整，但总比报错好）
+            return ImageFont.truetype(path, size) if path else ImageFont.load_default()
+
+        candidates = self.CJK_FONTS if script == "cjk" else self.LATIN_FONTS
+        for name in candidates:
+            try:
+                font = ImageFont.truetype(name, size)
+            except Exception:
+                continue
+            self._font_paths[script] = name
+            return font
+
+        self._font_paths[script] = None
+        return ImageFont.load_default()
+
+    def get_logo(self, source, max_size: int, back_color: str) -> Image.Image:
+        """获取缩放到 max_size 以内、带 10 像素背景色边距的图标（返回的图像只读共享）"""
+        data = self._read_bytes(source)
+        key = (hashlib.sha256(data).hexdigest(), max_size, back_color)
+        with self._lock:
+            logo_bg = self._logos.get(key)
+            if logo_bg is not None:
+                self._logos.move_to_end(key)
+                return logo_bg
+
+        # 调整图标大小
+        logo_img = Image.open(io.BytesIO(data))
+        logo_img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        
+        # 添加背景
+        logo_bg = Image.new('RGB', 
+                           (logo_img.size[0] + 20, logo_img.size[1] + 20), 
+                           back_color)
+        
+        # 粘贴图标到背景
+        if logo_img.mode == 'RGBA':
+            logo_bg.paste(logo_img, (10, 10), logo_img)
+        else:
+            logo_bg.paste(logo_img, (10, 10))
+
+        with self._lock:
+            self._logos[key] = logo_bg
+            while len(self._logos) > self.MAX_LOGOS:
+                self._logos.popitem(last=False)
+        return logo_bg
+
+    def clear(self) -> None:
+        """清空所有缓存的资源"""
+        with self._lock:
+            self._font_paths.clear()
+            self._fonts.clear()
+            self._logos.clear()
+
+
+# 进程级共享的资源缓存
+ASSETS = AssetRegistry()
+
+
+class QRRenderCache:
+    """
+    二维码渲染缓存
+    - 以渲染相关配置 + 二维码内容（含图标/字体文件字节）的稳定哈希为键
+    - 缓存编码后的 PNG 字节，内存层按总字节数上限做 LRU 淘汰
+    - 可选磁盘层：内存未命中时回退读取，写入时同步落盘
+    """
+
+    # 影响最终 PNG 的配置字段（内容由调用方单独传入）
+    RENDER_FIELDS = (
+        "fill_color", "back_color", "module_drawer", "box_size", "border", "dpi",
+        "error_correction", "logo_option", "logo_size", "top_text", "bottom_text",
+        "font_size", "text_color", "is_bold", "text_padding",
+    )
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @classmethod
+    def make_key(cls, config: QRCodeConfig, content: str, use_default_logo: bool = False) -> str:
+        """计算缓存键（SHA-256 十六进制）"""
+        def file_digest(file_obj) -> Optional[str]:
+            if file_obj is None:
+                return None
+            return hashlib.sha256(AssetRegistry._read_bytes(file_obj)).hexdigest()
+
+        payload = {name: getattr(config, name) for name in cls.RENDER_FIELDS}
+        payload["content"] = content
+        payload["logo_file"] = file_digest(config.logo_file)
+        payload["font_file"] = file_digest(config.font_file)
+        payload["default_logo"] = (
+            file_digest("icon.jpg") if use_default_logo and os.path.exists("icon.jpg") else None
+        )
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，命中时刷新 LRU 顺序"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """写入缓存（超过内存上限的单个条目只写磁盘层）"""
+        with self._lock:
+            self._store(key, data)
+        self._write_disk(key, data)
+
+    def clear(self) -> None:
+        """清空内存层与计数（磁盘层保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.disk_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _store(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.png")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class _StageTimer:
+    """单个阶段的计时上下文，退出时把耗时与图像尺寸写入计时器"""
+
+    __slots__ = ("profiler", "name", "size", "_start")
+
+    def __init__(self, profiler: "RenderProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.size = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, time.perf_counter() - self._start, self.size)
+        return False
+
+
+class _NullStage:
+    """未开启计时时使用的空上下文，忽略所有写入"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class RenderProfiler:
+    """
+    渲染分阶段计时器
+    - 每次渲染一条记录：各阶段耗时（秒）与阶段输出的图像尺寸
+    - 阶段：make（版本适配与编码）、draw（码点绘制）、convert（RGB 转换）、
+      logo（图标合成）、text（文字排版）、encode（PNG 编码）
+    - on_stage(name, seconds, size) 回调可用于实时上报
+    """
+
+    STAGES = ("make", "draw", "convert", "logo", "text", "encode")
+
+    def __init__(self, on_stage: Optional[Callable[[str, float, Optional[tuple]], None]] = None):
+        self.on_stage = on_stage
+        self.records: List[Dict[str, Any]] = []
+
+    def start_render(self, content: str) -> None:
+        """开始一条新的渲染记录"""
+        self.records.append({
+            "content_length": len(content.encode("utf-8")),
+            "stages": {},
+            "sizes": {},
+        })
+
+    def stage(self, name: str) -> _StageTimer:
+        return _StageTimer(self, name)
+
+    def record(self, name: str, seconds: float, size: Optional[tuple] = None) -> None:
+        """记录阶段耗时；单独调用 save_to_buffer 时也会归入最近一次渲染"""
+        if not self.records:
+            self.records.append({"content_length": None, "stages": {}, "sizes": {}})
+        current = self.records[-1]
+        current["stages"][name] = current["stages"].get(name, 0.0) + seconds
+        if size is not None:
+            current["sizes"][name] = list(size)
+        if self.on_stage is not None:
+            self.on_stage(name, seconds, size)
+
+    def merge(self, records: List[Dict[str, Any]]) -> None:
+        """合并其他计时器（如批量子进程）的记录"""
+        self.records.extend(records)
+
+    def stage_times(self, name: str) -> np.ndarray:
+        """某一阶段在所有记录中的耗时数组"""
+        return np.array(
+            [r["stages"][name] for r in self.records if name in r["stages"]], dtype=float
+        )
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """按阶段汇总：次数、总耗时与均值/分位数（毫秒）"""
+        result = {}
+        for name in self.STAGES:
+            times = self.stage_times(name)
+            if times.size == 0:
+                continue
+            ms = times * 1000
+            result[name] = {
+                "count": int(ms.size),
+                "total_ms": float(ms.sum()),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "max_ms": float(ms.max()),
+            }
+        return result
+
+    def histograms(self, bins: int = 20) -> Dict[str, Dict[str, List[float]]]:
+        """按阶段统计耗时直方图（毫秒）"""
+        result = {}
+        for name in self.STAGES:
+            times = self.stage_times(name)
+            if times.size == 0:
+                continue
+            counts, edges = np.histogram(times * 1000, bins=bins)
+            result[name] = {"edges_ms": edges.tolist(), "counts": counts.tolist()}
+        return result
+
+    def to_json(self, bins: int = 20) -> str:
+        """导出汇总与直方图"""
+        return json.dumps({
+            "renders": len(self.records),
+            "summary": self.summary(),
+            "histograms": self.histograms(bins),
+        }, ensure_ascii=False, indent=2)
+
 
 class QRCodeGenerator:
     """二维码生成器类"""
     
     # 固定的部署URL - 用户无法修改
     DEPLOY_URL = "https://negiao-pages.share.connect.posit.cloud/Others/decoder.html"
+
+    # 批量数量少于该值时直接在当前进程内生成（进程池启动开销大于收益）
+    MIN_PARALLEL_BATCH = 8
+
+    # 批量压缩包清单表头
+    MANIFEST_HEADER = ["index", "source_url", "encoded_url", "file_name", "error"]
     
-    def __init__(self, config: QRCodeConfig):
+    def __init__(self, config: QRCodeConfig, profiler: Optional["RenderProfiler"] = None):
         self.config = config
+        # 可选的分阶段计时器，为 None 时不做任何记录
+        self.profiler = profiler
     
     def generate(self, data: Optional[str] = None, use_default_logo: bool = False) -> Image.Image:
         """生成二维码图像"""
@@ -136,100 +783,343 @@ class QRCodeGenerator:
         else:
             content = data
         
-        # 创建二维码对象
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=QRCodeStyle.ERROR_CORRECTION_MAP[self.config.error_correction],
-            box_size=self.config.box_size,
-            border=self.config.border,
-        )
-        qr.add_data(content)
-        try:
-            qr.make(fit=True)
-        except Exception as e:
-            if "Invalid version" in str(e):
-                raise ValueError("内容过多，无法生成二维码。\n建议：\n1. 减少文字内容\n2. 降低容错级别（如改为'低'）")
-            raise e
+        if self.profiler is not None:
+            self.profiler.start_render(content)
+
+        # 创建二维码对象：容量规划直接给出最小版本，无需 fit=True 逐级试探
+        with self._stage("make") as stage:
+            plan = CapacityPlanner.plan(content, self.config.error_correction)
+            if not plan.fits:
+                raise QRCapacityError(plan)
+            qr = qrcode.QRCode(
+                version=plan.version,
+                error_correction=QRCodeStyle.ERROR_CORRECTION_MAP[self.config.error_correction],
+                box_size=self.config.box_size,
+                border=self.config.border,
+            )
+            for chunk in plan.chunks:
+                qr.add_data(chunk)
+            qr.make(fit=False)
+            stage.size = (qr.modules_count, qr.modules_count)
         
         # 获取模块绘制器
         module_drawer = QRCodeStyle.MODULE_DRAWERS.get(
             self.config.module_drawer, 
             SquareModuleDrawer()
         )
+        back_rgb = tuple(int(self.config.back_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+        front_rgb = tuple(int(self.config.fill_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
 
-        # 生成图像
-        img = qr.make_image(
-            image_factory=StyledPilImage,
-            module_drawer=module_drawer,
-            color_mask=SolidFillColorMask(
-                back_color=tuple(int(self.config.back_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4)),
-                front_color=tuple(int(self.config.fill_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-            )
-        ).convert("RGB")
+        # 生成图像：方块/间隙方块走 NumPy 快速路径，其余样式使用 StyledPilImage
+        with self._stage("draw") as stage:
+            img = self._rasterize_fast(qr, module_drawer, front_rgb, back_rgb)
+            if img is None:
+                img = qr.make_image(
+                    image_factory=StyledPilImage,
+                    module_drawer=module_drawer,
+                    color_mask=SolidFillColorMask(back_color=back_rgb, front_color=front_rgb)
+                )
+            stage.size = img.size
+        if not isinstance(img, Image.Image):
+            with self._stage("convert") as stage:
+                img = img.convert("RGB")
+                stage.size = img.size
         
         # 添加图标
         if self.config.logo_option != "无图标":
-            img = self._add_logo(img, use_default_logo)
+            with self._stage("logo") as stage:
+                img = self._add_logo(img, use_default_logo)
+                stage.size = img.size
             
         # 添加文字
         if self.config.top_text or self.config.bottom_text:
-            img = self._add_text(img)
+            with self._stage("text") as stage:
+                img = self._add_text(img)
+                stage.size = img.size
         
         return img
-    
-    def _add_text(self, img: Image.Image) -> Image.Image:
-        """添加顶部和底部文字"""
-        # 检查是否包含中文字符
-        def has_chinese(text):
-            return any('\u4e00' <= char <= '\u9fff' for char in text)
-            
-        # 加载字体
-        font = None
+
+    @contextmanager
+    def profile(self, profiler: Optional["RenderProfiler"] = None) -> Iterator["RenderProfiler"]:
+        """
+        在上下文内开启分阶段计时
+        with generator.profile() as prof:
+            generator.render_png()
+        print(prof.summary())
+        """
+        previous = self.profiler
+        self.profiler = profiler if profiler is not None else RenderProfiler()
         try:
-            if self.config.font_file:
-                if hasattr(self.config.font_file, 'seek'):
-                    self.config.font_file.seek(0)
-                font = ImageFont.truetype(self.config.font_file, self.config.font_size)
-            else:
-                # 根据内容选择默认字体
-                # 如果包含中文，优先使用宋体/黑体
-                # 如果是纯英文，优先使用 Times New Roman
-                text_content = (self.config.top_text or "") + (self.config.bottom_text or "")
-                
-                if has_chinese(text_content):
-                    # 中文优先字体列表
-                    font_names = [
-                        "fonts/SimHei.ttf", "fonts/msyh.ttc", "fonts/simsun.ttc", "fonts/NotoSansSC-Regular.ttf",
-                        "SimHei.ttf", "msyh.ttc",
-                        "simsun.ttc", "simsun.ttf", "Microsoft YaHei.ttf", "SimHei.ttf", "STSong.ttf", "arial.ttf",
-                        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-                        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-                        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                        "/usr/share/fonts/noto/NotoSansCJK-Regular.ttc",
-                        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-                        "wqy-zenhei.ttc", "wqy-microhei.ttc", "DroidSansFallbackFull.ttf"
-                    ]
+            yield self.profiler
+        finally:
+            self.profiler = previous
+
+    def _stage(self, name: str):
+        """阶段计时上下文；未开启计时时返回无操作对象"""
+        if self.profiler is None:
+            return _NULL_STAGE
+        return self.profiler.stage(name)
+
+    def _rasterize_fast(self, qr: qrcode.QRCode, module_drawer, front_rgb: tuple,
+                        back_rgb: tuple) -> Optional[Image.Image]:
+        """
+        NumPy 快速栅格化：将模块矩阵直接展开为 RGB 像素
+        - 仅支持方块与间隙方块样式，其余样式返回 None
+        - 逐像素结果与 StyledPilImage 输出一致
+        """
+        drawer_type = type(module_drawer)
+        if drawer_type not in (SquareModuleDrawer, GappedSquareModuleDrawer):
+            return None
+        # 纯黑背景时 StyledPilImage 的颜色蒙版无法区分前景，保持原有行为
+        if back_rgb == (0, 0, 0):
+            return None
+
+        # get_matrix() 已包含边框模块
+        matrix = np.asarray(qr.get_matrix(), dtype=bool)
+        box_size = self.config.box_size
+        pixels = np.arange(matrix.shape[0] * box_size, dtype=np.int64)
+        modules = pixels // box_size
+        # 每个模块行先展开为整行像素，同一模块行内的像素行只有少数几种
+        full_rows = np.repeat(matrix, box_size, axis=1)
+
+        if drawer_type is SquareModuleDrawer:
+            row_patterns = full_rows
+            row_index = modules
+        else:
+            # 与 GappedSquareModuleDrawer 相同的浮点坐标，PIL 绘制矩形时截断取整
+            delta = (1 - module_drawer.size_ratio) * box_size / 2
+            origins = np.arange(matrix.shape[0], dtype=np.int64) * box_size
+            first = (origins + delta).astype(np.int64)
+            last = (origins + (box_size - 1) - delta).astype(np.int64)
+            if np.any(last < first):
+                return None
+            inside = (pixels >= first[modules]) & (pixels <= last[modules])
+
+            # 三个定位图案（eye）固定使用方块绘制，不留间隙
+            border = self.config.border
+            width = qr.modules_count
+            eye = np.zeros(matrix.shape, dtype=bool)
+            eye[border:border + 7, border:border + 7] = True
+            eye[border:border + 7, border + width - 7:border + width] = True
+            eye[border + width - 7:border + width, border:border + 7] = True
+            eye_rows = np.repeat(eye, box_size, axis=1)
+
+            # 每个模块行两种像素行：模块内部行与间隙行
+            row_patterns = np.stack(
+                [full_rows & (inside | eye_rows), full_rows & eye_rows], axis=1
+            ).reshape(-1, full_rows.shape[1])
+            row_index = 2 * modules + ~inside
+
+        # 查表着色：0 -> 背景色，1 -> 前景色；再按行复制成完整图像
+        palette = np.array([back_rgb, front_rgb], dtype=np.uint8)
+        rgb_rows = palette[row_patterns.view(np.uint8)]
+        return Image.fromarray(rgb_rows[row_index])
+
+    def generate_many(
+        self,
+        contents: Iterable[str],
+        workers: Optional[int] = None,
+        use_default_logo: bool = False,
+        executor: Optional[Executor] = None,
+        as_png: bool = False,
+    ) -> Iterator[Tuple[int, Union[Image.Image, bytes, Exception]]]:
+        """
+        批量生成二维码（多进程）
+        - 每个内容直接作为二维码数据，其余样式沿用当前配置
+        - 按完成顺序逐个产出 (index, image_or_error)，单个内容失败不影响其余内容
+        - 可传入已有的 executor 复用进程池，否则按 workers 临时创建
+        - as_png=True 时在子进程内完成 PNG 编码，只回传字节（体积远小于 RGB 图像）
+        """
+        contents = list(contents)
+        if not contents:
+            return
+        config = self._portable_config()
+        profile = self.profiler is not None
+
+        if executor is None:
+            if workers is None:
+                if len(contents) < self.MIN_PARALLEL_BATCH:
+                    workers = 1
                 else:
-                    # 英文优先字体列表
-                    font_names = [
-                        "fonts/times.ttf", "fonts/arial.ttf", "fonts/TimesNewRoman.ttf",
-                        "times.ttf", "Times New Roman.ttf", "arial.ttf", 
-                        "DejaVuSans.ttf", "FreeSans.ttf",
-                        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-                    ]
-                
-                for name in font_names:
+                    workers = os.cpu_count() or 1
+            workers = max(1, min(workers, len(contents)))
+
+            if workers == 1:
+                for index, content in enumerate(contents):
                     try:
-                        font = ImageFont.truetype(name, self.config.font_size)
+                        result = self._collect_profile(
+                            _render_task(config, content, use_default_logo, as_png, profile)
+                        )
+                    except Exception as e:
+                        result = e
+                    yield index, result
+                return
+
+        own_executor = executor is None
+        if own_executor:
+            # 使用 spawn 避免在 Streamlit 多线程环境中 fork
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        # 限制同时在途的任务数，避免已完成但未被消费的图像堆积在内存中
+        max_pending = 4 * (workers or os.cpu_count() or 1)
+
+        try:
+            pending = {}
+            items = enumerate(contents)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        index, content = next(items)
+                    except StopIteration:
+                        exhausted = True
                         break
-                    except:
-                        continue
-                
-                if font is None:
-                    # 如果找不到系统字体，使用默认字体（不支持大小调整，但总比报错好）
-                    font = ImageFont.load_default()
-        except Exception:
-            font = ImageFont.load_default()
+                    future = executor.submit(
+                        _render_task, config, content, use_default_logo, as_png, profile
+                    )
+                    pending[future] = index
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        result = self._collect_profile(future.result())
+                    except Exception as e:
+                        result = e
+                    yield index, result
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def _collect_profile(self, task_result):
+        """拆分进程池任务返回值，并把子进程的计时记录合并到当前计时器"""
+        result, records = task_result
+        if self.profiler is not None and records:
+            self.profiler.merge(records)
+        return result
+
+    def write_zip(
+        self,
+        contents: Iterable[str],
+        fileobj: BinaryIO,
+        workers: Optional[int] = None,
+        use_default_logo: bool = False,
+        executor: Optional[Executor] = None,
+        on_result: Optional[Callable[[int, Union[bytes, Exception]], None]] = None,
+        sources: Optional[List[str]] = None,
+    ) -> Dict[str, int]:
+        """
+        批量生成二维码并流式写入 ZIP 压缩包
+        - 每张 PNG 生成后立即写入压缩包并释放，内存占用不随数量增长
+        - fileobj 可以是不可定位的流（如 HTTP 响应），zipfile 会改用数据描述符
+        - 附带 manifest.csv：序号、原始网址、二维码实际内容、文件名、错误信息
+        - on_result(index, png_or_error) 可用于进度显示或预览
+        - sources 为清单中的原始内容（contents 由其转换而来时传入），默认与 contents 相同
+        """
+        # PNG 已经压缩，直接存储即可；清单文本使用 deflate
+        with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_STORED) as archive:
+            summary, manifest = self._write_batch(
+                contents, archive.writestr, workers, use_default_logo, executor, on_result, sources
+            )
+            archive.writestr("manifest.csv", manifest, compress_type=zipfile.ZIP_DEFLATED)
+        return summary
+
+    def write_files(
+        self,
+        contents: Iterable[str],
+        directory: str,
+        workers: Optional[int] = None,
+        use_default_logo: bool = False,
+        executor: Optional[Executor] = None,
+        on_result: Optional[Callable[[int, Union[bytes, Exception]], None]] = None,
+        sources: Optional[List[str]] = None,
+    ) -> Dict[str, int]:
+        """与 write_zip 相同，但把 PNG 与 manifest.csv 逐个写入目录"""
+        os.makedirs(directory, exist_ok=True)
+
+        def write_member(name: str, data: bytes) -> None:
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(data)
+
+        summary, manifest = self._write_batch(
+            contents, write_member, workers, use_default_logo, executor, on_result, sources
+        )
+        write_member("manifest.csv", manifest)
+        return summary
+
+    def _write_batch(self, contents, write_member, workers, use_default_logo, executor,
+                     on_result, sources) -> Tuple[Dict[str, int], bytes]:
+        """批量生成并通过 write_member(name, png) 输出，返回 (统计, manifest.csv 字节)"""
+        contents = list(contents)
+        sources = contents if sources is None else sources
+        manifest = [self.MANIFEST_HEADER]
+        succeeded = 0
+
+        for index, result in self.generate_many(
+            contents, workers=workers, use_default_logo=use_default_logo,
+            executor=executor, as_png=True
+        ):
+            file_name = self.zip_member_name(index)
+            if isinstance(result, Exception):
+                manifest.append([index + 1, sources[index], contents[index], "", str(result)])
+            else:
+                write_member(file_name, result)
+                manifest.append([index + 1, sources[index], contents[index], file_name, ""])
+                succeeded += 1
+            if on_result is not None:
+                on_result(index, result)
+
+        manifest[1:] = sorted(manifest[1:], key=lambda row: row[0])
+        buf = io.StringIO()
+        csv.writer(buf).writerows(manifest)
+        # 带 BOM 以便 Excel 正确识别中文
+        summary = {"total": len(contents), "succeeded": succeeded, "failed": len(contents) - succeeded}
+        return summary, buf.getvalue().encode("utf-8-sig")
+
+    def create_executor(self, workers: Optional[int] = None,
+                        use_default_logo: bool = False) -> ProcessPoolExecutor:
+        """
+        创建预热的进程池，供 generate_many / write_zip 反复复用（命令行与 HTTP 服务）
+        每个子进程启动时按当前配置渲染一次，提前完成模块导入与字体、图标加载
+        """
+        return ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(self._portable_config(), use_default_logo),
+        )
+
+    @staticmethod
+    def zip_member_name(index: int) -> str:
+        """批量压缩包内的图片文件名（序号从 1 开始）"""
+        return f"qrcode_{index + 1:04d}.png"
+
+    def _portable_config(self) -> QRCodeConfig:
+        """复制配置并将上传的文件对象转换为可跨进程传递的内存字节流"""
+        def to_buffer(file_obj):
+            if file_obj is None or isinstance(file_obj, (str, os.PathLike)):
+                return file_obj
+            if isinstance(file_obj, bytes):
+                return io.BytesIO(file_obj)
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+            return io.BytesIO(file_obj.read())
+
+        return replace(
+            self.config,
+            logo_file=to_buffer(self.config.logo_file),
+            font_file=to_buffer(self.config.font_file),
+        )
+
+    def _add_text(self, img: Image.Image) -> Image.Image:
+        """添加顶部和底部文字"""
+        font = ASSETS.get_font(
+            (self.config.top_text or "") + (self.config.bottom_text or ""),
+            self.config.font_size,
+            self.config.font_file,
+        )
 
         draw = ImageDraw.Draw(img)
         width, height = img.size
@@ -237,33 +1127,26 @@ class QRCodeGenerator:
         # 计算二维码边框大小 (像素)
         border_px = self.config.box_size * self.config.border
         
+        padding = self.config.text_padding
+        stroke_width = 1 if self.config.is_bold else 0
+
+        # 每段文字只测量一次，同时用于留白计算与居中定位
+        def measure(text):
+            if hasattr(draw, 'textbbox'):
+                bbox = draw.textbbox((0, 0), text, font=font, stroke_width=stroke_width)
+                return bbox[2] - bbox[0], bbox[3] - bbox[1]
+            return len(text) * self.config.font_size * 0.6, self.config.font_size
+
         # 计算文字高度
         top_add = 0
         bottom_add = 0
-        padding = self.config.text_padding
-        stroke_width = 1 if self.config.is_bold else 0
-        
         if self.config.top_text:
-            text_h = 0
-            if hasattr(draw, 'textbbox'):
-                bbox = draw.textbbox((0, 0), self.config.top_text, font=font, stroke_width=stroke_width)
-                text_h = bbox[3] - bbox[1]
-            else:
-                text_h = self.config.font_size
-            
-            min_top_space = text_h + padding * 2
-            top_add = max(0, min_top_space - border_px)
+            top_width, top_height = measure(self.config.top_text)
+            top_add = max(0, top_height + padding * 2 - border_px)
             
         if self.config.bottom_text:
-            text_h = 0
-            if hasattr(draw, 'textbbox'):
-                bbox = draw.textbbox((0, 0), self.config.bottom_text, font=font, stroke_width=stroke_width)
-                text_h = bbox[3] - bbox[1]
-            else:
-                text_h = self.config.font_size
-                
-            min_bottom_space = text_h + padding * 2
-            bottom_add = max(0, min_bottom_space - border_px)
+            bottom_width, bottom_height = measure(self.config.bottom_text)
+            bottom_add = max(0, bottom_height + padding * 2 - border_px)
             
         # 创建新图像
         new_height = height + top_add + bottom_add
@@ -276,46 +1159,25 @@ class QRCodeGenerator:
         
         # 绘制顶部文字
         if self.config.top_text:
-            if hasattr(draw, 'textbbox'):
-                bbox = draw.textbbox((0, 0), self.config.top_text, font=font, stroke_width=stroke_width)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-            else:
-                text_width = len(self.config.top_text) * self.config.font_size * 0.6
-                text_height = self.config.font_size
-                
-            x = (width - text_width) // 2
-            y = (top_add + border_px - text_height) // 2
+            x = (width - top_width) // 2
+            y = (top_add + border_px - top_height) // 2
             draw.text((x, y), self.config.top_text, font=font, fill=self.config.text_color, stroke_width=stroke_width, stroke_fill=self.config.text_color)
             
         # 绘制底部文字
         if self.config.bottom_text:
-            if hasattr(draw, 'textbbox'):
-                bbox = draw.textbbox((0, 0), self.config.bottom_text, font=font, stroke_width=stroke_width)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-            else:
-                text_width = len(self.config.bottom_text) * self.config.font_size * 0.6
-                text_height = self.config.font_size
-                
-            x = (width - text_width) // 2
-            y = (top_add + height - border_px) + (border_px + bottom_add - text_height) // 2
+            x = (width - bottom_width) // 2
+            y = (top_add + height - border_px) + (border_px + bottom_add - bottom_height) // 2
             draw.text((x, y), self.config.bottom_text, font=font, fill=self.config.text_color, stroke_width=stroke_width, stroke_fill=self.config.text_color)
             
         return new_img
 
     def _add_logo(self, img: Image.Image, use_default: bool) -> Image.Image:
         """在二维码中心添加图标"""
-        logo_path = None
-        
         # 确定图标来源
         if use_default and os.path.exists("icon.jpg"):
-            logo_path = "icon.jpg"
-            logo_img = Image.open(logo_path)
+            logo_source = "icon.jpg"
         elif self.config.logo_file:
-            if hasattr(self.config.logo_file, 'seek'):
-                self.config.logo_file.seek(0)
-            logo_img = Image.open(self.config.logo_file)
+            logo_source = self.config.logo_file
         else:
             return img
         
@@ -323,19 +1185,8 @@ class QRCodeGenerator:
         qr_width, qr_height = img.size
         logo_max_size = int(qr_width * self.config.logo_size / 100)
         
-        # 调整图标大小
-        logo_img.thumbnail((logo_max_size, logo_max_size), Image.Resampling.LANCZOS)
-        
-        # 添加白色背景
-        logo_bg = Image.new('RGB', 
-                           (logo_img.size[0] + 20, logo_img.size[1] + 20), 
-                           self.config.back_color)
-        
-        # 粘贴图标到背景
-        if logo_img.mode == 'RGBA':
-            logo_bg.paste(logo_img, (10, 10), logo_img)
-        else:
-            logo_bg.paste(logo_img, (10, 10))
+        # 缩放并加底色后的图标由资源缓存复用
+        logo_bg = ASSETS.get_logo(logo_source, logo_max_size, self.config.back_color)
         
         # 计算居中位置并粘贴
         logo_pos = (
@@ -348,10 +1199,29 @@ class QRCodeGenerator:
     
     def save_to_buffer(self, img: Image.Image) -> bytes:
         """将图像保存到字节流"""
-        buf = io.BytesIO()
-        img.save(buf, format='PNG', dpi=(self.config.dpi, self.config.dpi))
+        with self._stage("encode") as stage:
+            buf = io.BytesIO()
+            img.save(buf, format='PNG', dpi=(self.config.dpi, self.config.dpi))
+            stage.size = img.size
         return buf.getvalue()
     
+    def render_png(self, data: Optional[str] = None, use_default_logo: bool = False,
+                   cache: Optional[QRRenderCache] = None) -> bytes:
+        """生成二维码并编码为 PNG 字节；传入 cache 时相同配置与内容直接复用结果"""
+        content = self.generate_qr_content() if data is None else data
+
+        key = None
+        if cache is not None:
+            key = cache.make_key(self.config, content, use_default_logo)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        png = self.save_to_buffer(self.generate(data=content, use_default_logo=use_default_logo))
+        if cache is not None:
+            cache.put(key, png)
+        return png
+
     def generate_qr_content(self) -> str:
         """
         生成二维码内容（URL）
@@ -363,35 +1233,47 @@ class QRCodeGenerator:
             return self.config.content
         
         # 其他类型（文本、联系方式等），生成带参数的URL
-        params = self.config.to_url_params()
-        return f"{self.DEPLOY_URL}?{params}"
+        return f"{self.DEPLOY_URL}{self.config.to_url_suffix()}"
 
     def generate_encoded_url(self) -> str:
         """
         生成带更多编码信息的URL（用于在部署页面解析）
         包含: type, content 或 vcard, style, 前景/背景色及部分样式参数
         """
-        # 基础参数
-        params: Dict[str, Any] = {
-            'type': self.config.content_type,
-        }
-
-        # 内容或vcard
-        if self.config.vcard_data:
-            params['vcard'] = json.dumps(self.config.vcard_data, ensure_ascii=False)
-        elif self.config.content:
-            params['content'] = self.config.content
-
         # 样式相关（至少包含预设名，便于前端展示）
-        params['style'] = self.config.style_preset
-        params['fill'] = self.config.fill_color
-        params['back'] = self.config.back_color
+        params: Dict[str, str] = {
+            'style': self.config.style_preset,
+            'fill': self.config.fill_color,
+            'back': self.config.back_color,
+        }
 
         # 可选的尺寸信息，方便复现二维码外观
         params['box_size'] = str(self.config.box_size)
         params['border'] = str(self.config.border)
 
-        return f"{self.DEPLOY_URL}?{urlencode(params, quote_via=quote)}"
+        # type 与 content/vcard 由配置生成，紧凑模式下一并压缩
+        return f"{self.DEPLOY_URL}{self.config.to_url_suffix(extra=params)}"
+
+
+def _render_task(config: QRCodeConfig, content: str, use_default_logo: bool,
+                 as_png: bool = False, profile: bool = False):
+    """
+    进程池任务：按给定配置生成单个二维码（需为模块级函数以便序列化）
+    返回 (图像或 PNG 字节, 计时记录列表或 None)
+    """
+    generator = QRCodeGenerator(config, profiler=RenderProfiler() if profile else None)
+    img = generator.generate(data=content, use_default_logo=use_default_logo)
+    result = generator.save_to_buffer(img) if as_png else img
+    return result, generator.profiler.records if profile else None
+
+
+def _warm_worker(config: QRCodeConfig, use_default_logo: bool) -> None:
+    """进程池初始化：渲染一个示例二维码以加载依赖、字体与图标缓存"""
+    try:
+        QRCodeGenerator(config).generate(data="warmup", use_default_logo=use_default_logo)
+    except Exception:
+        # 预热失败不影响后续任务，实际错误会在对应任务中报告
+        pass
 
 
 class VCardBuilder:
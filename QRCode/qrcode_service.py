@@ -0,0 +1,283 @@
+"""
+二维码批量生成 HTTP 服务（ASGI，无框架依赖）
+
+与命令行工具共用读取逻辑与预热的进程池，请求体为 CSV / JSONL，响应为流式 ZIP（附 manifest.csv）。
+
+运行（在 QRCode 目录下）：
+    pip install uvicorn
+    QRCODE_WORKERS=8 uvicorn qrcode_service:app --host 0.0.0.0 --port 8000
+
+接口：
+    POST /batch?format=csv&column=url&error_correction=M&module_drawer=circle
+        请求体为 CSV 或 JSONL；查询参数为 QRCodeConfig 的标量字段（另有 format / column / text）
+        返回 application/zip，边生成边发送
+    GET /stats   累计生成数量与吞吐量
+    GET /health  健康检查
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import fields
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from qrcode_cli import DEFAULT_LOGO, encode_contents, read_rows
+from qrcode_core import QRCodeConfig, QRCodeGenerator
+
+
+logger = logging.getLogger("qrcode_service")
+
+# 单次请求的最大行数与请求体大小
+MAX_ROWS = int(os.environ.get("QRCODE_MAX_ROWS", "100000"))
+MAX_BODY_BYTES = int(os.environ.get("QRCODE_MAX_BODY_BYTES", str(64 * 1024 * 1024)))
+# 请求中不属于 QRCodeConfig 的查询参数
+REQUEST_OPTIONS = ("format", "column", "text", "default_logo")
+# 不允许通过接口指定服务器本地文件
+BLOCKED_FIELDS = ("logo_file", "font_file")
+# 查询参数只能表示的字段类型（vcard_data 等字典字段不接受原样的字符串）
+SCALAR_TYPES = (str, int, bool)
+
+
+class BatchRequestError(ValueError):
+    """请求参数或请求体无效（返回 400）"""
+
+
+def _to_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def parse_request(query: Dict[str, str], body: bytes,
+                  content_type: str = "") -> Tuple[QRCodeConfig, List[str], List[str]]:
+    """解析查询参数与请求体，返回 (配置, 原始内容, 二维码实际内容)"""
+    options = {key: query[key] for key in REQUEST_OPTIONS if key in query}
+    config_values: Dict[str, Any] = {
+        "content_type": "网址", "batch_mode": True,
+    }
+    types = {f.name: f.type for f in fields(QRCodeConfig)}
+    for key, value in query.items():
+        if key in REQUEST_OPTIONS:
+            continue
+        if key in BLOCKED_FIELDS or key not in types or types[key] not in SCALAR_TYPES:
+            raise BatchRequestError(f"不支持的参数 {key!r}")
+        if types[key] is bool:
+            config_values[key] = _to_bool(value)
+        elif types[key] is int:
+            try:
+                config_values[key] = int(value)
+            except ValueError:
+                raise BatchRequestError(f"参数 {key!r} 应为整数") from None
+        else:
+            config_values[key] = value
+    if _to_bool(options.get("default_logo", "")):
+        config_values["logo_file"] = DEFAULT_LOGO
+
+    fmt = options.get("format") or ("jsonl" if "json" in content_type else "csv")
+    try:
+        config = QRCodeConfig.from_dict(config_values)
+        rows = read_rows(body, fmt, options.get("column"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise BatchRequestError(str(e)) from e
+    if not rows:
+        raise BatchRequestError("请求体中没有可生成的内容")
+    if len(rows) > MAX_ROWS:
+        raise BatchRequestError(f"单次最多 {MAX_ROWS} 行")
+    return config, rows, encode_contents(config, rows, _to_bool(options.get("text", "")))
+
+
+class _ChunkWriter:
+    """
+    供 zipfile 写入的只写流：数据块放入有界队列，由事件循环发送
+    不提供 tell/seek，zipfile 会按不可定位的流写入（数据描述符）
+    队列中的 None 表示正常结束，异常对象表示生成失败
+    """
+
+    def __init__(self, chunks: "queue.Queue[Union[bytes, BaseException, None]]", cancelled: threading.Event,
+                 chunk_size: int = 256 * 1024):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        self.put(data)
+
+    def put(self, item: "Union[bytes, BaseException, None]") -> None:
+        """放入队列（数据块或结束标记），队列满时定期检查客户端是否已断开"""
+        while True:
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                # 客户端断开后停止生成，避免线程永久阻塞
+                if self.cancelled.is_set():
+                    raise BrokenPipeError("客户端已断开")
+
+
+class BatchService:
+    """ASGI 应用：进程池在启动时创建并预热，所有请求共用"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or int(os.environ.get("QRCODE_WORKERS", "0")) or os.cpu_count() or 1
+        self.executor = None
+        self._lock = threading.Lock()
+        self.totals = {"requests": 0, "codes": 0, "failed": 0, "seconds": 0.0}
+
+    def start(self) -> None:
+        if self.executor is None:
+            self.executor = QRCodeGenerator(QRCodeConfig()).create_executor(self.workers)
+            for future in [self.executor.submit(len, "") for _ in range(self.workers)]:
+                future.result()
+            logger.info("进程池已就绪：%d 个进程", self.workers)
+
+    def stop(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self.totals)
+        totals["codes_per_second"] = round(totals["codes"] / totals["seconds"], 1) if totals["seconds"] else 0.0
+        totals["seconds"] = round(totals["seconds"], 3)
+        totals["workers"] = self.workers
+        return totals
+
+    def _record(self, summary: Dict[str, int], seconds: float) -> None:
+        with self._lock:
+            self.totals["requests"] += 1
+            self.totals["codes"] += summary["succeeded"]
+            self.totals["failed"] += summary["failed"]
+            self.totals["seconds"] += seconds
+        logger.info("批量完成：%d 个（失败 %d），%.2f 秒，%.1f 个/秒",
+                    summary["total"], summary["failed"], seconds,
+                    summary["total"] / seconds if seconds else 0.0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path, method = scope["path"], scope["method"]
+        if path == "/health" and method == "GET":
+            await self._send_json(send, 200, {"status": "ok"})
+        elif path == "/stats" and method == "GET":
+            await self._send_json(send, 200, self.stats())
+        elif path == "/batch" and method == "POST":
+            await self._batch(scope, receive, send)
+        else:
+            await self._send_json(send, 404, {"error": "not found"})
+
+    async def _lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await loop.run_in_executor(None, self.start)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await loop.run_in_executor(None, self.stop)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _batch(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                await self._send_json(send, 413, {"error": "请求体过大"})
+                return
+            if not message.get("more_body"):
+                break
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        query = dict(parse_qsl(scope.get("query_string", b"").decode("utf-8")))
+        try:
+            config, rows, contents = parse_request(query, bytes(body), headers.get("content-type", ""))
+        except BatchRequestError as e:
+            await self._send_json(send, 400, {"error": str(e)})
+            return
+
+        # 未通过 lifespan 启动时（如部分测试服务器）按需创建进程池
+        loop = asyncio.get_running_loop()
+        if self.executor is None:
+            await loop.run_in_executor(None, self.start)
+
+        # 生成与 ZIP 写入在线程中进行，事件循环只负责发送数据块（有界队列形成背压）
+        chunks: "queue.Queue[Union[bytes, BaseException, None]]" = queue.Queue(maxsize=16)
+        cancelled = threading.Event()
+        generator = QRCodeGenerator(config)
+        started = time.perf_counter()
+
+        def produce():
+            writer = _ChunkWriter(chunks, cancelled)
+            end: Optional[BaseException] = None
+            try:
+                summary = generator.write_zip(contents, writer, executor=self.executor, sources=rows)
+                writer.flush()
+                self._record(summary, time.perf_counter() - started)
+            except BrokenPipeError:
+                logger.info("客户端断开，已停止批量生成")
+            except Exception as e:
+                logger.exception("批量生成失败")
+                end = e
+            finally:
+                try:
+                    writer.put(end)
+                except BrokenPipeError:
+                    pass
+
+        threading.Thread(target=produce, name="qrcode-batch", daemon=True).start()
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/zip"),
+                (b"content-disposition", b'attachment; filename="qrcodes.zip"'),
+                (b"x-qrcode-total", str(len(contents)).encode()),
+            ],
+        })
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, chunks.get)
+                if chunk is None:
+                    break
+                if isinstance(chunk, BaseException):
+                    # 响应头已发出，无法再改状态码：不发送结束帧而是抛出，由服务器中断连接，
+                    # 客户端收到不完整的响应，不会把截断的 ZIP 当作下载成功
+                    raise RuntimeError("批量生成失败，已中断响应") from chunk
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            cancelled.set()
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json; charset=utf-8")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = BatchService()
@@ -206,6 +206,565 @@ def test_batch_mode():
         return False
 
 
+def test_generate_many():
+    """测试批量并行生成"""
+    print("\n🔍 测试批量并行生成...")
+    try:
+        from qrcode_core import QRCodeConfig, QRCodeGenerator
+        
+        config = QRCodeConfig(box_size=4, border=1, error_correction="低 (L - 7%)")
+        generator = QRCodeGenerator(config)
+        
+        # 第 2 个内容超出容量，应单独报错而不影响其余内容
+        contents = [f"https://example.com/{i}" for i in range(9)]
+        contents[2] = "x" * 5000
+        
+        results = dict(generator.generate_many(contents, workers=2))
+        
+        assert sorted(results) == list(range(len(contents)))
+        assert isinstance(results[2], ValueError)
+        assert all(results[i].size[0] > 0 for i in results if i != 2)
+        
+        # 串行路径与并行路径结果一致
+        serial = dict(generator.generate_many(contents[:3], workers=1))
+        assert serial[0].tobytes() == results[0].tobytes()
+        assert isinstance(serial[2], ValueError)
+        
+        print(f"✅ 批量并行生成成功 ({len(results)} 个结果)")
+        return True
+    except Exception as e:
+        print(f"❌ 批量并行生成失败: {e}")
+        return False
+
+
+def test_fast_rasterizer_pixels():
+    """测试 NumPy 快速栅格化与 StyledPilImage 逐像素一致"""
+    print("\n🔍 测试快速栅格化像素一致性...")
+    try:
+        import qrcode
+        from qrcode.image.styledpil import StyledPilImage, SolidFillColorMask
+        from qrcode_core import QRCodeConfig, QRCodeStyle, QRCodeGenerator
+        
+        cases = [
+            ("方块 (默认)", "#000000", "#FFFFFF", 10, 4, "https://github.com"),
+            ("间隙方块 (Gapped)", "#000000", "#FFFFFF", 15, 4, "https://github.com"),
+            ("间隙方块 (Gapped)", "#000000", "#FFFFFF", 30, 2, "测试内容" * 40),
+            # 彩色参考图由 qrcode 逐像素着色，内容保持较短以控制测试耗时
+            ("间隙方块 (Gapped)", "#1E3A8A", "#F0F9FF", 30, 1, "Hello"),
+            ("间隙方块 (Gapped)", "#EA580C", "#FF0000", 17, 1, "Hello World"),
+            ("方块 (默认)", "#6B21A8", "#FAF5FF", 10, 2, "x" * 30),
+        ]
+        checked = 0
+        for drawer, fill, back, box_size, border, data in cases:
+            for level in ["低 (L - 7%)", "极高 (H - 30%)"]:
+                config = QRCodeConfig(
+                    fill_color=fill, back_color=back, module_drawer=drawer,
+                    box_size=box_size, border=border, error_correction=level
+                )
+                fast = QRCodeGenerator(config).generate(data=data)
+                
+                # 参考实现：原 StyledPilImage 渲染路径
+                qr = qrcode.QRCode(
+                    version=1,
+                    error_correction=QRCodeStyle.ERROR_CORRECTION_MAP[level],
+                    box_size=box_size,
+                    border=border,
+                )
+                qr.add_data(data)
+                qr.make(fit=True)
+                to_rgb = lambda c: tuple(int(c.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
+                reference = qr.make_image(
+                    image_factory=StyledPilImage,
+                    module_drawer=QRCodeStyle.MODULE_DRAWERS[drawer],
+                    color_mask=SolidFillColorMask(back_color=to_rgb(back), front_color=to_rgb(fill))
+                ).convert("RGB")
+                
+                assert fast.mode == reference.mode
+                assert fast.size == reference.size
+                assert fast.tobytes() == reference.tobytes(), f"{drawer} {box_size} {level}"
+                checked += 1
+        
+        print(f"✅ 快速栅格化像素一致 ({checked} 组配置)")
+        return True
+    except Exception as e:
+        print(f"❌ 快速栅格化像素不一致: {e}")
+        return False
+
+
+def test_render_cache():
+    """测试渲染缓存"""
+    print("\n🔍 测试渲染缓存...")
+    try:
+        import io
+        import tempfile
+        from PIL import Image
+        from qrcode_core import QRCodeConfig, QRCodeGenerator, QRRenderCache
+        
+        cache = QRRenderCache()
+        config = QRCodeConfig(content="Cache Test", box_size=5, dpi=150)
+        generator = QRCodeGenerator(config)
+        
+        first = generator.render_png(cache=cache)
+        second = generator.render_png(cache=cache)
+        assert first == second
+        assert first == generator.save_to_buffer(generator.generate())
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+        
+        # 图标文件内容参与缓存键
+        def logo_bytes(color):
+            buf = io.BytesIO()
+            Image.new("RGB", (32, 32), color).save(buf, format="PNG")
+            return io.BytesIO(buf.getvalue())
+        
+        config.logo_option = "上传自定义图标"
+        config.logo_file = logo_bytes("red")
+        key_red = QRRenderCache.make_key(config, "x")
+        config.logo_file = logo_bytes("blue")
+        assert QRRenderCache.make_key(config, "x") != key_red
+        
+        # 同一图标以路径、字节或文件对象传入时键相同，文件对象读取后回到开头
+        with open("icon.jpg", "rb") as f:
+            icon = f.read()
+        config.logo_file = "icon.jpg"
+        key_path = QRRenderCache.make_key(config, "x")
+        config.logo_file = icon
+        assert QRRenderCache.make_key(config, "x") == key_path
+        config.logo_file = io.BytesIO(icon)
+        config.logo_file.read(10)
+        assert QRRenderCache.make_key(config, "x") == key_path
+        assert config.logo_file.tell() == 0
+        
+        # LRU 淘汰：上限只够两个条目
+        small = QRRenderCache(max_bytes=10)
+        small.put("a", b"1234")
+        small.put("b", b"5678")
+        small.get("a")
+        small.put("c", b"9012")
+        assert small.get("b") is None
+        assert small.get("a") == b"1234" and small.get("c") == b"9012"
+        
+        # 磁盘层：新的缓存实例可从磁盘命中
+        with tempfile.TemporaryDirectory() as tmp:
+            QRRenderCache(disk_dir=tmp).put("k" * 64, first)
+            disk_cache = QRRenderCache(disk_dir=tmp)
+            assert disk_cache.get("k" * 64) == first
+            assert disk_cache.stats()["disk_hits"] == 1
+        
+        print(f"✅ 渲染缓存正常 ({cache.stats()})")
+        return True
+    except Exception as e:
+        print(f"❌ 渲染缓存失败: {e}")
+        return False
+
+
+def test_write_zip():
+    """测试批量流式导出 ZIP"""
+    print("\n🔍 测试批量导出 ZIP...")
+    try:
+        import io
+        import csv
+        import zipfile
+        from qrcode_core import QRCodeConfig, QRCodeGenerator
+        
+        generator = QRCodeGenerator(QRCodeConfig(box_size=4, border=1, error_correction="低 (L - 7%)"))
+        urls = ["https://example.com/a", "x" * 5000, "https://example.com/中文"]
+        seen = []
+        
+        buf = io.BytesIO()
+        summary = generator.write_zip(urls, buf, workers=1, on_result=lambda i, r: seen.append(i))
+        
+        assert summary == {"total": 3, "succeeded": 2, "failed": 1}
+        assert sorted(seen) == [0, 1, 2]
+        
+        with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as archive:
+            names = archive.namelist()
+            assert "qrcode_0001.png" in names and "qrcode_0003.png" in names
+            assert "qrcode_0002.png" not in names
+            assert archive.read("qrcode_0001.png")[:8] == b'\x89PNG\r\n\x1a\n'
+            rows = list(csv.reader(io.StringIO(archive.read("manifest.csv").decode("utf-8-sig"))))
+        
+        assert rows[0] == QRCodeGenerator.MANIFEST_HEADER
+        assert [row[0] for row in rows[1:]] == ["1", "2", "3"]
+        assert rows[3][1] == "https://example.com/中文"
+        assert rows[2][3] == "" and rows[2][4]
+        
+        print(f"✅ 批量导出 ZIP 成功 ({len(names)} 个文件)")
+        return True
+    except Exception as e:
+        print(f"❌ 批量导出 ZIP 失败: {e}")
+        return False
+
+
+def test_asset_registry():
+    """测试字体与图标资源缓存"""
+    print("\n🔍 测试资源缓存...")
+    try:
+        from qrcode_core import AssetRegistry
+        
+        assets = AssetRegistry()
+        
+        # 同一文字类型与字号只查找一次
+        font = assets.get_font("扫描二维码", 30)
+        assert assets.get_font("关注公众号", 30) is font
+        assert assets.get_font("Scan me", 30) is not font
+        
+        # 图标按来源、尺寸与背景色复用
+        logo = assets.get_logo("icon.jpg", 120, "#FFFFFF")
+        assert assets.get_logo("icon.jpg", 120, "#FFFFFF") is logo
+        assert max(logo.size) <= 120 + 20
+        assert assets.get_logo("icon.jpg", 120, "#000000") is not logo
+        
+        # 字体与图标的数量均有上限，按最近使用淘汰
+        assets = AssetRegistry()
+        assets.MAX_FONTS = assets.MAX_LOGOS = 3
+        with open("fonts/arial.ttf", "rb") as f:
+            uploaded = f.read()
+        fonts = [assets.get_font("Scan me", size, font_file=uploaded) for size in (10, 11, 12)]
+        assert assets.get_font("Scan me", 10, font_file=uploaded) is fonts[0]
+        assets.get_font("Scan me", 40)
+        assert len(assets._fonts) == 3
+        assert assets.get_font("Scan me", 11, font_file=uploaded) is not fonts[1]
+        assert assets.get_font("Scan me", 10, font_file=uploaded) is fonts[0]
+        logos = [assets.get_logo("icon.jpg", size, "#FFFFFF") for size in (60, 80, 100)]
+        assets.get_logo("icon.jpg", 60, "#FFFFFF")
+        assets.get_logo("icon.jpg", 120, "#FFFFFF")
+        assert len(assets._logos) == 3
+        assert assets.get_logo("icon.jpg", 60, "#FFFFFF") is logos[0]
+        assert assets.get_logo("icon.jpg", 80, "#FFFFFF") is not logos[1]
+        
+        print("✅ 资源缓存正常")
+        return True
+    except Exception as e:
+        print(f"❌ 资源缓存失败: {e}")
+        return False
+
+
+def test_render_profiler():
+    """测试分阶段耗时记录"""
+    print("\n🔍 测试分阶段耗时记录...")
+    try:
+        import json
+        from qrcode_core import QRCodeConfig, QRCodeGenerator
+        
+        config = QRCodeConfig(
+            content="Profile Test",
+            module_drawer="圆点 (Circle)",
+            box_size=5,
+            logo_option="使用默认图标",
+            top_text="Scan"
+        )
+        generator = QRCodeGenerator(config)
+        
+        # 未开启时不记录
+        generator.render_png(use_default_logo=True)
+        assert generator.profiler is None
+        
+        with generator.profile() as profiler:
+            generator.render_png(use_default_logo=True)
+            generator.render_png(use_default_logo=True)
+        assert generator.profiler is None
+        
+        assert len(profiler.records) == 2
+        stages = profiler.records[0]["stages"]
+        assert set(stages) == {"make", "draw", "convert", "logo", "text", "encode"}
+        assert profiler.records[0]["sizes"]["text"][1] > profiler.records[0]["sizes"]["draw"][1]
+        assert profiler.summary()["encode"]["count"] == 2
+        assert "histograms" in json.loads(profiler.to_json())
+        
+        # 批量生成时合并子进程的记录
+        with generator.profile() as batch_profiler:
+            list(generator.generate_many([f"https://e.com/{i}" for i in range(3)], workers=1))
+        assert len(batch_profiler.records) == 3
+        
+        print(f"✅ 分阶段耗时记录正常 ({', '.join(stages)})")
+        return True
+    except Exception as e:
+        print(f"❌ 分阶段耗时记录失败: {e}")
+        return False
+
+
+def test_capacity_planner():
+    """测试容量规划"""
+    print("\n🔍 测试容量规划...")
+    try:
+        import qrcode
+        from qrcode_core import CapacityPlanner, QRCapacityError, QRCodeConfig, QRCodeGenerator, QRCodeStyle
+        
+        # 与 qrcode 的 fit=True 结果一致（覆盖不同模式组合与版本区间）
+        samples = [
+            "1", "HELLO WORLD", "https://github.com", "0123456789" * 40,
+            "测试内容" * 30, "ABC123" * 100 + "abc" * 300, "x" * 1273, "x" * 2953,
+        ]
+        for content in samples:
+            for name, level in QRCodeStyle.ERROR_CORRECTION_MAP.items():
+                qr = qrcode.QRCode(error_correction=level)
+                qr.add_data(content)
+                try:
+                    expected = qr.best_fit()
+                except Exception:
+                    expected = None
+                assert CapacityPlanner.plan(content, name).version == expected, (content[:20], name)
+        
+        # 超出容量：给出超出字节数与可容纳的最高容错级别
+        plan = CapacityPlanner.plan("x" * 2000, "极高 (H - 30%)")
+        assert not plan.fits
+        assert plan.overshoot_bytes == 2000 - 1273
+        assert plan.suggested_error_correction == "中 (M - 15%)"
+        assert CapacityPlanner.plan("x" * 5000, "低 (L - 7%)").suggested_error_correction is None
+        
+        generator = QRCodeGenerator(QRCodeConfig(error_correction="极高 (H - 30%)"))
+        try:
+            generator.generate(data="x" * 2000)
+            raise AssertionError("应当抛出容量错误")
+        except QRCapacityError as e:
+            assert e.plan.overshoot_bytes == 727
+            assert "中 (M - 15%)" in str(e)
+        
+        print("✅ 容量规划正常")
+        return True
+    except Exception as e:
+        print(f"❌ 容量规划失败: {e}")
+        return False
+
+
+def test_compact_url():
+    """测试紧凑网址编码"""
+    print("\n🔍 测试紧凑网址编码...")
+    try:
+        from qrcode_core import CapacityPlanner, QRCodeConfig, QRCodeGenerator
+        
+        text = "扫描二维码查看活动详情，欢迎参加本周六的技术分享会。" * 4
+        config = QRCodeConfig(content=text, content_type="文本")
+        plain_url = QRCodeGenerator(config).generate_qr_content()
+        config.compact_url = True
+        compact_url = QRCodeGenerator(config).generate_qr_content()
+        
+        assert "#z=" in compact_url and "?" not in compact_url
+        token = compact_url.split("#z=", 1)[1]
+        assert QRCodeConfig.decompress_payload(token) == {"type": "文本", "content": text}
+        
+        # 中文内容压缩后二维码版本明显下降
+        plain_version = CapacityPlanner.plan(plain_url, "极高 (H - 30%)").version
+        compact_version = CapacityPlanner.plan(compact_url, "极高 (H - 30%)").version
+        assert compact_version < plain_version, (compact_version, plain_version)
+        
+        # 名片数据以对象形式保存，附加样式参数
+        vcard = {"name": "张三", "tel": "13800000000", "company": "示例科技有限公司"}
+        config = QRCodeConfig(content_type="联系方式/名片", vcard_data=vcard, compact_url=True)
+        encoded = QRCodeGenerator(config).generate_encoded_url()
+        payload = QRCodeConfig.decompress_payload(encoded.split("#z=", 1)[1])
+        assert payload["vcard"] == vcard and payload["box_size"] == "15"
+        
+        # 短 ASCII 文本压缩反而更长，保持普通参数
+        config = QRCodeConfig(content="hi", compact_url=True)
+        assert "?type=" in QRCodeGenerator(config).generate_qr_content()
+        
+        print("✅ 紧凑网址编码正常")
+        return True
+    except Exception as e:
+        print(f"❌ 紧凑网址编码失败: {e}")
+        return False
+
+
+def test_headless_batch():
+    """测试命令行批量生成"""
+    print("\n🔍 测试命令行批量生成...")
+    try:
+        import io
+        import os
+        import tempfile
+        import zipfile
+        from qrcode_core import QRCodeConfig
+        from qrcode_cli import iter_rows, main
+        
+        # 简写参数解析
+        config = QRCodeConfig.from_dict({
+            "error_correction": "m", "module_drawer": "square", "style_preset": "商务蓝"
+        })
+        assert config.error_correction == "中 (M - 15%)"
+        assert config.module_drawer == "方块 (默认)"
+        assert (config.fill_color, config.back_color) == ("#1E3A8A", "#F0F9FF")
+        try:
+            QRCodeConfig.from_dict({"colour": "red"})
+            raise AssertionError("应当拒绝未知配置项")
+        except ValueError as e:
+            assert "colour" in str(e)
+        
+        # CSV 默认取 content/url 列，JSONL 支持字符串与对象
+        csv_rows = list(iter_rows(io.StringIO("id,url\n1,https://a.com\n2,\n3,https://c.com\n"), "csv"))
+        assert csv_rows == ["https://a.com", "https://c.com"]
+        jsonl_rows = list(iter_rows(io.StringIO('"x"\n\n{"content": "y"}\n'), "jsonl"))
+        assert jsonl_rows == ["x", "y"]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "rows.csv")
+            with open(source, "w", encoding="utf-8") as f:
+                f.write("url\n" + "\n".join(f"https://example.com/{i}" for i in range(10)))
+            
+            target = os.path.join(tmp, "codes.zip")
+            assert main([source, "-o", target, "--workers", "2", "--box-size", "10"]) == 0
+            with zipfile.ZipFile(target) as archive:
+                names = archive.namelist()
+                manifest = archive.read("manifest.csv").decode("utf-8-sig").splitlines()
+            assert len(names) == 11 and len(manifest) == 11
+            
+            out_dir = os.path.join(tmp, "codes")
+            assert main([source, "-o", out_dir, "--workers", "2", "--text"]) == 0
+            assert sorted(os.listdir(out_dir))[:2] == ["manifest.csv", "qrcode_0001.png"]
+        
+        print("✅ 命令行批量生成正常")
+        return True
+    except Exception as e:
+        print(f"❌ 命令行批量生成失败: {e}")
+        return False
+
+
+def test_batch_service_failure():
+    """测试批量服务中途失败时中断响应"""
+    print("\n🔍 测试批量服务中途失败...")
+    try:
+        import asyncio
+        import io
+        import zipfile
+        from qrcode_core import QRCodeGenerator
+        from qrcode_service import BatchService
+        
+        def run(service, body):
+            messages = []
+            
+            async def receive():
+                return {"type": "http.request", "body": body, "more_body": False}
+            
+            async def send(message):
+                messages.append(message)
+            
+            scope = {"type": "http", "path": "/batch", "method": "POST", "headers": [],
+                     "query_string": b"box_size=4"}
+            try:
+                asyncio.run(service(scope, receive, send))
+                error = None
+            except Exception as e:
+                error = e
+            return messages, error
+        
+        service = BatchService(workers=1)
+        try:
+            body = "url\n" + "\n".join(f"https://example.com/{i}" for i in range(3))
+            messages, error = run(service, body.encode())
+            assert error is None
+            assert messages[0]["status"] == 200 and messages[-1]["more_body"] is False
+            data = b"".join(m["body"] for m in messages[1:])
+            assert len(zipfile.ZipFile(io.BytesIO(data)).namelist()) == 4
+            
+            # 已写出部分数据后失败：不发送结束帧，而是抛出异常由服务器中断连接
+            original = QRCodeGenerator.write_zip
+            
+            def failing_write_zip(self, contents, stream, **kwargs):
+                stream.write(b"x" * (512 * 1024))
+                raise OSError("磁盘已满")
+            
+            QRCodeGenerator.write_zip = failing_write_zip
+            try:
+                messages, error = run(service, body.encode())
+            finally:
+                QRCodeGenerator.write_zip = original
+            assert isinstance(error, RuntimeError) and isinstance(error.__cause__, OSError)
+            assert messages[0]["status"] == 200 and len(messages) > 1
+            assert all(m.get("more_body") for m in messages[1:])
+            assert service.stats()["requests"] == 1
+        finally:
+            service.stop()
+        
+        print("✅ 批量服务中途失败时中断响应")
+        return True
+    except Exception as e:
+        print(f"❌ 批量服务失败处理异常: {e}")
+        return False
+
+
+def test_batch_request_parsing():
+    """测试批量服务的请求解析：查询参数只接受标量字段"""
+    print("\n🔍 测试批量请求解析...")
+    try:
+        from qrcode_service import BatchRequestError, parse_request
+        
+        body = b"url\nhttps://example.com/a\nhttps://example.com/b\n"
+        config, rows, contents = parse_request(
+            {"box_size": "4", "is_bold": "yes", "error_correction": "H", "top_text": "扫一扫"}, body)
+        assert config.box_size == 4 and config.is_bold is True and config.top_text == "扫一扫"
+        assert rows == ["https://example.com/a", "https://example.com/b"] and len(contents) == 2
+        
+        # 本地文件与字典字段（如 vcard_data）不能通过查询参数指定，未知参数与错误的整数同样报错
+        for query in ({"logo_file": "/etc/passwd"}, {"font_file": "x.ttf"},
+                      {"vcard_data": '{"name": "张三"}'}, {"unknown": "1"}, {"box_size": "big"}):
+            try:
+                parse_request(query, body)
+                raise AssertionError(f"{query} 应被拒绝")
+            except BatchRequestError:
+                pass
+        
+        print("✅ 批量请求解析正常")
+        return True
+    except Exception as e:
+        print(f"❌ 批量请求解析失败: {e}")
+        return False
+
+
+def test_batch_service_disconnect():
+    """测试客户端断开时生成线程退出（队列已满、生成线程正在放入结束标记）"""
+    print("\n🔍 测试批量服务客户端断开...")
+    try:
+        import asyncio
+        import threading
+        import time
+        from qrcode_core import QRCodeGenerator
+        from qrcode_service import BatchService
+        
+        finished = threading.Event()
+        original = QRCodeGenerator.write_zip
+        
+        def filling_write_zip(self, contents, stream, **kwargs):
+            # 第 1 块被发送，其余 16 块正好占满队列，生成结束后结束标记无处可放
+            for _ in range(17):
+                stream.write(b"x" * (256 * 1024))
+            finished.set()
+            return {"total": len(contents), "succeeded": len(contents), "failed": 0}
+        
+        async def receive():
+            return {"type": "http.request", "body": b"url\nhttps://example.com\n", "more_body": False}
+        
+        async def send(message):
+            if message["type"] == "http.response.body":
+                # 等生成线程阻塞在结束标记上之后断开
+                while not finished.is_set():
+                    await asyncio.sleep(0.01)
+                await asyncio.sleep(0.2)
+                raise ConnectionResetError("客户端已断开")
+        
+        service = BatchService(workers=1)
+        scope = {"type": "http", "path": "/batch", "method": "POST", "headers": [], "query_string": b""}
+        QRCodeGenerator.write_zip = filling_write_zip
+        try:
+            try:
+                asyncio.run(service(scope, receive, send))
+                raise AssertionError("断开应向服务器抛出异常")
+            except ConnectionResetError:
+                pass
+            deadline = time.monotonic() + 5
+            while any(t.name == "qrcode-batch" for t in threading.enumerate()) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert not any(t.name == "qrcode-batch" for t in threading.enumerate()), "生成线程未退出"
+        finally:
+            QRCodeGenerator.write_zip = original
+            service.stop()
+        
+        print("✅ 客户端断开后生成线程已退出")
+        return True
+    except Exception as e:
+        print(f"❌ 批量服务客户端断开处理异常: {e}")
+        return False
+
+
 def run_all_tests():
     """运行所有测试"""
     print("=" * 60)
@@ -220,7 +779,19 @@ def run_all_tests():
         test_url_encoding,
         test_vcard_builder,
         test_save_to_buffer,
-        test_batch_mode
+        test_batch_mode,
+        test_generate_many,
+        test_fast_rasterizer_pixels,
+        test_render_cache,
+        test_write_zip,
+        test_asset_registry,
+        test_render_profiler,
+        test_capacity_planner,
+        test_compact_url,
+        test_headless_batch,
+        test_batch_service_failure,
+        test_batch_request_parsing,
+        test_batch_service_disconnect
     ]
     
     results = []
@@ -3,15 +3,83 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.model_selection import GroupShuffleSplit, train_test_split
 from sklearn.metrics import classification_report
 import os
+import shutil
+import tempfile
 import time
 
+from data_core import EXPORT_COLUMNS, GEO_COLUMN, SampleReader
+from importance_core import PermutationImportance
+from inference_core import export_archive
+from raster_core import BandStack, RasterClassifier
+from rf_core import ForestTuner, JobRegistry, spatial_blocks
+
+# 调参结果磁盘缓存目录（逐折得分与最佳模型），可通过环境变量修改
+CACHE_DIR = os.environ.get("RF_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rf_cache"))
+# 整景影像分类结果的输出目录
+OUTPUT_DIR = os.environ.get("RF_OUTPUT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "outputs"))
+
 # 设置页面配置
 st.set_page_config(page_title="随机森林分类 (Random Forest)", page_icon="🌲", layout="wide")
 
+
+
+@st.cache_resource
+def get_job_registry():
+    """后台训练任务注册表：训练在工作线程中进行，页面重跑或刷新后仍可按任务 ID 取回进度与结果"""
+    return JobRegistry()
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_file_hash(key, _reader):
+    """文件内容哈希：上传文件按 file_id、本地文件按修改时间缓存，重跑时不再重新计算"""
+    return _reader.file_hash
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_preview(file_hash, name, _reader):
+    """列名与前几行（只读取表头与少量数据）"""
+    return _reader.columns, _reader.preview()
+
+
+@st.cache_data(max_entries=8, show_spinner="正在读取样本...")
+def load_samples(file_hash, name, bands, label, coords, _reader):
+    """按文件内容哈希与所选列缓存解析后的样本，只读取所选列（coords=True 时另解析 .geo 坐标）"""
+    return _reader.read(list(bands), label, file_hash=file_hash, coords=coords)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_permutation_importance(model_hash, data_key, n_repeats, use_cache, _model, _X, _y, _y_pred, _computed):
+    """
+    按模型哈希缓存置换重要性，图表重绘时不再重新计算（启用结果缓存时另存磁盘，重启后仍可复用）
+    _computed 不参与缓存键：只有函数体实际执行时才追加记录，调用方据此区分本次计算与 st.cache_data 命中
+    """
+    importance = PermutationImportance(n_repeats=n_repeats, random_state=42, n_jobs=-1,
+                                       cache_dir=CACHE_DIR if use_cache else None)
+    result = importance.compute(_model, _X, _y, feature_names=list(_X.columns), baseline_pred=_y_pred)
+    _computed.append(not result.cached)
+    return result
+
+
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id):
+    """每秒只刷新进度区域；任务结束后整页重跑以展示结果"""
+    job = get_job_registry().get(job_id)
+    if job is None:
+        return
+    if not job.active:
+        st.rerun()
+    eta = job.eta
+    eta_text = f"，预计剩余 {eta:.0f} 秒" if eta is not None else ""
+    st.progress(job.fraction, text=f"⏳ 已完成 {job.done}/{job.total} 次拟合，已用 {job.elapsed:.0f} 秒{eta_text}")
+    if job.cancel_event.is_set():
+        st.caption("正在取消，当前拟合结束后停止...")
+    elif st.button("取消训练"):
+        job.cancel()
+
+
 st.title("🌲 随机森林分类与网格搜索")
 st.markdown("基于 Sentinel-2 数据和 NDVI 的分类模型训练与评估")
 
@@ -31,61 +99,98 @@ st.markdown(
 
 # 1. 加载数据
 st.sidebar.header("1. 数据配置")
-uploaded_file = st.sidebar.file_uploader("上传 CSV 文件", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("上传样本文件", type=["csv", "parquet", "feather"],
+                                         help="GEE 导出的 CSV，或 Parquet / Feather（需要 pyarrow）")
 
 # 尝试加载本地默认文件
 default_path = 'Data/nanyang_samples.csv'
-df = None
-
-if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
-    st.sidebar.success("已加载上传的文件")
-elif os.path.exists(default_path):
-    df = pd.read_csv(default_path)
-    st.sidebar.info(f"已加载默认文件: {default_path}")
-else:
-    st.warning(f"请上传 CSV 文件或确保项目目录下存在 '{default_path}'。")
+reader = None
+
+try:
+    if uploaded_file is not None:
+        reader = SampleReader(uploaded_file.getvalue(), uploaded_file.name)
+        file_hash = get_file_hash(("upload", uploaded_file.file_id), reader)
+        st.sidebar.success("已加载上传的文件")
+    elif os.path.exists(default_path):
+        reader = SampleReader(default_path)
+        file_hash = get_file_hash(("local", os.path.abspath(default_path), os.path.getmtime(default_path)), reader)
+        st.sidebar.info(f"已加载默认文件: {default_path}")
+    else:
+        st.warning(f"请上传样本文件或确保项目目录下存在 '{default_path}'。")
+        st.stop()
+    all_columns, preview = load_preview(file_hash, reader.name, reader)
+except (ValueError, ImportError) as e:
+    st.error(f"无法读取文件：{e}")
     st.stop()
 
-if df is not None:
+if reader is not None:
     with st.expander("数据预览", expanded=True):
-        st.dataframe(df.head())
+        st.dataframe(preview)
 
     # 2. 特征列表
-    all_columns = df.columns.tolist()
+    feature_columns = [c for c in all_columns if c not in EXPORT_COLUMNS]
     
     # 默认特征
     default_bands = ['B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'B8', 'B11', 'B12', 'NDVI']
     # 检查默认特征是否都在列中
-    valid_default_bands = [b for b in default_bands if b in all_columns]
+    valid_default_bands = [b for b in default_bands if b in feature_columns]
     
     st.sidebar.header("2. 特征与标签选择")
-    bands = st.sidebar.multiselect("选择特征 (Bands)", all_columns, default=valid_default_bands)
+    bands = st.sidebar.multiselect("选择特征 (Bands)", feature_columns, default=valid_default_bands)
     
     # 默认标签
-    default_label = 'class' if 'class' in all_columns else (all_columns[-1] if all_columns else None)
+    default_label = 'class' if 'class' in feature_columns else (feature_columns[-1] if feature_columns else None)
     
     if default_label:
-        label_index = all_columns.index(default_label)
+        label_index = feature_columns.index(default_label)
     else:
         label_index = 0
         
-    label = st.sidebar.selectbox("选择标签 (Label)", all_columns, index=label_index)
+    label = st.sidebar.selectbox("选择标签 (Label)", feature_columns, index=label_index)
 
     if not bands:
         st.error("请至少选择一个特征。")
         st.stop()
+    if label in bands:
+        st.error("标签列不能同时作为特征。")
+        st.stop()
+
+    # 空间分块验证：按 .geo 坐标划分空间块，相邻像元不会同时出现在训练与验证中
+    spatial = st.sidebar.checkbox(
+        "空间分块验证", value=False, disabled=GEO_COLUMN not in all_columns,
+        help="随机划分时相邻像元会同时落入训练集与验证集，精度偏高；分块后按空间块划分测试集与交叉验证折"
+    )
 
-    # 数据预处理：删除采样中产生的空值
-    df_clean = df.dropna(subset=bands + [label])
-    X = df_clean[bands]
-    y = df_clean[label]
+    # 只读取所选列并删除采样中产生的空值（波段 float32，标签转为类别编号）
+    try:
+        samples = load_samples(file_hash, reader.name, tuple(bands), label, spatial, reader)
+    except (ValueError, TypeError) as e:
+        st.error(f"所选列无法转换为数值：{e}")
+        st.stop()
+    X, y = samples.X, samples.y
     
-    st.sidebar.markdown(f"**有效样本数:** {len(df_clean)}")
+    st.sidebar.markdown(
+        f"**有效样本数:** {len(samples)}（删除空值 {samples.n_dropped} 行，占用 {samples.nbytes / 1024 ** 2:.1f} MB）"
+    )
 
     # 3. 划分数据集
     test_size = st.sidebar.slider("测试集比例", 0.1, 0.5, 0.3, 0.05)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    groups_train, block_km = None, None
+    if spatial:
+        block_km = st.sidebar.slider("空间块大小 (公里)", 1, 50, 10, 1)
+        groups = spatial_blocks(samples.coords, block_km)
+        n_blocks = len(np.unique(groups))
+        st.sidebar.caption(f"🧩 共 {n_blocks} 个空间块，测试集与交叉验证折均按块划分")
+        if n_blocks < 10:
+            st.error("空间块过少，无法划分测试集与 5 折交叉验证，请减小空间块大小。")
+            st.stop()
+        train_idx, test_idx = next(GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=42)
+                                   .split(X, y, groups))
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+        groups_train = groups[train_idx]
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
 
     # 4. 针对 10 个特征调整搜索网格
     st.sidebar.header("3. 网格搜索参数")
@@ -123,54 +228,246 @@ if df is not None:
     total_combinations = len(n_estimators_opts) * len(max_depth_opts) * len(min_samples_split_opts) * len(max_features_opts)
     total_fits = total_combinations * 5
     
+    use_cache = st.sidebar.checkbox("使用结果缓存", value=True,
+                                    help="相同数据与设置的逐折得分保存在磁盘上，再次训练或扩大网格时只计算缺失的组合")
+    if st.sidebar.button("清空缓存") and os.path.isdir(CACHE_DIR):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        st.sidebar.success("缓存已清空")
+
+    tuner = ForestTuner(param_grid, cv=5, scoring='accuracy', random_state=42, n_jobs=-1,
+                        cache_dir=CACHE_DIR if use_cache else None)
+
     st.sidebar.markdown("---")
-    st.sidebar.info(f"📊 当前配置:\n- 参数组合数: {total_combinations}\n- 总拟合次数 (CV=5): {total_fits}")
+    st.sidebar.info(
+        f"📊 当前配置:\n- 参数组合数: {total_combinations}\n- 总拟合次数 (CV=5): {total_fits}\n"
+        f"- 建树数量: {tuner.grid_trees}（复用森林，逐组训练需 {tuner.naive_grid_trees}）"
+    )
     
-    if total_fits > 50:
-        st.sidebar.warning("⚠️ 训练次数较多 (>50)，在低配置服务器上可能需要数分钟，建议减少参数范围。")
-
-    if st.button("开始训练 (Grid Search)", type="primary"):
-        start_time = time.time()
-        with st.spinner(f'正在执行网格搜索 (共 {total_fits} 次拟合)，请稍候...'):
-            # 5. 执行网格搜索
-            rf = RandomForestClassifier(random_state=42, n_jobs=-1)
-            grid_search = GridSearchCV(rf, param_grid, cv=5, scoring='accuracy', verbose=1)
-            grid_search.fit(X_train, y_train)
-        
-        end_time = time.time()
-        elapsed_time = end_time - start_time
+    # 4. 搜索策略：逐次减半 / 限时随机 / 贝叶斯优化可用更少的拟合次数找到最佳参数
+    st.sidebar.header("4. 搜索策略")
+    strategies = ForestTuner.available_strategies()
+    strategy = st.sidebar.selectbox(
+        "搜索策略", list(strategies), format_func=strategies.get,
+        help="网格搜索穷举全部组合；其余策略用更少的拟合次数逼近相同的最佳参数"
+    )
+    if "bayes" not in strategies:
+        st.sidebar.caption("💡 安装 optuna 后可使用贝叶斯优化")
+
+    search_options = {}
+    if strategy == "halving":
+        search_options["factor"] = st.sidebar.select_slider(
+            "淘汰倍数 (factor)", options=[2, 3, 4], value=3,
+            help="每轮保留 1/factor 的组合，树的数量增加 factor 倍"
+        )
+    elif strategy == "random":
+        search_options["time_budget"] = st.sidebar.slider("时间预算 (秒)", 10, 600, 60, 10)
+    elif strategy == "bayes":
+        if total_combinations > 10:
+            search_options["n_trials"] = st.sidebar.slider("试验次数", 10, total_combinations, min(30, total_combinations))
+        else:
+            search_options["n_trials"] = total_combinations
+        search_options["timeout"] = st.sidebar.slider("时间上限 (秒)", 10, 600, 120, 10)
+
+    st.sidebar.caption(f"⚙️ 并行划分：{tuner.plan_execution(strategy, len(X_train)).describe()}")
+
+    if strategy == "grid" and total_fits > 50:
+        st.sidebar.warning("⚠️ 训练次数较多 (>50)，在低配置服务器上可能需要数分钟，建议减少参数范围或改用其他搜索策略。")
+
+    # 同一数据与网格的网格搜索结果，用于与其他策略做实际对比
+    grid_key = (samples.file_hash, tuple(bands), label, test_size, block_km, repr(param_grid))
+
+    # 本次设置对应的结果键：页面重跑时只要设置不变就继续展示上次结果
+    run_key = grid_key + (strategy, repr(sorted(search_options.items())))
+
+    # 5. 执行参数搜索：在后台线程中运行，任务 ID 保存在会话中，页面重跑不会中断训练
+    registry = get_job_registry()
+    job = registry.get(st.session_state.get("job_id"))
+    if st.button(f"开始训练 ({strategies[strategy]})", type="primary",
+                 disabled=job is not None and job.active):
+        job = registry.submit(
+            {"run_key": run_key, "grid_key": grid_key, "strategy": strategy},
+            tuner.planned_fits(strategy, **search_options),
+            tuner.search, strategy, X_train, y_train, groups=groups_train, **search_options,
+        )
+        st.session_state["job_id"] = job.job_id
+
+    if job is not None:
+        if job.active:
+            show_job_progress(job.job_id)
+        elif job.status == "done":
+            result = job.result
+            st.session_state["search"] = {"key": job.key["run_key"], "result": result}
+            # 只有实际训练的网格搜索耗时才可用于对比
+            if job.key["strategy"] == "grid" and result.n_cached_fits == 0:
+                st.session_state["grid_result"] = (job.key["grid_key"], result)
+            del st.session_state["job_id"]
+        elif job.status == "cancelled":
+            st.warning(f"训练已取消（完成 {job.done}/{job.total} 次拟合）")
+        else:
+            st.error(f"训练失败：{job.error}")
+
+    search = st.session_state.get("search")
+    if search is not None and search["key"] == run_key:
+        result = search["result"]
+        saved = st.session_state.get("grid_result")
+        grid_result = saved[1] if saved and saved[0] == grid_key else None
 
         # 6. 结果展示
-        st.success(f"✅ 训练完成！总耗时: {elapsed_time:.2f} 秒")
-        
+        st.success(f"✅ 训练完成！总耗时: {result.elapsed:.2f} 秒")
+        if result.n_cached_fits:
+            st.caption(f"⚡ {result.n_cached_fits}/{result.n_fits} 次拟合取自缓存，实际构建 {result.n_trees} 棵决策树")
+
+        if strategy != "grid":
+            comparison = tuner.compare_with_grid(result, grid_result)
+            st.subheader("与穷举网格对比")
+            c1, c2, c3 = st.columns(3)
+            c1.metric("交叉验证拟合次数", comparison["fits"], f"-{comparison['fits_saved']} 次", delta_color="inverse")
+            c2.metric("构建决策树", comparison["trees"], f"网格 {comparison['grid_trees']}", delta_color="off")
+            if comparison["grid_elapsed"] is not None:
+                grid_label = "网格耗时（估算）" if comparison["grid_elapsed_estimated"] else "网格耗时（实测）"
+                c3.metric(grid_label, f"{comparison['grid_elapsed']:.1f} 秒",
+                          f"加速 {comparison['speedup']:.1f}×", delta_color="off")
+            if comparison["same_best_params"] is not None:
+                if comparison["same_best_params"]:
+                    st.caption("✅ 与网格搜索得到的最佳参数一致")
+                else:
+                    st.caption(f"ℹ️ 最佳参数与网格搜索不同（网格最佳精度 {grid_result.best_score:.4f}）")
+            else:
+                st.caption("💡 先运行一次网格搜索即可显示实测耗时与最佳参数是否一致")
+
         st.subheader("最佳参数与精度")
         col1, col2 = st.columns(2)
         with col1:
             st.write("最佳参数:")
-            st.json(grid_search.best_params_)
+            st.json(result.best_params)
         with col2:
-            st.metric("交叉验证最高精度 (OA)", f"{grid_search.best_score_:.4f}")
+            st.metric("交叉验证最高精度 (OA)", f"{result.best_score:.4f}")
+
+        with st.expander("全部候选结果"):
+            table = result.cv_results.copy()
+            table["params"] = table["params"].astype(str)
+            st.dataframe(table.sort_values("mean_test_score", ascending=False))
 
         # 7. 测试集评估
-        best_rf = grid_search.best_estimator_
+        best_rf = result.best_estimator
         y_pred = best_rf.predict(X_test)
         
         st.subheader("测试集分类报告")
-        report_dict = classification_report(y_test, y_pred, output_dict=True)
+        report_dict = classification_report(y_test, y_pred, labels=np.arange(len(samples.classes)),
+                                            target_names=samples.class_names, output_dict=True, zero_division=0)
         st.dataframe(pd.DataFrame(report_dict).transpose().style.format("{:.4f}"))
 
-        # 8. 特征重要性排序图
+        # 8. 特征重要性排序图：置换重要性在测试集上计算，不偏向取值多的波段
         st.subheader("特征重要性")
-        importances = best_rf.feature_importances_
-        indices = np.argsort(importances)[::-1]
+        importance_kind = st.radio("重要性类型", ["置换重要性（测试集）", "不纯度重要性（训练时）"], horizontal=True,
+                                   help="置换重要性为打乱某一波段后测试集精度的下降量；不纯度重要性偏向取值多的波段")
+        if importance_kind.startswith("置换"):
+            n_repeats = st.slider("重复次数", 3, 30, 10, help="每个波段打乱的次数，误差线为各次下降量的标准差")
+            computed = []
+            with st.spinner("正在计算置换重要性..."):
+                perm = load_permutation_importance(
+                    PermutationImportance.model_hash(best_rf), (samples.file_hash, tuple(bands), label, test_size, block_km),
+                    n_repeats, use_cache, best_rf, X_test, y_test, y_pred, computed,
+                )
+            frame = perm.to_frame()
+            # 耗时只在本次实际计算时显示；磁盘缓存与 st.cache_data 命中都记为缓存
+            source = f"{perm.elapsed:.1f} 秒" if any(computed) else "缓存"
+            st.caption(f"基线测试集精度 {perm.baseline_score:.4f}；{len(bands)} 个波段 × {n_repeats} 次重复（{source}）")
+            title, ylabel = "Permutation Importances on Test Set (Sentinel-2 + NDVI)", "Mean Accuracy Decrease"
+        else:
+            frame = pd.DataFrame({"feature": bands, "importance": best_rf.feature_importances_, "std": np.nan})
+            frame = frame.sort_values("importance", ascending=False, ignore_index=True)
+            title, ylabel = "Feature Importances (Sentinel-2 + NDVI)", "Importance Score"
 
         fig, ax = plt.subplots(figsize=(12, 6))
-        ax.set_title("Feature Importances (Sentinel-2 + NDVI)")
-        sns.barplot(x=[bands[i] for i in indices], y=importances[indices], palette="magma", ax=ax)
-        ax.set_ylabel("Importance Score")
+        ax.set_title(title)
+        sns.barplot(x=frame["feature"], y=frame["importance"], palette="magma", ax=ax)
+        if frame["std"].notna().any():
+            ax.errorbar(np.arange(len(frame)), frame["importance"], yerr=frame["std"], fmt="none", ecolor="black", capsize=4)
+        ax.set_ylabel(ylabel)
         ax.set_xlabel("Bands")
         
         # 自动调整布局
         plt.tight_layout()
         
         st.pyplot(fig)
+
+        # 9. 导出模型：joblib + 展平数组，可用 predict_cli.py 对整景影像分块预测
+        st.subheader("导出模型")
+        if st.button("生成导出文件"):
+            with st.spinner("正在导出模型..."):
+                st.session_state["export"] = {"key": run_key, "data": export_archive(
+                    best_rf, bands, samples.class_names,
+                    metadata={"label": label, "strategy": result.strategy,
+                              "cv_score": result.best_score, "spatial_block_km": block_km},
+                )}
+        export = st.session_state.get("export")
+        if export is not None and export["key"] == run_key:
+            st.download_button("下载模型 (ZIP)", export["data"], file_name="rf_model.zip", mime="application/zip")
+            st.caption(f"包含 model.joblib、forest.npz 与 model.json（{len(export['data']) / 1024:.0f} KB）；"
+                       "解压后运行 `python predict_cli.py rf_model pixels.npy -o labels.npy` 分块预测")
+
+        # 10. 应用到影像：按窗口读取整景影像，逐块分类并写入磁盘，内存占用与影像大小无关
+        st.subheader("应用到影像")
+        st.caption("多波段 GeoTIFF，或形状为 (波段, 行, 列) 的 .npy 波段堆栈；缺少 NDVI 波段时由 B4 / B8 即时计算")
+        raster_path = st.text_input("影像路径（服务器本地，适合大文件）")
+        raster_upload = st.file_uploader("或上传影像", type=["tif", "tiff", "npy"])
+        band_text = st.text_input("影像波段顺序（逗号分隔；GeoTIFF 留空时使用波段描述）",
+                                  value=", ".join(b for b in bands if b != "NDVI"))
+        rc1, rc2, rc3 = st.columns(3)
+        raster_scale = rc1.number_input("缩放系数", value=1.0, min_value=0.0, format="%.4f",
+                                        help="波段值乘以该系数后应与训练样本同一尺度，如 L2A 数字量填 0.0001")
+        tile_size = rc2.select_slider("分块大小 (像元)", options=[256, 512, 1024], value=512)
+        outputs = RasterClassifier.available_outputs()
+        output_format = rc3.selectbox("输出格式", list(outputs))
+
+        if st.button("开始分类"):
+            upload_path = output_path = None
+            try:
+                os.makedirs(OUTPUT_DIR, exist_ok=True)
+                if raster_upload is not None:
+                    # 上传的影像写入临时文件供分块读取，分类结束（或失败）后删除，不在输出目录中保留副本
+                    fd, upload_path = tempfile.mkstemp(suffix=os.path.splitext(raster_upload.name)[1])
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(raster_upload.getbuffer())
+                    source = upload_path
+                elif raster_path:
+                    source = raster_path
+                else:
+                    raise ValueError("请填写影像路径或上传影像")
+                band_names = [b.strip() for b in band_text.split(",") if b.strip()] or None
+                output_path = os.path.join(OUTPUT_DIR, f"classified_{time.strftime('%Y%m%d_%H%M%S')}{outputs[output_format]}")
+                progress = st.progress(0.0, text="正在分类...")
+                with BandStack(source, band_names) as stack:
+                    classifier = RasterClassifier(best_rf, bands, tile_size=tile_size, scale=raster_scale)
+                    stats = classifier.classify(
+                        stack, output_path,
+                        on_progress=lambda done, total: progress.progress(
+                            done / total, text=f"已完成 {done:,}/{total:,} 像元"),
+                    )
+                st.session_state["raster"] = {"key": run_key, "stats": stats, "path": output_path}
+            except (OSError, ValueError, ImportError) as e:
+                # 删除写了一半的分类结果，失败的运行不在输出目录中留下残缺影像
+                if output_path is not None and os.path.exists(output_path):
+                    os.remove(output_path)
+                st.error(f"影像分类失败：{e}")
+            finally:
+                if upload_path is not None:
+                    os.remove(upload_path)
+
+        raster = st.session_state.get("raster")
+        if raster is not None and raster["key"] == run_key:
+            stats = raster["stats"]
+            st.success(f"✅ 分类完成：{stats['pixels']:,} 像元（nodata {stats['nodata']:,}），"
+                       f"用时 {stats['seconds']} 秒，{stats['pixels_per_second']:,.0f} 像元/秒 → {raster['path']}")
+            # 降采样预览：nodata 透明，颜色按类别编号
+            n_classes = len(samples.classes)
+            cmap = plt.get_cmap("tab10", n_classes)
+            fig, ax = plt.subplots(figsize=(8, 8))
+            ax.imshow(np.ma.masked_greater_equal(stats["preview"], n_classes), cmap=cmap,
+                      vmin=-0.5, vmax=n_classes - 0.5, interpolation="nearest")
+            ax.set_axis_off()
+            ax.legend(handles=[plt.Rectangle((0, 0), 1, 1, color=cmap(i)) for i in range(n_classes)],
+                      labels=[f"{name} ({stats['class_counts'].get(i, 0):,})" for i, name in enumerate(samples.class_names)],
+                      loc="lower right", title=label)
+            st.pyplot(fig)
@@ -0,0 +1,129 @@
+"""
+随机森林调参并行方式基准测试
+
+在 Data/nanyang_samples.csv 上以不同核心数运行网格搜索，对比三种并行方式：
+- trees：只在树层并行（原做法，GridSearchCV 单任务 + RandomForestClassifier(n_jobs=核心数)）
+- oversubscribed：两层都用满核心（CV 层 核心数 × 树层 核心数，线程数远超核心）
+- planned：ExecutionPlan 按任务数、森林规模与样本数划分两层
+
+通过 CPU 亲和性把进程限制在前 N 个核心上（Linux），超过本机核心数的配置会跳过。
+
+运行（在 Streamlit 目录下）：
+    python benchmark_parallel.py --cores 2 4 16
+    python benchmark_parallel.py --cores 1 2 4 16 --engine sklearn --grid full --json parallel.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from rf_core import ExecutionPlan, ForestTuner
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data", "nanyang_samples.csv")
+BANDS = ['B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'B8', 'B11', 'B12', 'NDVI']
+LABEL = "class"
+
+GRIDS = {
+    # 20 个（组合, 折）任务，几分钟内可完成
+    "small": {
+        "n_estimators": [100, 200, 300, 500],
+        "max_depth": [None, 15],
+        "min_samples_split": [2, 5],
+        "max_features": ["sqrt"],
+    },
+    # 应用的默认网格
+    "full": {
+        "n_estimators": [100, 200, 300, 500],
+        "max_depth": [None, 15, 25, 40],
+        "min_samples_split": [2, 5, 10],
+        "max_features": ["sqrt", "log2", None],
+    },
+}
+
+
+def available_cores() -> List[int]:
+    """当前进程可用的核心编号"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def execution_for(mode: str, tuner: ForestTuner, n_cores: int, n_samples: int, engine: str) -> ExecutionPlan:
+    if mode == "trees":
+        return ExecutionPlan(n_cores=n_cores, cv_jobs=1, tree_jobs=n_cores)
+    if mode == "oversubscribed":
+        return ExecutionPlan(n_cores=n_cores, cv_jobs=n_cores, tree_jobs=n_cores)
+    tuner.n_jobs = n_cores
+    return tuner.plan_execution("grid", n_samples, engine)
+
+
+def run(X, y, grid: Dict[str, List[Any]], execution: ExecutionPlan, engine: str, repeat: int) -> float:
+    """重复运行取最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        tuner = ForestTuner(grid, cv=5, random_state=42, n_jobs=execution.n_cores, execution=execution)
+        start = time.perf_counter()
+        tuner.search("grid", X, y, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="对比网格搜索在不同核心数下的并行方式")
+    parser.add_argument("--cores", type=int, nargs="+", default=[2, 4, 16], help="核心数列表")
+    parser.add_argument("--modes", nargs="+", default=["trees", "oversubscribed", "planned"],
+                        choices=["trees", "oversubscribed", "planned"], help="并行方式")
+    parser.add_argument("--engine", default="warm_start", choices=["warm_start", "sklearn"],
+                        help="网格搜索引擎")
+    parser.add_argument("--grid", default="small", choices=list(GRIDS), help="参数网格")
+    parser.add_argument("--repeat", type=int, default=1, help="每项重复次数（取最短）")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(DATA_PATH).dropna(subset=BANDS + [LABEL])
+    X, y = df[BANDS], df[LABEL]
+    grid = GRIDS[args.grid]
+    cores = available_cores()
+    print(f"样本 {len(df)}，网格 {args.grid}，引擎 {args.engine}，本机可用 {len(cores)} 核", file=sys.stderr)
+
+    rows = []
+    for n_cores in args.cores:
+        if n_cores > len(cores):
+            print(f"⚠️ 跳过 {n_cores} 核：本机只有 {len(cores)} 核", file=sys.stderr)
+            continue
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores[:n_cores])
+        baseline = None
+        for mode in args.modes:
+            execution = execution_for(mode, ForestTuner(grid), n_cores, len(X), args.engine)
+            seconds = run(X, y, grid, execution, args.engine, args.repeat)
+            if mode == "trees":
+                baseline = seconds
+            rows.append({
+                "cores": n_cores, "mode": mode, "cv_jobs": execution.cv_jobs,
+                "tree_jobs": execution.tree_jobs, "seconds": round(seconds, 3),
+                "speedup_vs_trees": round(baseline / seconds, 2) if baseline else None,
+            })
+            print(f"{n_cores:>3} 核  {mode:<15} {execution.describe():<28} {seconds:8.2f} 秒", file=sys.stderr)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    if not rows:
+        print("❌ 没有可运行的配置", file=sys.stderr)
+        return 1
+    table = pd.DataFrame(rows)
+    print(table.to_string(index=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
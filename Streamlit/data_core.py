@@ -0,0 +1,198 @@
+"""
+样本数据读取核心类库
+包含：SampleTable, SampleReader, parse_points
+"""
+import hashlib
+import io
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+except ImportError:  # 未安装 pyarrow 时只支持 CSV（pandas 读取）
+    pa = None
+
+
+# 扩展名 → 格式
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+GEO_COLUMN = ".geo"
+# GEE 导出中不作为特征的列（system:index 与 .geo 的 GeoJSON 字符串占内存最多）
+EXPORT_COLUMNS = ("system:index", GEO_COLUMN)
+# GeoJSON Point 的坐标（GEE 导出的 .geo 列只含点要素）
+POINT_PATTERN = r'"coordinates"\s*:\s*\[\s*(?P<lon>[-+0-9.eE]+)\s*,\s*(?P<lat>[-+0-9.eE]+)'
+# 读取时由 .geo 解析出的坐标列
+LON, LAT = "__lon", "__lat"
+
+
+def parse_points(geo) -> np.ndarray:
+    """
+    从 GeoJSON Point 字符串列中提取 (经度, 纬度)，返回 (n, 2) 的 float64 数组，无法解析的行为 NaN
+    整列一次正则提取（pyarrow 计算内核，或 pandas 的向量化字符串方法），不逐行 json.loads
+    """
+    if pa is not None:
+        if not isinstance(geo, (pa.Array, pa.ChunkedArray)):
+            geo = pa.array(pd.Series(geo, dtype=object), type=pa.string(), from_pandas=True)
+        parts = pc.extract_regex(geo, POINT_PATTERN)
+        return np.column_stack([
+            pc.cast(pc.struct_field(parts, [i]), pa.float64()).to_numpy(zero_copy_only=False)
+            for i in range(2)
+        ]).astype(np.float64, copy=False)
+    parts = pd.Series(geo, dtype=object).str.extract(POINT_PATTERN)
+    return parts.astype(np.float64).to_numpy()
+
+
+@dataclass
+class SampleTable:
+    """
+    训练样本：只含所选波段与标签，已删除含空值的行
+    - X：float32 波段（RandomForestClassifier 内部同样按 float32 建树，结果不变）
+    - y：类别编号（最小的无符号整数类型），classes[y] 为原始标签
+    - coords：(经度, 纬度)，仅在读取时要求坐标才有
+    """
+    X: pd.DataFrame
+    y: pd.Series
+    classes: np.ndarray
+    n_rows: int
+    file_hash: str
+    coords: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    @property
+    def n_dropped(self) -> int:
+        return self.n_rows - len(self.X)
+
+    @property
+    def nbytes(self) -> int:
+        coords = self.coords.nbytes if self.coords is not None else 0
+        return int(self.X.memory_usage(index=False).sum() + self.y.memory_usage(index=False) + coords)
+
+    @property
+    def class_names(self) -> List[str]:
+        return [str(c) for c in self.classes]
+
+
+class SampleReader:
+    """
+    按列读取 CSV / Parquet / Feather 样本文件
+    只读取所选的波段与标签列，其余列（如 system:index、.geo）不解析也不占内存；
+    Parquet / Feather 需要 pyarrow，CSV 在有 pyarrow 时使用其多线程解析器
+    """
+
+    def __init__(self, source: Union[str, bytes], name: Optional[str] = None, fmt: Optional[str] = None):
+        self.source = source
+        self.name = name or (source if isinstance(source, str) else "upload.csv")
+        self.format = fmt or self.detect_format(self.name)
+        if self.format != "csv" and pa is None:
+            raise ImportError("读取 Parquet / Feather 需要安装 pyarrow：pip install pyarrow")
+
+    @staticmethod
+    def detect_format(name: str) -> str:
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in FORMATS:
+            raise ValueError(f"不支持的文件类型 {ext!r}，可用：{', '.join(FORMATS)}")
+        return FORMATS[ext]
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @property
+    def file_hash(self) -> str:
+        """文件内容哈希（同一文件再次上传或重命名时复用缓存）"""
+        if isinstance(self.source, bytes):
+            return self.digest(self.source)
+        digest = hashlib.sha256()
+        with open(self.source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _open(self):
+        """pyarrow 的输入：字节内容零拷贝包装，文件路径按内存映射打开"""
+        if isinstance(self.source, bytes):
+            return pa.BufferReader(self.source)
+        return pa.memory_map(self.source) if self.format == "feather" else self.source
+
+    def _text(self):
+        """pandas 读取 CSV 的输入"""
+        return io.BytesIO(self.source) if isinstance(self.source, bytes) else self.source
+
+    @property
+    def columns(self) -> List[str]:
+        """列名（只读取表头 / 元数据）"""
+        if self.format == "csv":
+            return pd.read_csv(self._text(), nrows=0).columns.tolist()
+        if self.format == "parquet":
+            return pa_parquet.read_schema(self._open()).names
+        return pa_feather.read_table(self._open(), memory_map=True).schema.names
+
+    def preview(self, n: int = 5) -> pd.DataFrame:
+        """前 n 行（全部列）"""
+        if self.format == "csv":
+            return pd.read_csv(self._text(), nrows=n)
+        if self.format == "parquet":
+            batch = next(pa_parquet.ParquetFile(self._open()).iter_batches(batch_size=n), None)
+            return batch.to_pandas() if batch is not None else pd.DataFrame(columns=self.columns)
+        return pa_feather.read_table(self._open(), memory_map=True).slice(0, n).to_pandas()
+
+    def _read_columns(self, bands: Sequence[str], label: str, coords: bool = False) -> pd.DataFrame:
+        """读取波段与标签列；coords=True 时另读 .geo 并替换为经纬度两列（字符串不进入 pandas）"""
+        columns = list(dict.fromkeys([*bands, label] + ([GEO_COLUMN] if coords else [])))
+        if self.format == "csv" and pa is None:
+            frame = pd.read_csv(self._text(), usecols=columns, dtype={band: np.float32 for band in bands})
+            if coords:
+                frame[[LON, LAT]] = parse_points(frame.pop(GEO_COLUMN))
+            return frame
+        if self.format == "csv":
+            types = {band: pa.float32() for band in bands}
+            if coords:
+                types[GEO_COLUMN] = pa.string()
+            # 空字符串按空值处理（与 pandas 一致），空标签的行随后被删除而不是成为一个类别
+            table = pa_csv.read_csv(self._open(), convert_options=pa_csv.ConvertOptions(
+                include_columns=columns, column_types=types, strings_can_be_null=True))
+        elif self.format == "parquet":
+            table = pa_parquet.read_table(self._open(), columns=columns)
+        else:
+            table = pa_feather.read_table(self._open(), columns=columns, memory_map=True)
+        if coords:
+            points = parse_points(table.column(GEO_COLUMN))
+            table = table.drop_columns([GEO_COLUMN])
+            table = table.append_column(LON, pa.array(points[:, 0])).append_column(LAT, pa.array(points[:, 1]))
+        return table.to_pandas()
+
+    def read(self, bands: Sequence[str], label: str, file_hash: Optional[str] = None,
+             coords: bool = False) -> SampleTable:
+        """
+        读取所选列，删除含空值的行，波段转为 float32、标签转为类别编号
+        coords=True 时同时解析 .geo 中的点坐标（坐标缺失的行一并删除）
+        """
+        if label in bands:
+            raise ValueError(f"标签列 {label!r} 不能同时作为特征")
+        if coords and GEO_COLUMN not in self.columns:
+            raise ValueError(f"文件中没有坐标列 {GEO_COLUMN!r}")
+        frame = self._read_columns(bands, label, coords)
+        n_rows = len(frame)
+        frame = frame.dropna(subset=[*bands, label] + ([LON, LAT] if coords else [])).reset_index(drop=True)
+
+        X = frame[list(bands)].astype(np.float32)
+        codes, classes = pd.factorize(frame[label], sort=True)
+        y = pd.Series(codes.astype(np.min_scalar_type(max(len(classes) - 1, 0))), name=label)
+        return SampleTable(X=X, y=y, classes=np.asarray(classes), n_rows=n_rows,
+                           file_hash=file_hash or self.file_hash,
+                           coords=frame[[LON, LAT]].to_numpy() if coords else None)
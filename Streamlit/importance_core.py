@@ -0,0 +1,136 @@
+"""
+特征重要性核心类库
+包含：ImportanceResult, PermutationImportance
+"""
+import copy
+import hashlib
+import os
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+
+from rf_core import SearchCache
+
+
+# 已计算的模型哈希（模型对象释放后自动移除）
+_MODEL_HASHES: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+@dataclass
+class ImportanceResult:
+    """置换重要性：importances 为 (特征数, 重复次数) 的得分下降量"""
+    feature_names: List[str]
+    baseline_score: float
+    importances: np.ndarray
+    elapsed: float
+    # 是否取自磁盘缓存（只反映 compute() 本身，上层如 st.cache_data 的命中需由调用方记录）
+    cached: bool = False
+
+    @property
+    def importances_mean(self) -> np.ndarray:
+        return self.importances.mean(axis=1)
+
+    @property
+    def importances_std(self) -> np.ndarray:
+        return self.importances.std(axis=1)
+
+    def to_frame(self) -> pd.DataFrame:
+        """按平均下降量从大到小排列"""
+        frame = pd.DataFrame({
+            "feature": self.feature_names,
+            "importance": self.importances_mean,
+            "std": self.importances_std,
+        })
+        return frame.sort_values("importance", ascending=False, ignore_index=True)
+
+
+class PermutationImportance:
+    """
+    测试集上的置换重要性：逐个打乱某一波段，得分下降越多说明模型越依赖该波段，
+    不像基于不纯度的 feature_importances_ 那样偏向取值多的波段。
+    - 基线预测只计算一次，所有（波段, 重复）任务共用
+    - 各任务在线程中并行（森林在任务内单线程预测，树的预测释放 GIL）
+    - 结果按（模型哈希, 数据哈希, 重复次数, 随机种子, 指标）缓存到磁盘，重绘图表时直接读取
+    每个任务的随机排列只由 (random_state, 波段序号, 重复序号) 决定，与并行方式无关
+    """
+
+    def __init__(self, n_repeats: int = 10, random_state: int = 42, n_jobs: int = -1,
+                 metric: Callable = accuracy_score, cache_dir: Optional[str] = None):
+        self.n_repeats = n_repeats
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.metric = metric
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def model_hash(estimator) -> str:
+        """训练结果的哈希：只取决于各棵树与影响预测的参数，与 n_jobs 等运行参数无关"""
+        if estimator in _MODEL_HASHES:
+            return _MODEL_HASHES[estimator]
+        params = {k: v for k, v in estimator.get_params().items() if k not in SearchCache.IGNORED_PARAMS}
+        trees = []
+        for tree in estimator.estimators_:
+            state = tree.tree_.__getstate__()
+            # nodes 为结构化数组，字段间的填充字节未初始化（拷贝、从磁盘加载后不同），按字段取值再哈希
+            nodes = state.pop("nodes")
+            trees.append((state, [nodes[name] for name in nodes.dtype.names]))
+        digest = joblib.hash((type(estimator).__name__, params, estimator.classes_, trees))
+        _MODEL_HASHES[estimator] = digest
+        return digest
+
+    def cache_path(self, estimator, X, y) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha256("|".join([
+            self.model_hash(estimator), SearchCache.data_hash(X, y),
+            str(self.n_repeats), str(self.random_state), getattr(self.metric, "__name__", repr(self.metric)),
+        ]).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, "importance", f"{key}.joblib")
+
+    def _score_permuted(self, model, X: np.ndarray, y: np.ndarray, feature: int, repeat: int) -> float:
+        rng = np.random.default_rng([self.random_state, feature, repeat])
+        X_permuted = X.copy()
+        X_permuted[:, feature] = X[rng.permutation(len(X)), feature]
+        return self.metric(y, model.predict(X_permuted))
+
+    def compute(self, estimator, X, y, feature_names: Optional[Sequence[str]] = None,
+                baseline_pred=None) -> ImportanceResult:
+        """
+        计算各特征的置换重要性（得分下降量），命中缓存时直接返回
+        baseline_pred 为模型在 X 上已有的预测（如测试集评估时算过的 y_pred），传入则不再重复预测
+        """
+        names = list(feature_names) if feature_names is not None else \
+            [str(c) for c in getattr(X, "columns", range(np.shape(X)[1]))]
+        path = self.cache_path(estimator, X, y)
+        if path is not None and os.path.exists(path):
+            result = joblib.load(path)
+            result.cached = True
+            return result
+
+        started = time.perf_counter()
+        # 按列位置预测 ndarray；浅拷贝后改为单线程，并行发生在任务之间
+        model = copy.copy(estimator).set_params(n_jobs=1)
+        model.__dict__.pop("feature_names_in_", None)
+        X_array = np.ascontiguousarray(X, dtype=np.float32)
+        y_array = np.asarray(y)
+        if baseline_pred is None:
+            baseline_pred = model.predict(X_array)
+        baseline = self.metric(y_array, baseline_pred)
+
+        tasks = [(feature, repeat) for feature in range(X_array.shape[1]) for repeat in range(self.n_repeats)]
+        scores = joblib.Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            joblib.delayed(self._score_permuted)(model, X_array, y_array, feature, repeat)
+            for feature, repeat in tasks
+        )
+        importances = baseline - np.asarray(scores, dtype=np.float64).reshape(X_array.shape[1], self.n_repeats)
+        result = ImportanceResult(feature_names=names, baseline_score=float(baseline),
+                                  importances=importances, elapsed=time.perf_counter() - started)
+        if path is not None:
+            SearchCache._dump(result, path)
+        return result
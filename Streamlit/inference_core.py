@@ -0,0 +1,261 @@
+"""
+随机森林导出与分块推理核心类库
+包含：FlatForest, ChunkedPredictor, export_model, export_archive, load_model
+"""
+import copy
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+
+
+# 导出目录中的文件
+MODEL_FILE = "model.joblib"
+FOREST_FILE = "forest.npz"
+META_FILE = "model.json"
+
+
+@dataclass
+class FlatForest:
+    """
+    展平的随机森林：所有树的节点拼接为几个定长数组（npz 保存，不依赖 pickle 与 sklearn）
+    - left / right：子节点的全局编号，叶节点指向自身
+    - threshold：按 float32 向下取整保存，对 float32 输入与 sklearn 的 float64 阈值比较结果完全相同
+    - value：各节点的类别概率（float32）
+    预测为逐层向量化遍历（NumPy），用于脱离 sklearn 的部署与结果核对；
+    同一环境中 sklearn 的编译实现更快，ChunkedPredictor 默认使用 sklearn 模型
+    """
+    roots: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    feature: np.ndarray
+    threshold: np.ndarray
+    value: np.ndarray
+    classes: np.ndarray
+    depth: int
+    feature_names: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_estimator(cls, forest: RandomForestClassifier,
+                       feature_names: Optional[Sequence[str]] = None) -> "FlatForest":
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        left, right, feature, threshold, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left < 0
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            # 对 float32 的 x：x <= t64 等价于 x <= （不大于 t64 的最大 float32）
+            t32 = tree.threshold.astype(np.float32)
+            t32 = np.where(t32.astype(np.float64) > tree.threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+            threshold.append(np.where(leaf, np.float32(np.inf), t32))
+            proba = tree.value[:, 0, :]
+            value.append(proba / proba.sum(axis=1, keepdims=True))
+        names = list(feature_names) if feature_names is not None else \
+            [str(name) for name in getattr(forest, "feature_names_in_", range(forest.n_features_in_))]
+        return cls(
+            roots=offsets[:-1].astype(np.int32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            value=np.concatenate(value).astype(np.float32),
+            classes=np.asarray(forest.classes_),
+            depth=max(estimator.get_depth() for estimator in forest.estimators_),
+            feature_names=names,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.left)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.roots, self.left, self.right, self.feature, self.threshold, self.value))
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path, roots=self.roots, left=self.left, right=self.right, feature=self.feature,
+            threshold=self.threshold, value=self.value, classes=self.classes,
+            depth=np.int32(self.depth), feature_names=np.array(self.feature_names, dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FlatForest":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                roots=data["roots"], left=data["left"], right=data["right"], feature=data["feature"],
+                threshold=data["threshold"], value=data["value"], classes=data["classes"],
+                depth=int(data["depth"]), feature_names=data["feature_names"].tolist(),
+            )
+
+    def predict_proba(self, X) -> np.ndarray:
+        """逐棵树、逐层推进所有样本所在节点，全部到达叶节点后累加概率"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        flat = X.ravel()
+        base = np.arange(n, dtype=np.int64) * n_features
+        proba = np.zeros((n, self.value.shape[1]), dtype=np.float32)
+        for root in self.roots:
+            node = np.full(n, root, dtype=np.int32)
+            for _ in range(self.depth):
+                go_left = flat[base + self.feature[node]] <= self.threshold[node]
+                step = np.where(go_left, self.left[node], self.right[node])
+                if np.array_equal(step, node):
+                    break
+                node = step
+            proba += self.value[node]
+        return proba / self.n_trees
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class ChunkedPredictor:
+    """
+    分块并行预测：输入为 (像元数, 波段数) 的数组（可为 np.load(..., mmap_mode="r") 的内存映射），
+    按 chunk_rows 行切块，线程池中各块独立预测并写入输出数组。
+    sklearn 森林在块内单线程运行（树的预测释放 GIL），并行发生在块之间，
+    内存占用只与块大小和线程数有关，与影像大小无关；含 NaN 的像元输出 nodata
+    """
+
+    def __init__(self, model, chunk_rows: int = 262_144, n_threads: Optional[int] = None, nodata: int = 255):
+        if isinstance(model, RandomForestClassifier):
+            # 浅拷贝后改为块内单线程，不修改调用方的模型；
+            # 按列位置预测 ndarray 分块，去掉训练时的列名以免每块都发出警告
+            model = copy.copy(model).set_params(n_jobs=1)
+            model.__dict__.pop("feature_names_in_", None)
+        self.model = model
+        self.chunk_rows = chunk_rows
+        self.n_threads = n_threads or joblib.cpu_count()
+        self.nodata = nodata
+
+    @property
+    def classes(self) -> np.ndarray:
+        model = self.model
+        return np.asarray(model.classes_ if hasattr(model, "classes_") else model.classes)
+
+    def output_dtype(self) -> np.dtype:
+        """能容纳全部类别与 nodata 的最小整数类型"""
+        return np.result_type(np.min_scalar_type(self.nodata), self.classes.dtype)
+
+    def predict_pixels(self, X) -> np.ndarray:
+        """预测一块 (像元数, 波段数) 的像元，含 NaN 的像元输出 nodata"""
+        X = np.asarray(X, dtype=np.float32)
+        valid = ~np.isnan(X).any(axis=1)
+        labels = np.full(len(X), self.nodata, dtype=self.output_dtype())
+        if valid.any():
+            labels[valid] = self.model.predict(X[valid])
+        return labels
+
+    def _predict_chunk(self, bands, out, start: int, stop: int) -> int:
+        labels = self.predict_pixels(bands[start:stop])
+        out[start:stop] = labels
+        return int((labels != self.nodata).sum())
+
+    def predict(self, bands, out=None,
+                on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        预测全部像元，结果写入 out（默认新建数组；也可传入 open_memmap 的输出文件）
+        on_progress(已完成像元数, 总像元数) 在每块完成后回调
+        返回统计：pixels, valid, nodata, seconds, pixels_per_second, output
+        """
+        n = len(bands)
+        if out is None:
+            out = np.empty(n, dtype=self.output_dtype())
+        bounds = [(start, min(start + self.chunk_rows, n)) for start in range(0, n, self.chunk_rows)]
+        started = time.perf_counter()
+        done = valid = 0
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            futures = {executor.submit(self._predict_chunk, bands, out, start, stop): stop - start
+                       for start, stop in bounds}
+            for future in as_completed(futures):
+                valid += future.result()
+                done += futures[future]
+                if on_progress is not None:
+                    on_progress(done, n)
+        seconds = time.perf_counter() - started
+        if hasattr(out, "flush"):
+            out.flush()
+        return {
+            "pixels": n,
+            "valid": valid,
+            "nodata": n - valid,
+            "seconds": round(seconds, 3),
+            "pixels_per_second": round(n / seconds, 1) if seconds > 0 else 0.0,
+            "output": out,
+        }
+
+
+def export_model(estimator: RandomForestClassifier, directory: str, feature_names: Sequence[str],
+                 class_names: Optional[Sequence[str]] = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """
+    导出最佳模型：model.joblib（sklearn 对象）、forest.npz（展平数组）、model.json（特征顺序、类别与参数）
+    返回各文件路径
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, name) for name in (MODEL_FILE, FOREST_FILE, META_FILE)}
+    joblib.dump(estimator, paths[MODEL_FILE], compress=3)
+    flat = FlatForest.from_estimator(estimator, feature_names)
+    flat.save(paths[FOREST_FILE])
+
+    classes = np.asarray(estimator.classes_).tolist()
+    meta = {
+        "features": list(feature_names),
+        "classes": classes,
+        "class_names": list(class_names) if class_names is not None else [str(c) for c in classes],
+        "params": {k: v for k, v in estimator.get_params().items() if k != "n_jobs"},
+        "n_trees": flat.n_trees,
+        "n_nodes": flat.n_nodes,
+        "max_depth": flat.depth,
+        "sklearn_version": sklearn.__version__,
+        "exported_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        **(metadata or {}),
+    }
+    with open(paths[META_FILE], "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+    return paths
+
+
+def export_archive(estimator: RandomForestClassifier, feature_names: Sequence[str],
+                   class_names: Optional[Sequence[str]] = None,
+                   metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """导出为 ZIP（内容同 export_model），供下载"""
+    buffer = io.BytesIO()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = export_model(estimator, directory, feature_names, class_names, metadata)
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+            for name, path in paths.items():
+                zf.write(path, name)
+    return buffer.getvalue()
+
+
+def load_model(directory: str, engine: str = "sklearn"):
+    """
+    读取导出目录，返回 (模型, 元数据)
+    engine="sklearn" 读取 model.joblib；engine="flat" 读取 forest.npz（无需 pickle）
+    """
+    with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    if engine == "sklearn":
+        return joblib.load(os.path.join(directory, MODEL_FILE)), meta
+    if engine == "flat":
+        return FlatForest.load(os.path.join(directory, FOREST_FILE)), meta
+    raise ValueError(f"未知推理引擎 {engine!r}")
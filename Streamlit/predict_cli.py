@@ -0,0 +1,86 @@
+"""
+随机森林分块推理命令行工具
+
+读取应用导出的模型（解压后的目录，含 model.joblib / forest.npz / model.json），
+对 (像元数, 波段数) 的 .npy 波段数组按块并行预测，结果写入 .npy（内存映射，逐块落盘），
+并报告吞吐量（像元/秒）。波段顺序须与 model.json 中的 features 一致，含 NaN 的像元输出 nodata。
+
+示例（在 Streamlit 目录下）：
+    python predict_cli.py exports/rf_model pixels.npy -o labels.npy
+    python predict_cli.py exports/rf_model pixels.npy -o labels.npy --threads 8 --chunk-rows 131072
+    python predict_cli.py exports/rf_model pixels.npy -o labels.npy --engine flat --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from inference_core import ChunkedPredictor, load_model
+
+
+class ProgressReporter:
+    """按固定间隔向标准错误输出进度与吞吐量"""
+
+    def __init__(self, interval: float = 1.0, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def __call__(self, done: int, total: int) -> None:
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval or done == total:
+            self._last_report = now
+            rate = done / (now - self.started) if now > self.started else 0.0
+            print(f"已完成 {done}/{total} 像元（{rate:,.0f} 像元/秒）", file=self.stream)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="使用导出的随机森林对波段数组分块预测")
+    parser.add_argument("model", help="导出目录（含 model.json）")
+    parser.add_argument("input", help="(像元数, 波段数) 的 .npy 文件")
+    parser.add_argument("-o", "--output", required=True, help="输出标签 .npy 文件")
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default="sklearn",
+                        help="sklearn 读取 model.joblib；flat 读取 forest.npz（纯 NumPy，无需 pickle）")
+    parser.add_argument("--threads", type=int, default=None, help="线程数（默认 CPU 核数）")
+    parser.add_argument("--chunk-rows", type=int, default=262_144, help="每块像元数")
+    parser.add_argument("--nodata", type=int, default=255, help="含 NaN 像元的输出值")
+    parser.add_argument("--json", action="store_true", help="完成后以 JSON 输出统计信息")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        model, meta = load_model(args.model, args.engine)
+        bands = np.load(args.input, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    if bands.ndim != 2 or bands.shape[1] != len(meta["features"]):
+        print(f"❌ 输入形状应为 (像元数, {len(meta['features'])})，实际为 {bands.shape}；"
+              f"波段顺序：{', '.join(meta['features'])}", file=sys.stderr)
+        return 2
+
+    predictor = ChunkedPredictor(model, chunk_rows=args.chunk_rows, n_threads=args.threads, nodata=args.nodata)
+    out = np.lib.format.open_memmap(args.output, mode="w+", dtype=predictor.output_dtype(), shape=(len(bands),))
+    stats = predictor.predict(bands, out, on_progress=ProgressReporter())
+    stats.pop("output")
+    stats.update(engine=args.engine, threads=predictor.n_threads, chunk_rows=args.chunk_rows)
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False))
+    else:
+        print(
+            f"✅ 共 {stats['pixels']} 像元（nodata {stats['nodata']}），用时 {stats['seconds']} 秒，"
+            f"{stats['pixels_per_second']:,.0f} 像元/秒（{args.engine}，{predictor.n_threads} 线程）→ {args.output}",
+            file=sys.stderr,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+影像分块分类核心类库
+包含：BandStack, RasterClassifier, compute_ndvi
+"""
+import math
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+from inference_core import ChunkedPredictor
+
+try:
+    import rasterio
+    from rasterio.errors import NotGeoreferencedWarning
+    from rasterio.windows import Window
+except ImportError:  # 未安装 rasterio 时只支持 .npy 波段堆栈
+    rasterio = None
+
+
+# 扩展名 → 格式
+RASTER_FORMATS = {".npy": "npy", ".tif": "geotiff", ".tiff": "geotiff"}
+NDVI = "NDVI"
+
+
+def compute_ndvi(red: np.ndarray, nir: np.ndarray) -> np.ndarray:
+    """NDVI = (B8 - B4) / (B8 + B4)，分母为 0 时为 NaN（按 nodata 输出）"""
+    red = red.astype(np.float32, copy=False)
+    nir = nir.astype(np.float32, copy=False)
+    total = nir + red
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total != 0, (nir - red) / total, np.float32(np.nan)).astype(np.float32, copy=False)
+
+
+class BandStack:
+    """
+    多波段影像的窗口读取，不整体载入内存
+    - .npy：形状 (波段数, 行数, 列数)，以内存映射打开
+    - GeoTIFF：rasterio 按窗口读取（需安装 rasterio），波段名默认取波段描述
+    band_names 为各波段的名称（顺序与文件中的波段一致）
+    """
+
+    def __init__(self, path: str, band_names: Optional[Sequence[str]] = None):
+        self.path = path
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in RASTER_FORMATS:
+            raise ValueError(f"不支持的影像类型 {ext!r}，可用：{', '.join(RASTER_FORMATS)}")
+        self.format = RASTER_FORMATS[ext]
+        self.dataset = None
+        self.array = None
+        # GeoTIFF 的数据集句柄不能在多个线程中同时读取
+        self._lock = threading.Lock()
+        if self.format == "npy":
+            self.array = np.load(path, mmap_mode="r")
+            if self.array.ndim != 3:
+                raise ValueError(f".npy 波段堆栈应为 (波段数, 行数, 列数)，实际为 {self.array.shape}")
+            self.n_bands, self.rows, self.cols = self.array.shape
+            descriptions = [None] * self.n_bands
+        else:
+            if rasterio is None:
+                raise ImportError("读取 GeoTIFF 需要安装 rasterio：pip install rasterio")
+            self.dataset = rasterio.open(path)
+            self.n_bands, self.rows, self.cols = self.dataset.count, self.dataset.height, self.dataset.width
+            descriptions = list(self.dataset.descriptions)
+        if band_names is None:
+            band_names = [name or f"band{i + 1}" for i, name in enumerate(descriptions)]
+        if len(band_names) != self.n_bands:
+            raise ValueError(f"影像有 {self.n_bands} 个波段，但给出了 {len(band_names)} 个波段名")
+        self.band_names = list(band_names)
+
+    def __enter__(self) -> "BandStack":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.dataset is not None:
+            self.dataset.close()
+            self.dataset = None
+        # 释放内存映射，之后即可删除文件（Windows 上仍被映射的文件无法删除）
+        self.array = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def profile(self) -> Optional[Dict[str, Any]]:
+        """GeoTIFF 的地理参考（输出时沿用）"""
+        return dict(self.dataset.profile) if self.dataset is not None else None
+
+    def read(self, indexes: Sequence[int], row: int, col: int, height: int, width: int) -> np.ndarray:
+        """读取一个窗口中指定波段（0 起）的数据，返回 (波段数, height, width)"""
+        if self.array is not None:
+            return np.asarray(self.array[list(indexes), row:row + height, col:col + width])
+        with self._lock:
+            data = self.dataset.read([i + 1 for i in indexes], window=Window(col, row, width, height),
+                                     masked=True)
+        # 影像自身的 nodata 按 NaN 处理
+        return data.astype(np.float32).filled(np.nan)
+
+
+class RasterClassifier:
+    """
+    整景影像分块分类：按 tile_size × tile_size 的窗口读取波段，按模型的特征顺序组织
+    （NDVI 缺失时由 B4/B8 即时计算），线程池中逐块预测并写入输出（.npy 内存映射或分块 GeoTIFF），
+    同时生成降采样预览。内存占用只与分块大小和线程数有关
+    """
+
+    def __init__(self, model, features: Sequence[str], tile_size: int = 512, n_threads: Optional[int] = None,
+                 nodata: int = 255, scale: float = 1.0, preview_size: int = 512):
+        self.predictor = ChunkedPredictor(model, nodata=nodata)
+        self.features = list(features)
+        self.tile_size = tile_size
+        self.n_threads = n_threads or joblib.cpu_count()
+        self.nodata = nodata
+        # 波段值乘以 scale 后应与训练样本同一尺度（如 L2A 数字量 × 0.0001 为反射率）
+        self.scale = scale
+        self.preview_size = preview_size
+
+    @staticmethod
+    def available_outputs() -> Dict[str, str]:
+        """当前环境可用的输出格式 {名称: 扩展名}"""
+        outputs = {"GeoTIFF": ".tif"} if rasterio is not None else {}
+        outputs["NumPy (.npy)"] = ".npy"
+        return outputs
+
+    def band_plan(self, band_names: Sequence[str]) -> Tuple[List[int], bool]:
+        """
+        模型特征对应的影像波段序号，以及是否需要即时计算 NDVI
+        影像自带 NDVI 波段时直接读取，否则读取 B4 / B8 计算
+        """
+        names = list(band_names)
+        compute = NDVI in self.features and NDVI not in names
+        required = [f for f in self.features if not (compute and f == NDVI)]
+        if compute:
+            required += [b for b in ("B4", "B8") if b not in required]
+        missing = [name for name in required if name not in names]
+        if missing:
+            raise ValueError(f"影像缺少模型需要的波段：{', '.join(missing)}（影像波段：{', '.join(names)}）")
+        return [names.index(name) for name in required], compute
+
+    def windows(self, rows: int, cols: int) -> Iterator[Tuple[int, int, int, int]]:
+        for row in range(0, rows, self.tile_size):
+            for col in range(0, cols, self.tile_size):
+                yield row, col, min(self.tile_size, rows - row), min(self.tile_size, cols - col)
+
+    def _features(self, stack: BandStack, indexes: List[int], compute_ndvi_band: bool,
+                  window: Tuple[int, int, int, int]) -> np.ndarray:
+        """读取一个窗口并整理为 (像元数, 特征数)，列顺序与模型一致"""
+        row, col, height, width = window
+        data = stack.read(indexes, row, col, height, width).astype(np.float32, copy=False)
+        if self.scale != 1.0:
+            data = data * np.float32(self.scale)
+        names = [stack.band_names[i] for i in indexes]
+        layers = {name: data[i] for i, name in enumerate(names)}
+        if compute_ndvi_band:
+            layers[NDVI] = compute_ndvi(layers["B4"], layers["B8"])
+        return np.stack([layers[f].ravel() for f in self.features], axis=1)
+
+    def _open_output(self, stack: BandStack, output_path: str):
+        """输出按扩展名：.npy 为内存映射数组，.tif 为分块（tiled）GeoTIFF，地理参考沿用输入"""
+        dtype = self.predictor.output_dtype()
+        if output_path.lower().endswith(".npy"):
+            return np.lib.format.open_memmap(output_path, mode="w+", dtype=dtype, shape=stack.shape)
+        if rasterio is None:
+            raise ImportError("输出 GeoTIFF 需要安装 rasterio：pip install rasterio")
+        profile = stack.profile or {}
+        block = max(16, min(self.tile_size, 512) // 16 * 16)
+        profile.update(driver="GTiff", count=1, dtype=np.dtype(dtype).name, nodata=self.nodata,
+                       height=stack.rows, width=stack.cols, tiled=True,
+                       blockxsize=block, blockysize=block, compress="deflate")
+        profile.pop("photometric", None)
+        with warnings.catch_warnings():
+            # .npy 输入没有地理参考，输出为普通的分块 TIFF
+            warnings.simplefilter("ignore", NotGeoreferencedWarning)
+            return rasterio.open(output_path, "w", **profile)
+
+    def classify(self, stack: BandStack, output_path: str,
+                 on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        分类整景影像，结果写入 output_path（.npy 或 .tif）
+        on_progress(已完成像元数, 总像元数) 在调用线程中按块回调
+        返回统计：pixels, nodata, seconds, pixels_per_second, class_counts, preview
+        """
+        indexes, compute = self.band_plan(stack.band_names)
+        step = max(1, math.ceil(max(stack.shape) / self.preview_size))
+        preview = np.full((math.ceil(stack.rows / step), math.ceil(stack.cols / step)), self.nodata,
+                          dtype=self.predictor.output_dtype())
+        counts = np.zeros(int(self.nodata) + 1, dtype=np.int64)
+        out = self._open_output(stack, output_path)
+        write_lock = threading.Lock()
+        total = stack.rows * stack.cols
+
+        def run(window):
+            row, col, height, width = window
+            labels = self.predictor.predict_pixels(self._features(stack, indexes, compute, window))
+            labels = labels.reshape(height, width)
+            with write_lock:
+                if isinstance(out, np.ndarray):
+                    out[row:row + height, col:col + width] = labels
+                else:
+                    out.write(labels, 1, window=Window(col, row, width, height))
+            # 预览取全局坐标为 step 整数倍的像元
+            r0, c0 = -(-row // step) * step, -(-col // step) * step
+            preview[r0 // step:(row + height + step - 1) // step, c0 // step:(col + width + step - 1) // step] = \
+                labels[r0 - row::step, c0 - col::step]
+            return height * width, np.bincount(labels.ravel(), minlength=len(counts))
+
+        started = time.perf_counter()
+        done = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+                futures = [executor.submit(run, window) for window in self.windows(stack.rows, stack.cols)]
+                for future in as_completed(futures):
+                    n, tile_counts = future.result()
+                    done += n
+                    counts += tile_counts
+                    if on_progress is not None:
+                        on_progress(done, total)
+        finally:
+            if isinstance(out, np.ndarray):
+                out.flush()
+            else:
+                out.close()
+        seconds = time.perf_counter() - started
+        return {
+            "pixels": total,
+            "nodata": int(counts[self.nodata]),
+            "seconds": round(seconds, 3),
+            "pixels_per_second": round(total / seconds, 1) if seconds > 0 else 0.0,
+            "class_counts": {int(c): int(n) for c, n in enumerate(counts[:self.nodata]) if n},
+            "preview": preview,
+        }
@@ -0,0 +1,877 @@
+"""
+随机森林调参核心类库
+包含：spatial_blocks, SearchResult, ExecutionPlan, SearchCache, WarmStartGridSearch, ForestTuner, TrainingJob, JobRegistry
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import get_scorer
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401  启用 HalvingGridSearchCV
+from sklearn.model_selection import (
+    GridSearchCV, HalvingGridSearchCV, ParameterGrid, ParameterSampler,
+    StratifiedGroupKFold, StratifiedKFold, cross_val_score,
+)
+from sklearn.utils import _safe_indexing
+from scipy.stats import rankdata
+from threadpoolctl import threadpool_limits
+
+try:
+    import optuna
+except ImportError:  # 贝叶斯优化为可选功能
+    optuna = None
+
+
+# 每度纬度对应的公里数（球面近似）
+KM_PER_DEGREE = 111.32
+
+
+def spatial_blocks(coords, block_km: float) -> np.ndarray:
+    """
+    按经纬度网格划分空间块，块边长约 block_km 公里（经度方向按平均纬度换算）
+    返回每个样本所在块的编号（0..块数-1），作为分组交叉验证的 groups：
+    相邻像元落在同一块内，不会同时出现在训练折与验证折中
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    lat = np.deg2rad(coords[:, 1].mean())
+    size = block_km / KM_PER_DEGREE / np.array([max(np.cos(lat), 1e-6), 1.0])
+    cells = np.floor((coords - coords.min(axis=0)) / size).astype(np.int64)
+    _, groups = np.unique(cells, axis=0, return_inverse=True)
+    return groups.ravel()
+
+
+@dataclass
+class SearchResult:
+    """一次参数搜索的结果"""
+    strategy: str
+    best_params: Dict[str, Any]
+    best_score: float
+    best_estimator: RandomForestClassifier
+    # 交叉验证拟合次数（不含最终重训）
+    n_fits: int
+    # 交叉验证中构建的决策树总数（各次拟合的 n_estimators 之和）
+    n_trees: int
+    # 总耗时（秒，含最终重训）
+    elapsed: float
+    # 每个候选参数一行：params, mean_test_score, std_test_score, n_estimators_used
+    cv_results: pd.DataFrame
+    # 直接取自缓存的拟合次数
+    n_cached_fits: int = 0
+
+
+@dataclass
+class ExecutionPlan:
+    """
+    两级并行的划分：cv_jobs 个交叉验证任务（参数组合 × 折）同时运行，
+    每个任务内的森林用 tree_jobs 个线程建树，两者之积不超过核心数。
+    两级都使用线程（建树时释放 GIL），进度回调与取消事件可直接共享；
+    BLAS/OpenMP 线程限制为 blas_threads，避免与建树线程争抢核心。
+    """
+    n_cores: int
+    cv_jobs: int
+    tree_jobs: int
+    blas_threads: int = 1
+    backend: str = "threading"
+
+    # 每个建树线程至少分到的“树 × 训练样本数”：样本少时单棵树只需亚毫秒，
+    # 线程调度开销占主导，应把核心留给外层的交叉验证任务
+    MIN_TREE_WORK_PER_THREAD = 50_000
+
+    @classmethod
+    def plan(cls, n_tasks: int, n_estimators: int, n_samples: int,
+             n_cores: Optional[int] = None) -> "ExecutionPlan":
+        """
+        - 外层优先：任务数不少于核心数时，每个任务单线程建树，粒度最粗、开销最小
+        - 任务数不足时，剩余核心分给建树，但每个线程需分到足够的建树工作量
+        """
+        n_cores = max(1, n_cores or joblib.cpu_count())
+        cv_jobs = max(1, min(n_cores, n_tasks))
+        trees_per_thread = max(1, math.ceil(cls.MIN_TREE_WORK_PER_THREAD / max(n_samples, 1)))
+        tree_jobs = max(1, min(n_cores // cv_jobs, n_estimators // trees_per_thread))
+        return cls(n_cores=n_cores, cv_jobs=cv_jobs, tree_jobs=tree_jobs)
+
+    @property
+    def threads(self) -> int:
+        return self.cv_jobs * self.tree_jobs
+
+    def describe(self) -> str:
+        return f"CV 层 {self.cv_jobs} × 树层 {self.tree_jobs}（共 {self.n_cores} 核）"
+
+
+class SearchCancelled(Exception):
+    """训练任务已被取消"""
+
+
+class _ProgressScorer:
+    """
+    包装评分器：每次评分即完成一次交叉验证拟合，借此回调进度；
+    取消后在下一次评分时抛出 SearchCancelled 中止搜索（搜索需设置 error_score="raise"）
+    """
+
+    def __init__(self, scoring: str, progress: Optional[Callable[[int], None]] = None,
+                 cancel: Optional[threading.Event] = None):
+        self.scorer = get_scorer(scoring)
+        self.progress = progress
+        self.cancel = cancel
+
+    def check_cancelled(self) -> None:
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchCancelled()
+
+    def __call__(self, estimator, X, y, **kwargs):
+        self.check_cancelled()
+        score = self.scorer(estimator, X, y, **kwargs)
+        if self.progress is not None:
+            self.progress(1)
+        return score
+
+
+class _ProbaSumClassifier(ClassifierMixin, BaseEstimator):
+    """
+    以累加的森林概率代替森林本身参与评分：每棵新树的概率在增长时已累加，
+    评分时不再用整个森林重新预测（续训时前面的树也只保留了概率之和）
+    """
+
+    def __init__(self, classes, proba):
+        self.classes_ = classes
+        self.proba = proba
+
+    def predict_proba(self, X):
+        return self.proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.proba, axis=1), axis=0)
+
+
+class SearchCache:
+    """
+    参数搜索的磁盘缓存（joblib）
+    - 命名空间：清洗后训练数据的哈希 + 交叉验证与评分设置 + 估计器的固定参数
+    - 条目：每组参数一个文件，保存各折得分 {fold: score}；最佳模型另存
+    - 状态：增长中的森林在各检查点的测试折概率之和，新增更大的 n_estimators 时只需构建新增的树
+    参数网格不参与命名空间，而是逐条目查找，因此扩大网格时只需计算新增的组合
+    """
+
+    # 不影响结果的估计器参数
+    IGNORED_PARAMS = ("n_jobs", "verbose", "warm_start")
+
+    def __init__(self, cache_dir: str, namespace: str):
+        self.path = os.path.join(cache_dir, namespace)
+        self.hits = 0
+        self.misses = 0
+        self._scores: Dict[str, Dict[int, float]] = {}
+        # 各折任务可能在多个线程中同时读写同一组参数的条目
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_search(cls, cache_dir: str, X, y, estimator: RandomForestClassifier,
+                   param_names: Iterable[str], cv: Union[int, str], scoring: str) -> "SearchCache":
+        """cv 为折数，或描述划分方式的字符串（见 ForestTuner.cv_description）"""
+        fixed = {k: v for k, v in estimator.get_params().items()
+                 if k not in cls.IGNORED_PARAMS and k not in param_names}
+        settings = {"cv": cv if isinstance(cv, str) else f"StratifiedKFold({cv})",
+                    "scoring": scoring, "estimator": fixed}
+        digest = hashlib.sha256(cls.data_hash(X, y).encode())
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+        return cls(cache_dir, digest.hexdigest()[:32])
+
+    @staticmethod
+    def data_hash(X, y) -> str:
+        """按行顺序哈希特征与标签（行顺序影响交叉验证划分）"""
+        X, y = pd.DataFrame(X), pd.Series(np.asarray(y))
+        digest = hashlib.sha256()
+        digest.update(json.dumps([list(map(str, X.columns)), list(map(str, X.dtypes))]).encode())
+        digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+        digest.update(pd.util.hash_pandas_object(y, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def params_key(params: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+    def _file(self, kind: str, params: Dict[str, Any]) -> str:
+        return os.path.join(self.path, kind, f"{self.params_key(params)}.joblib")
+
+    def get_scores(self, params: Dict[str, Any]) -> Dict[int, float]:
+        """某组参数已缓存的各折得分"""
+        key = self.params_key(params)
+        with self._lock:
+            if key not in self._scores:
+                path = self._file("scores", params)
+                self._scores[key] = joblib.load(path) if os.path.exists(path) else {}
+            return self._scores[key]
+
+    def get_score(self, params: Dict[str, Any], fold: int) -> Optional[float]:
+        score = self.get_scores(params).get(fold)
+        with self._lock:
+            if score is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return score
+
+    def put_scores(self, params: Dict[str, Any], fold_scores: Dict[int, float]) -> None:
+        with self._lock:
+            scores = {**self.get_scores(params), **fold_scores}
+            self._scores[self.params_key(params)] = scores
+            self._dump(scores, self._file("scores", params))
+
+    def get_states(self, base_params: Dict[str, Any], fold: int) -> Dict[int, np.ndarray]:
+        """增长中的森林在各检查点的测试折概率之和 {n_estimators: 数组}，用于续训"""
+        path = self._file("states", base_params)
+        return joblib.load(path).get(fold, {}) if os.path.exists(path) else {}
+
+    def put_states(self, base_params: Dict[str, Any], fold: int, states: Dict[int, np.ndarray]) -> None:
+        path = self._file("states", base_params)
+        with self._lock:
+            all_states = joblib.load(path) if os.path.exists(path) else {}
+            all_states[fold] = {**all_states.get(fold, {}), **states}
+            self._dump(all_states, path)
+
+    def load_estimator(self, params: Dict[str, Any]) -> Optional[RandomForestClassifier]:
+        path = self._file("models", params)
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def save_estimator(self, params: Dict[str, Any], estimator: RandomForestClassifier) -> None:
+        self._dump(estimator, self._file("models", params))
+
+    @staticmethod
+    def _dump(value, path: str) -> None:
+        """先写临时文件再原子替换，多个会话同时写入时不会读到半个文件"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(value, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class WarmStartGridSearch:
+    """
+    复用森林的网格搜索：对其余参数的每个组合、每一折只训练一个 warm_start 森林，
+    依次增长到各个 n_estimators 检查点并评分。
+    warm_start 追加的树与一次性训练时使用相同的随机种子序列，因此每个检查点的森林
+    与单独训练的同规模森林完全相同，得分、排名与 GridSearchCV 一致，
+    而建树数量从 sum(n_estimators) 降为 max(n_estimators)。
+    属性与 GridSearchCV 对齐：cv_results_, best_params_, best_score_, best_index_, best_estimator_
+    n_jobs 为同时运行的（参数组合, 折）任务数（线程），森林自身的 n_jobs 决定任务内的建树线程
+    """
+
+    def __init__(self, estimator: RandomForestClassifier, param_grid: Dict[str, List[Any]],
+                 cv: int = 5, scoring: Any = "accuracy", refit: bool = True,
+                 cache: Optional[SearchCache] = None,
+                 progress: Optional[Callable[[int], None]] = None, n_jobs: int = 1,
+                 splits: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        # 评分名称或评分器（如 _ProgressScorer）
+        self.scoring = scoring
+        self.refit = refit
+        self.cache = cache
+        # 取自缓存的拟合不经过评分器，单独回调进度
+        self.progress = progress
+        self.n_jobs = n_jobs
+        # 预先计算的划分（如空间分组 K 折），默认为分层 K 折
+        self.splits = splits
+
+    @property
+    def checkpoints(self) -> List[int]:
+        return sorted(set(self.param_grid.get("n_estimators", [self.estimator.n_estimators])))
+
+    @property
+    def base_grid(self) -> List[Dict[str, Any]]:
+        """除 n_estimators 外的参数组合，每个组合对应一组增长中的森林"""
+        return list(ParameterGrid({k: v for k, v in self.param_grid.items() if k != "n_estimators"}))
+
+    @property
+    def n_trees(self) -> int:
+        """交叉验证中实际构建的决策树总数"""
+        return len(self.base_grid) * self.checkpoints[-1] * self.cv
+
+    def _splits(self, X, y) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if self.splits is not None:
+            return self.splits
+        return list(StratifiedKFold(n_splits=self.cv).split(X, y))
+
+    def _score_task(self, base_params: Dict[str, Any], train, test, X, y, checkpoints: List[int],
+                    resume: Optional[Tuple[int, np.ndarray]] = None) -> Dict[int, Tuple[float, np.ndarray]]:
+        """
+        一个（参数组合, 折）任务：增长同一个森林，返回各检查点的 (得分, 测试折上各树概率之和)
+        每个检查点只预测新增的树，按概率之和评分；
+        resume=(n, 概率之和) 时从缓存的前 n 棵树状态继续，只构建之后的树
+        """
+        scorer = get_scorer(self.scoring)
+        X_train, y_train = _safe_indexing(X, train), _safe_indexing(y, train)
+        X_test, y_test = _safe_indexing(X, test), _safe_indexing(y, test)
+        X_eval = np.ascontiguousarray(X_test, dtype=np.float32)
+
+        forest = clone(self.estimator).set_params(warm_start=True, **base_params)
+        built, total = resume if resume is not None else (0, None)
+        if built:
+            # 占位：warm_start 只按已有树的数量推进随机种子，之后的树与完整训练时相同
+            forest.estimators_ = [None] * built
+        results = {}
+        for n_estimators in checkpoints:
+            if isinstance(scorer, _ProgressScorer):
+                scorer.check_cancelled()
+            forest.set_params(n_estimators=n_estimators).fit(X_train, y_train)
+            for tree in forest.estimators_[built:]:
+                proba = tree.predict_proba(X_eval, check_input=False)
+                total = proba if total is None else total + proba
+            built = n_estimators
+            score = scorer(_ProbaSumClassifier(forest.classes_, total / built), X_test, y_test)
+            results[n_estimators] = (float(score), total.copy())
+        return results
+
+    def _plan_task(self, base_params: Dict[str, Any], fold: int) -> List[Tuple[List[int], Optional[Tuple]]]:
+        """
+        根据缓存确定需要训练的片段 [(检查点列表, 续训状态)]：
+        每个缺失的检查点从最近的已知状态继续增长，相邻的缺失检查点合并为同一个森林
+        """
+        if self.cache is None:
+            return [(self.checkpoints, None)]
+        missing = [n for n in self.checkpoints
+                   if self.cache.get_score({**base_params, "n_estimators": n}, fold) is None]
+        if not missing:
+            return []
+        states = self.cache.get_states(base_params, fold)
+        segments: List[Tuple[List[int], Optional[Tuple]]] = []
+        for n in missing:
+            start = max((m for m in states if m < n), default=0)
+            if segments and segments[-1][0][-1] >= start:
+                segments[-1][0].append(n)
+            else:
+                segments.append(([n], (start, states[start]) if start else None))
+        return segments
+
+    def _run_task(self, base_params: Dict[str, Any], fold: int, train, test,
+                  X, y) -> Tuple[Dict[int, float], int, int]:
+        """
+        执行（或从缓存读取）一个任务，返回 (所有检查点在该折的得分, 构建的树数, 取自缓存的拟合数)
+        任务可能在工作线程中运行，计数由 fit 汇总
+        """
+        results, n_built = {}, 0
+        for checkpoints, resume in self._plan_task(base_params, fold):
+            results.update(self._score_task(base_params, train, test, X, y, checkpoints, resume))
+            n_built += checkpoints[-1] - (resume[0] if resume else 0)
+        n_cached = len(self.checkpoints) - len(results)
+        if self.progress is not None and n_cached:
+            self.progress(n_cached)
+        if self.cache is None:
+            return {n: score for n, (score, _) in results.items()}, n_built, n_cached
+
+        for n_estimators, (score, _) in results.items():
+            self.cache.put_scores({**base_params, "n_estimators": n_estimators}, {fold: score})
+        if results:
+            self.cache.put_states(base_params, fold, {n: state for n, (_, state) in results.items()})
+        scores = {n: self.cache.get_scores({**base_params, "n_estimators": n})[fold] for n in self.checkpoints}
+        return scores, n_built, n_cached
+
+    def fit(self, X, y) -> "WarmStartGridSearch":
+        splits = self._splits(X, y)
+        base_grid = self.base_grid
+        tasks = [(base_params, fold, train, test)
+                 for base_params in base_grid for fold, (train, test) in enumerate(splits)]
+        outputs = joblib.Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            joblib.delayed(self._run_task)(base_params, fold, train, test, X, y)
+            for base_params, fold, train, test in tasks
+        )
+        self.n_trees_built_ = sum(n_built for _, n_built, _ in outputs)
+        self.n_cached_fits_ = sum(n_cached for _, _, n_cached in outputs)
+
+        fold_scores: Dict[Tuple, List[float]] = {}
+        for i, base_params in enumerate(base_grid):
+            per_fold = [scores for scores, _, _ in outputs[i * len(splits):(i + 1) * len(splits)]]
+            for n_estimators in self.checkpoints:
+                fold_scores[self._signature({**base_params, "n_estimators": n_estimators})] = \
+                    [scores[n_estimators] for scores in per_fold]
+        self._build_results(fold_scores, X, y)
+        return self
+
+    @staticmethod
+    def _signature(params: Dict[str, Any]) -> Tuple:
+        return tuple(sorted(params.items(), key=lambda item: item[0]))
+
+    def _build_results(self, fold_scores: Dict[Tuple, List[float]], X, y) -> None:
+        """按 ParameterGrid 顺序整理结果，排名与最佳参数的选择规则同 GridSearchCV"""
+        params = list(ParameterGrid(self.param_grid))
+        scores = np.array([fold_scores[self._signature(p)] for p in params])
+        means = np.average(scores, axis=1)
+        stds = np.sqrt(np.average((scores - means[:, np.newaxis]) ** 2, axis=1))
+        ranks = rankdata(-means, method="min").astype(np.int32)
+
+        self.cv_results_ = {"params": params}
+        for i in range(scores.shape[1]):
+            self.cv_results_[f"split{i}_test_score"] = scores[:, i]
+        self.cv_results_.update(mean_test_score=means, std_test_score=stds, rank_test_score=ranks)
+
+        self.best_index_ = int(ranks.argmin())
+        self.best_params_ = params[self.best_index_]
+        self.best_score_ = float(means[self.best_index_])
+        if self.refit:
+            self.best_estimator_ = self.cache.load_estimator(self.best_params_) if self.cache else None
+            if self.best_estimator_ is None:
+                self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+                if self.cache is not None:
+                    self.cache.save_estimator(self.best_params_, self.best_estimator_)
+
+
+class ForestTuner:
+    """
+    随机森林参数搜索
+    - grid：穷举网格（默认由 WarmStartGridSearch 复用森林，结果与 GridSearchCV 相同）
+    - halving：逐次减半，以 n_estimators 作为资源，先用少量树淘汰大部分组合
+    - random：在网格内随机抽样，达到时间预算即停止
+    - bayes：基于 optuna TPE 的贝叶斯优化（需安装 optuna）
+    所有策略使用相同的分层 K 折与随机种子，同一组参数的得分与网格搜索完全一致
+    n_jobs 为可用的核心数（-1 为全部），每次搜索由 ExecutionPlan 在 CV 层与树层之间划分；
+    传入 execution 时固定使用该划分（用于基准测试对照）
+    """
+
+    STRATEGIES = {
+        "grid": "网格搜索 (Grid)",
+        "halving": "逐次减半 (Successive Halving)",
+        "random": "随机搜索 (限时)",
+        "bayes": "贝叶斯优化 (Optuna)",
+    }
+
+    def __init__(self, param_grid: Dict[str, List[Any]], cv: int = 5, scoring: str = "accuracy",
+                 random_state: int = 42, n_jobs: int = -1, cache_dir: Optional[str] = None,
+                 execution: Optional[ExecutionPlan] = None):
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.execution = execution
+        # 当前搜索的并行划分（见 plan_execution）与交叉验证划分
+        self.plan: Optional[ExecutionPlan] = None
+        self.splits: Optional[List[Tuple[np.ndarray, np.ndarray]]] = None
+        # 设置后 grid / random / bayes 的逐折得分与最佳模型写入磁盘缓存（halving 的资源数不固定，不缓存）
+        self.cache_dir = cache_dir
+        self.cache: Optional[SearchCache] = None
+        # 当前搜索使用的评分器与进度回调（见 search）
+        self.scorer: Any = scoring
+        self.progress: Optional[Callable[[int], None]] = None
+
+    @staticmethod
+    def available_strategies() -> Dict[str, str]:
+        """当前环境可用的策略"""
+        return {key: name for key, name in ForestTuner.STRATEGIES.items()
+                if key != "bayes" or optuna is not None}
+
+    @property
+    def candidates(self) -> List[Dict[str, Any]]:
+        """网格中的全部参数组合（ParameterGrid 顺序）"""
+        return list(ParameterGrid(self.param_grid))
+
+    @property
+    def grid_fits(self) -> int:
+        """穷举网格的交叉验证拟合次数"""
+        return len(self.candidates) * self.cv
+
+    @property
+    def grid_trees(self) -> int:
+        """穷举网格（warm_start 复用森林）在交叉验证中构建的决策树总数"""
+        return WarmStartGridSearch(self.make_estimator(), self.param_grid, cv=self.cv).n_trees
+
+    @property
+    def naive_grid_trees(self) -> int:
+        """每组参数单独训练（GridSearchCV）时构建的决策树总数"""
+        return sum(p["n_estimators"] for p in self.candidates) * self.cv
+
+    def make_estimator(self, **params) -> RandomForestClassifier:
+        tree_jobs = self.plan.tree_jobs if self.plan is not None else self.n_jobs
+        return RandomForestClassifier(random_state=self.random_state, n_jobs=tree_jobs, **params)
+
+    def plan_execution(self, strategy: str, n_samples: int, engine: str = "warm_start") -> ExecutionPlan:
+        """
+        按策略可同时运行的任务数划分并行
+        - grid：warm_start 引擎每个（其余参数组合, 折）一个任务；GridSearchCV 每个（组合, 折）一个任务
+        - halving：首轮的（组合, 折）
+        - random / bayes：逐组评估，只有各折可并行
+        """
+        if self.execution is not None:
+            return self.execution
+        n_base = len(list(ParameterGrid({k: v for k, v in self.param_grid.items() if k != "n_estimators"})))
+        if strategy == "grid" and engine == "warm_start" or strategy == "halving":
+            n_tasks = n_base * self.cv
+        elif strategy == "grid":
+            n_tasks = self.grid_fits
+        else:
+            n_tasks = self.cv
+        n_train = n_samples * (self.cv - 1) // self.cv
+        return ExecutionPlan.plan(n_tasks, max(self.param_grid["n_estimators"]), n_train,
+                                  n_cores=joblib.effective_n_jobs(self.n_jobs))
+
+    def cv_splitter(self, groups=None):
+        """
+        无分组时与 GridSearchCV(cv=5) 对分类器的默认划分一致；
+        有分组（如空间块）时同一组的样本只出现在同一折，并尽量保持各折的类别比例
+        """
+        if groups is None:
+            return StratifiedKFold(n_splits=self.cv)
+        return StratifiedGroupKFold(n_splits=self.cv)
+
+    def cv_description(self, groups=None) -> str:
+        """交叉验证划分的描述（缓存命名空间的一部分，分组不同则得分不同）"""
+        if groups is None:
+            return f"StratifiedKFold({self.cv})"
+        digest = hashlib.sha256(np.asarray(groups, dtype=np.int64).tobytes()).hexdigest()[:16]
+        return f"StratifiedGroupKFold({self.cv}, groups={digest})"
+
+    def make_splits(self, X, y, groups=None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        if groups is not None and len(np.unique(groups)) < self.cv:
+            raise ValueError(f"空间块数量 ({len(np.unique(groups))}) 少于折数 ({self.cv})，请减小分块大小")
+        return list(self.cv_splitter(groups).split(X, y, groups))
+
+    def planned_fits(self, strategy: str, **options) -> int:
+        """
+        预计的交叉验证拟合次数（用于进度条）
+        random / bayes 为上限，可能因时间预算提前结束
+        """
+        if strategy == "grid":
+            return self.grid_fits
+        if strategy == "halving":
+            factor = options.get("factor", 3)
+            n_candidates = len(list(ParameterGrid(
+                {k: v for k, v in self.param_grid.items() if k != "n_estimators"})))
+            n_min, n_max = min(self.param_grid["n_estimators"]), max(self.param_grid["n_estimators"])
+            rounds = int(math.floor(math.log(n_max / n_min, factor) + 1e-9)) if n_max > n_min else 0
+            # 与 HalvingGridSearchCV 的轮数计算一致
+            n_required = 1 + int(math.floor(math.log(n_candidates, factor)))
+            n_possible = 1 + int(math.floor(math.log(n_max // (n_max // factor ** rounds), factor)))
+            total = 0
+            for _ in range(min(n_required, n_possible)):
+                total += n_candidates
+                n_candidates = int(math.ceil(n_candidates / factor))
+            return total * self.cv
+        if strategy == "random":
+            return min(options.get("n_iter") or len(self.candidates), len(self.candidates)) * self.cv
+        return min(options.get("n_trials", 30), len(self.candidates)) * self.cv
+
+    def search(self, strategy: str, X, y, progress: Optional[Callable[[int], None]] = None,
+               cancel: Optional[threading.Event] = None, groups=None, **options) -> SearchResult:
+        """
+        按策略执行搜索，options 传给对应策略（见各 _search_* 方法）
+        - progress(n)：每完成 n 次交叉验证拟合时回调（可能来自工作线程）
+        - cancel：设置后在下一次评分时抛出 SearchCancelled
+        - groups：样本分组（如 spatial_blocks 的空间块），给出时按分组 K 折验证
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"未知搜索策略 {strategy!r}")
+        if strategy == "bayes" and optuna is None:
+            raise ImportError("贝叶斯优化需要安装 optuna：pip install optuna")
+        self.progress = progress
+        self.scorer = _ProgressScorer(self.scoring, progress, cancel) \
+            if progress is not None or cancel is not None else self.scoring
+        self.splits = self.make_splits(X, y, groups)
+        self.cache = None
+        if self.cache_dir is not None and strategy != "halving":
+            self.cache = SearchCache.for_search(self.cache_dir, X, y, self.make_estimator(),
+                                                self.param_grid, self.cv_description(groups), self.scoring)
+        self.plan = self.plan_execution(strategy, len(X), options.get("engine", "warm_start"))
+        start = time.perf_counter()
+        try:
+            with threadpool_limits(limits=self.plan.blas_threads), \
+                    joblib.parallel_config(backend=self.plan.backend):
+                result = getattr(self, f"_search_{strategy}")(X, y, **options)
+        finally:
+            self.plan = None
+        result.elapsed = time.perf_counter() - start
+        # 搜索结束后的预测只有单个森林，建树（预测）线程恢复为全部核心
+        if result.best_estimator is not None:
+            result.best_estimator.set_params(n_jobs=self.n_jobs)
+        return result
+
+    def compare_with_grid(self, result: SearchResult,
+                          grid_result: Optional[SearchResult] = None) -> Dict[str, Any]:
+        """
+        与穷举网格对比：节省的拟合次数、决策树数量与耗时
+        未提供实际的网格结果时，按单棵树平均耗时估算网格耗时
+        """
+        comparison = {
+            "fits": result.n_fits,
+            "grid_fits": self.grid_fits,
+            "fits_saved": self.grid_fits - result.n_fits,
+            "trees": result.n_trees,
+            "grid_trees": self.grid_trees,
+            "elapsed": result.elapsed,
+        }
+        if grid_result is not None:
+            comparison["grid_elapsed"] = grid_result.elapsed
+            comparison["grid_elapsed_estimated"] = False
+            comparison["same_best_params"] = result.best_params == grid_result.best_params
+        else:
+            # 结果全部来自缓存时无法估算
+            per_tree = result.elapsed / result.n_trees if result.n_trees else None
+            comparison["grid_elapsed"] = per_tree * self.grid_trees if per_tree else None
+            comparison["grid_elapsed_estimated"] = True
+            comparison["same_best_params"] = None
+        comparison["speedup"] = comparison["grid_elapsed"] / result.elapsed \
+            if result.elapsed and comparison["grid_elapsed"] else None
+        return comparison
+
+    def _finish(self, strategy: str, rows: List[Dict[str, Any]], X, y) -> SearchResult:
+        """按交叉验证结果选出最佳参数（同分取先评估者）并在全部训练数据上重训"""
+        cv_results = pd.DataFrame(rows)
+        best = rows[int(np.argmax([row["mean_test_score"] for row in rows]))]
+        best_params = dict(best["params"])
+        best_estimator = self.cache.load_estimator(best_params) if self.cache else None
+        if best_estimator is None:
+            best_estimator = self.make_estimator(**best_params).fit(X, y)
+            if self.cache is not None:
+                self.cache.save_estimator(best_params, best_estimator)
+        computed = [row for row in rows if not row.get("cached")]
+        return SearchResult(
+            strategy=strategy,
+            best_params=best_params,
+            best_score=float(best["mean_test_score"]),
+            best_estimator=best_estimator,
+            n_fits=len(rows) * self.cv,
+            n_trees=int(sum(row["n_estimators_used"] for row in computed)) * self.cv,
+            elapsed=0.0,
+            cv_results=cv_results,
+            n_cached_fits=(len(rows) - len(computed)) * self.cv,
+        )
+
+    def _evaluate(self, params: Dict[str, Any], X, y) -> Dict[str, Any]:
+        """单组参数的交叉验证（各折均已缓存时直接使用缓存）"""
+        cached = self.cache.get_scores(params) if self.cache else {}
+        if all(fold in cached for fold in range(self.cv)):
+            scores = np.array([cached[fold] for fold in range(self.cv)])
+            if self.progress is not None:
+                self.progress(self.cv)
+        else:
+            scores = cross_val_score(self.make_estimator(**params), X, y, cv=self.splits,
+                                     scoring=self.scorer, error_score="raise", n_jobs=self.plan.cv_jobs)
+            if self.cache is not None:
+                self.cache.put_scores(params, dict(enumerate(map(float, scores))))
+        return {
+            "params": params,
+            "mean_test_score": float(scores.mean()),
+            "std_test_score": float(scores.std()),
+            "n_estimators_used": params["n_estimators"],
+            "cached": len(cached) == self.cv,
+        }
+
+    def _search_grid(self, X, y, engine: str = "warm_start") -> SearchResult:
+        """穷举网格；engine="sklearn" 时使用 GridSearchCV（每组参数单独训练，用于对照）"""
+        if engine == "warm_start":
+            search = WarmStartGridSearch(self.make_estimator(), self.param_grid, cv=self.cv,
+                                         scoring=self.scorer, cache=self.cache, progress=self.progress,
+                                         n_jobs=self.plan.cv_jobs, splits=self.splits)
+        else:
+            search = GridSearchCV(self.make_estimator(), self.param_grid, cv=self.splits,
+                                  scoring=self.scorer, error_score="raise", n_jobs=self.plan.cv_jobs)
+        search.fit(X, y)
+        n_trees = getattr(search, "n_trees_built_", self.naive_grid_trees)
+        res = search.cv_results_
+        rows = [
+            {"params": params, "mean_test_score": float(mean), "std_test_score": float(std),
+             "n_estimators_used": params["n_estimators"]}
+            for params, mean, std in zip(res["params"], res["mean_test_score"], res["std_test_score"])
+        ]
+        return SearchResult(
+            strategy="grid",
+            best_params=search.best_params_,
+            best_score=float(search.best_score_),
+            best_estimator=search.best_estimator_,
+            n_fits=len(rows) * self.cv,
+            n_trees=n_trees,
+            elapsed=0.0,
+            cv_results=pd.DataFrame(rows),
+            n_cached_fits=getattr(search, "n_cached_fits_", 0),
+        )
+
+    def _search_halving(self, X, y, factor: int = 3) -> SearchResult:
+        """
+        逐次减半：n_estimators 不再作为网格维度，而是作为资源
+        每轮树数为上一轮的 factor 倍，首轮不少于网格中最小的 n_estimators，
+        最后一轮接近最大的 n_estimators（向下取整），最佳组合按最大树数重训
+        """
+        grid = {k: v for k, v in self.param_grid.items() if k != "n_estimators"}
+        n_min = min(self.param_grid["n_estimators"])
+        n_max = max(self.param_grid["n_estimators"])
+        rounds = int(math.floor(math.log(n_max / n_min, factor) + 1e-9)) if n_max > n_min else 0
+        min_resources = n_max // factor ** rounds
+
+        search = HalvingGridSearchCV(
+            self.make_estimator(), grid, resource="n_estimators", factor=factor,
+            min_resources=min_resources, max_resources=n_max, cv=self.splits,
+            scoring=self.scorer, random_state=self.random_state, refit=False, error_score="raise",
+            return_train_score=False, n_jobs=self.plan.cv_jobs,
+        )
+        search.fit(X, y)
+        res = search.cv_results_
+        rows = [
+            {"params": {**params, "n_estimators": int(n)}, "mean_test_score": float(mean),
+             "std_test_score": float(std), "n_estimators_used": int(n), "iter": int(it)}
+            for params, mean, std, n, it in zip(
+                res["params"], res["mean_test_score"], res["std_test_score"],
+                res["n_resources"], res["iter"]
+            )
+        ]
+        # 只在最后一轮（树数最多）的候选中选择最佳参数
+        last_iter = max(row["iter"] for row in rows)
+        final_rows = [
+            {**row, "params": {**row["params"], "n_estimators": n_max}}
+            for row in rows if row["iter"] == last_iter
+        ]
+        result = self._finish("halving", final_rows, X, y)
+        result.cv_results = pd.DataFrame(rows)
+        result.n_fits = len(rows) * self.cv
+        result.n_trees = sum(row["n_estimators_used"] for row in rows) * self.cv
+        return result
+
+    def _search_random(self, X, y, time_budget: float = 60.0,
+                       n_iter: Optional[int] = None) -> SearchResult:
+        """在网格内无放回随机抽样，预计下一组会超出时间预算时停止（至少评估一组）"""
+        n_candidates = len(self.candidates)
+        n_iter = min(n_iter or n_candidates, n_candidates)
+        sampler = ParameterSampler(self.param_grid, n_iter=n_iter, random_state=self.random_state)
+
+        start = time.perf_counter()
+        rows = []
+        for params in sampler:
+            elapsed = time.perf_counter() - start
+            if rows and elapsed + elapsed / len(rows) > time_budget:
+                break
+            rows.append(self._evaluate(params, X, y))
+        return self._finish("random", rows, X, y)
+
+    def _search_bayes(self, X, y, n_trials: int = 30, timeout: Optional[float] = None) -> SearchResult:
+        """TPE 采样网格内的离散取值；重复采到已评估的组合时直接复用得分，不计拟合次数"""
+        evaluated: Dict[tuple, Dict[str, Any]] = {}
+        keys = list(self.param_grid)
+
+        def objective(trial):
+            params = {key: trial.suggest_categorical(key, self.param_grid[key]) for key in keys}
+            signature = tuple(params[key] for key in keys)
+            if signature not in evaluated:
+                evaluated[signature] = self._evaluate(params, X, y)
+            return evaluated[signature]["mean_test_score"]
+
+        optuna.logging.set_verbosity(optuna.logging.WARNING)
+        study = optuna.create_study(direction="maximize",
+                                    sampler=optuna.samplers.TPESampler(seed=self.random_state))
+        study.optimize(objective, n_trials=n_trials, timeout=timeout)
+        if not evaluated:
+            # 与随机搜索相同，时间预算在首个试验前耗尽时仍至少评估一组
+            study.optimize(objective, n_trials=1)
+        return self._finish("bayes", list(evaluated.values()), X, y)
+
+
+@dataclass
+class TrainingJob:
+    """后台训练任务：进度由工作线程更新，界面线程只读取"""
+    job_id: str
+    key: Any
+    total: int
+    status: str = "pending"  # pending / running / done / failed / cancelled
+    done: int = 0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def advance(self, n: int = 1) -> None:
+        """完成 n 次拟合（作为搜索的 progress 回调）"""
+        with self._lock:
+            self.done += n
+            # random / bayes 的计划次数为估计值，按实际完成数放宽
+            self.total = max(self.total, self.done)
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("pending", "running")
+
+    @property
+    def fraction(self) -> float:
+        with self._lock:
+            return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def eta(self) -> Optional[float]:
+        """按已完成拟合的平均耗时估算剩余秒数（尚无完成的拟合时为 None）"""
+        with self._lock:
+            done, total = self.done, self.total
+        if not done or not self.active:
+            return None
+        return self.elapsed / done * max(total - done, 0)
+
+
+class JobRegistry:
+    """
+    在后台线程中运行训练任务（进程内共享，界面重新运行后仍可按 job_id 取回）
+    只保留最近 max_jobs 个任务，已结束的任务优先淘汰
+    """
+
+    def __init__(self, max_jobs: int = 32):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key: Any, total: int, fn: Callable[..., Any], *args, **kwargs) -> TrainingJob:
+        """
+        启动任务：fn(*args, progress=job.advance, cancel=job.cancel_event, **kwargs)
+        fn 的返回值保存在 job.result
+        """
+        job = TrainingJob(job_id=uuid.uuid4().hex, key=key, total=total)
+
+        def run():
+            job.status, job.started = "running", time.perf_counter()
+            try:
+                job.result = fn(*args, progress=job.advance, cancel=job.cancel_event, **kwargs)
+                job.status = "done"
+            except SearchCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = "failed"
+            finally:
+                job.finished = time.perf_counter()
+
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._prune()
+        threading.Thread(target=run, name=f"rf-job-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[TrainingJob]:
+        with self._lock:
+            return self.jobs.get(job_id) if job_id else None
+
+    def _prune(self) -> None:
+        for job_id in [jid for jid, job in self.jobs.items() if not job.active]:
+            if len(self.jobs) <= self.max_jobs:
+                return
+            del self.jobs[job_id]
@@ -0,0 +1,602 @@
+"""
+随机森林调参核心类库单元测试
+用于验证搜索结果、缓存与推理是否正常工作（合成数据，无需 Data 目录）
+"""
+
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(__file__))
+
+
+def make_dataset(n_samples=600, n_features=6, n_classes=3, random_state=0):
+    """合成的多类别样本（DataFrame，列名与波段命名方式一致）"""
+    import pandas as pd
+    from sklearn.datasets import make_classification
+
+    X, y = make_classification(
+        n_samples=n_samples, n_features=n_features, n_informative=4, n_redundant=1,
+        n_classes=n_classes, random_state=random_state
+    )
+    return pd.DataFrame(X, columns=[f"B{i + 1}" for i in range(n_features)]), y
+
+
+def test_warm_start_grid():
+    """测试复用森林的网格搜索与 GridSearchCV 一致"""
+    print("🔍 测试复用森林的网格搜索...")
+    try:
+        import numpy as np
+        from rf_core import ForestTuner
+
+        X, y = make_dataset()
+        grid = {"n_estimators": [5, 20, 40], "max_depth": [3, None], "min_samples_leaf": [1, 5]}
+        tuner = ForestTuner(grid, cv=3, n_jobs=1)
+
+        warm = tuner.search("grid", X, y)
+        sklearn = tuner.search("grid", X, y, engine="sklearn")
+
+        assert warm.best_params == sklearn.best_params, (warm.best_params, sklearn.best_params)
+        assert np.isclose(warm.best_score, sklearn.best_score)
+        assert list(warm.cv_results["params"]) == list(sklearn.cv_results["params"])
+        assert np.allclose(warm.cv_results["mean_test_score"], sklearn.cv_results["mean_test_score"])
+        assert np.allclose(warm.cv_results["std_test_score"], sklearn.cv_results["std_test_score"])
+
+        # 每组其余参数、每折只增长一个森林到最大的 n_estimators
+        assert warm.n_trees == 4 * 40 * 3 == tuner.grid_trees
+        assert sklearn.n_trees == tuner.naive_grid_trees == 4 * 65 * 3
+        assert warm.best_estimator.predict(X[:5]).tolist() == sklearn.best_estimator.predict(X[:5]).tolist()
+
+        print(f"✅ 复用森林的网格搜索与 GridSearchCV 一致 (最佳参数 {warm.best_params})")
+        return True
+    except Exception as e:
+        print(f"❌ 复用森林的网格搜索失败: {e}")
+        return False
+
+
+def test_search_cache():
+    """测试搜索缓存：扩大网格时复用已计算的（参数, 折）"""
+    print("\n🔍 测试搜索缓存...")
+    try:
+        import tempfile
+        import numpy as np
+        from rf_core import ForestTuner, JobRegistry
+
+        X, y = make_dataset(random_state=1)
+        grid = {"n_estimators": [5, 20], "max_depth": [3, None]}
+        wider = {"n_estimators": [5, 20, 40], "max_depth": [3, 6, None]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first = ForestTuner(grid, cv=3, n_jobs=1, cache_dir=tmp).search("grid", X, y)
+            assert first.n_cached_fits == 0
+
+            # 在后台任务中运行扩大后的网格：共有的 4 组参数 × 3 折全部取自缓存
+            registry = JobRegistry()
+            tuner = ForestTuner(wider, cv=3, n_jobs=1, cache_dir=tmp)
+            job = registry.submit("wider", tuner.planned_fits("grid"), tuner.search, "grid", X, y)
+            while job.active:
+                job.cancel_event.wait(0.05)
+            assert job.status == "done", job.error
+            assert registry.get(job.job_id) is job and job.fraction == 1.0
+            second = job.result
+            assert second.n_cached_fits == 4 * 3
+            # 已有 max_depth 的森林从缓存的 20 棵树状态续训到 40 棵，新的 max_depth 从头增长
+            assert second.n_trees == 2 * (40 - 20) * 3 + 40 * 3
+
+            # 结果与不使用缓存的 GridSearchCV 相同，共有组合的得分与第一次搜索相同
+            reference = ForestTuner(wider, cv=3, n_jobs=1).search("grid", X, y, engine="sklearn")
+            assert second.best_params == reference.best_params
+            assert np.allclose(second.cv_results["mean_test_score"], reference.cv_results["mean_test_score"])
+            shared = {str(p): m for p, m in zip(first.cv_results["params"], first.cv_results["mean_test_score"])}
+            for params, mean in zip(second.cv_results["params"], second.cv_results["mean_test_score"]):
+                if str(params) in shared:
+                    assert np.isclose(mean, shared[str(params)]), params
+
+            # 再次运行同一网格：全部命中缓存，不再建树
+            third = ForestTuner(wider, cv=3, n_jobs=1, cache_dir=tmp).search("grid", X, y)
+            assert third.n_cached_fits == 9 * 3 and third.n_trees == 0
+            assert third.best_params == reference.best_params
+
+        print(f"✅ 搜索缓存正常 (复用 {second.n_cached_fits} 次拟合)")
+        return True
+    except Exception as e:
+        print(f"❌ 搜索缓存失败: {e}")
+        return False
+
+
+def test_flat_forest():
+    """测试展平森林与 sklearn 的预测完全一致（含恰好落在分裂阈值附近的样本）"""
+    print("\n🔍 测试展平森林...")
+    try:
+        import tempfile
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        from inference_core import FlatForest
+
+        X, y = make_dataset(n_samples=2000, random_state=2)
+        forest = RandomForestClassifier(n_estimators=25, random_state=0).fit(X.to_numpy(), y)
+        flat = FlatForest.from_estimator(forest, list(X.columns))
+
+        # 随机取内部节点，把某个样本的分裂特征设为阈值本身及其上下相邻的 float32 / float64 值
+        rng = np.random.default_rng(0)
+        internal = [(tree.tree_.feature[i], tree.tree_.threshold[i])
+                    for tree in forest.estimators_ for i in np.flatnonzero(tree.tree_.children_left >= 0)]
+        picks = rng.integers(len(internal), size=20_000)
+        samples = X.to_numpy()[rng.integers(len(X), size=len(picks))]
+        for row, pick in enumerate(picks):
+            feature, threshold = internal[pick]
+            t32 = np.float32(threshold)
+            samples[row, feature] = rng.choice([
+                threshold, np.nextafter(threshold, np.inf), np.nextafter(threshold, -np.inf),
+                t32, np.nextafter(t32, np.float32(np.inf)), np.nextafter(t32, np.float32(-np.inf)),
+            ])
+        samples = np.vstack([samples, X.to_numpy()])
+
+        expected = forest.predict_proba(samples)
+        actual = flat.predict_proba(samples)
+        mismatches = int((flat.predict(samples) != forest.predict(samples)).sum())
+        assert mismatches == 0, f"{mismatches} 个样本的类别不一致"
+        assert np.allclose(actual, expected, atol=1e-5)
+
+        # npz 往返后结果不变
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "forest.npz")
+            flat.save(path)
+            loaded = FlatForest.load(path)
+        assert loaded.feature_names == list(X.columns)
+        assert np.array_equal(loaded.predict_proba(samples), actual)
+
+        print(f"✅ 展平森林与 sklearn 一致 ({len(samples)} 个样本, {flat.n_nodes} 个节点)")
+        return True
+    except Exception as e:
+        print(f"❌ 展平森林失败: {e}")
+        return False
+
+
+def test_search_strategies():
+    """测试逐次减半、随机与贝叶斯搜索：最佳参数与得分、计划拟合次数与时间预算"""
+    print("\n🔍 测试搜索策略...")
+    try:
+        import numpy as np
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+        from rf_core import ForestTuner
+
+        X, y = make_dataset(n_samples=300, random_state=7)
+        grid = {"n_estimators": [9, 27], "max_depth": [3, None], "min_samples_leaf": [1, 5]}
+        tuner = ForestTuner(grid, cv=3, n_jobs=1)
+        reference = tuner.search("grid", X, y, engine="sklearn")
+        scores = {frozenset(p.items()): m for p, m in
+                  zip(reference.cv_results["params"], reference.cv_results["mean_test_score"])}
+
+        def run(strategy, **options):
+            done = []
+            result = tuner.search(strategy, X, y, progress=done.append, **options)
+            # 每次交叉验证拟合回调一次进度，最佳得分为所评估候选中的最高分
+            assert sum(done) == result.n_fits, (strategy, sum(done), result.n_fits)
+            assert result.strategy == strategy and result.best_estimator is not None
+            assert np.isclose(result.best_score, result.cv_results["mean_test_score"].max())
+            assert result.best_estimator.get_params()["n_estimators"] == result.best_params["n_estimators"]
+            return result
+
+        # 逐次减半：n_estimators 作为资源 9 → 27，与 HalvingGridSearchCV 的选择一致，最佳组合按 27 棵树重训
+        halving = run("halving", factor=3)
+        assert halving.n_fits == tuner.planned_fits("halving", factor=3) == (4 + 2) * 3
+        assert sorted(set(halving.cv_results["n_estimators_used"])) == [9, 27]
+        assert halving.n_trees == (4 * 9 + 2 * 27) * 3
+        sklearn = HalvingGridSearchCV(
+            RandomForestClassifier(random_state=tuner.random_state),
+            {k: v for k, v in grid.items() if k != "n_estimators"}, resource="n_estimators", factor=3,
+            min_resources=9, max_resources=27, cv=StratifiedKFold(3), random_state=tuner.random_state,
+            refit=False).fit(X, y)
+        assert halving.best_params == {**sklearn.best_params_, "n_estimators": 27}
+        assert np.isclose(halving.best_score, sklearn.best_score_)
+
+        # 随机搜索：预算充足时评估全部组合，与网格得分相同；n_iter 限制组合数
+        full = run("random", time_budget=1e9)
+        assert full.n_fits == tuner.planned_fits("random") == tuner.grid_fits
+        assert full.best_params == reference.best_params and np.isclose(full.best_score, reference.best_score)
+        limited = run("random", time_budget=1e9, n_iter=3)
+        assert limited.n_fits == tuner.planned_fits("random", n_iter=3) == 3 * 3
+        for params, mean in zip(limited.cv_results["params"], limited.cv_results["mean_test_score"]):
+            assert np.isclose(mean, scores[frozenset(params.items())]), params
+        # 时间预算耗尽时至少评估一组
+        assert run("random", time_budget=0).n_fits == 3
+
+        # 贝叶斯优化：重复采样的组合不重复拟合，拟合次数不超过计划
+        bayes = run("bayes", n_trials=12)
+        assert 3 <= bayes.n_fits <= tuner.planned_fits("bayes", n_trials=12) == tuner.grid_fits
+        assert len(bayes.cv_results) == bayes.n_fits // 3
+        for params, mean in zip(bayes.cv_results["params"], bayes.cv_results["mean_test_score"]):
+            assert np.isclose(mean, scores[frozenset(params.items())]), params
+        assert tuner.planned_fits("bayes", n_trials=2) == 2 * 3
+        assert run("bayes", n_trials=50, timeout=1e-6).n_fits == 3
+
+        print(f"✅ 搜索策略正常 (halving {halving.n_fits} / random {full.n_fits} / bayes {bayes.n_fits} 次拟合)")
+        return True
+    except Exception as e:
+        print(f"❌ 搜索策略失败: {e}")
+        return False
+
+
+def test_search_cancel():
+    """测试取消：各策略在下一次评分时中止，不再继续拟合"""
+    print("\n🔍 测试搜索取消...")
+    try:
+        import threading
+        from rf_core import ForestTuner, SearchCancelled
+
+        X, y = make_dataset(n_samples=300, random_state=8)
+        grid = {"n_estimators": [9, 27], "max_depth": [3, None], "min_samples_leaf": [1, 5]}
+        tuner = ForestTuner(grid, cv=3, n_jobs=1)
+        for strategy, options in (("grid", {}), ("halving", {}), ("random", {"time_budget": 1e9}),
+                                  ("bayes", {"n_trials": 12})):
+            # 完成两次拟合后取消
+            cancel, done = threading.Event(), []
+
+            def progress(n):
+                done.append(n)
+                if sum(done) >= 2:
+                    cancel.set()
+
+            try:
+                tuner.search(strategy, X, y, progress=progress, cancel=cancel, **options)
+                raise AssertionError(f"{strategy} 未被取消")
+            except SearchCancelled:
+                pass
+            assert sum(done) == 2, (strategy, sum(done))
+            assert tuner.plan is None
+
+        print("✅ 搜索取消正常 (grid / halving / random / bayes)")
+        return True
+    except Exception as e:
+        print(f"❌ 搜索取消失败: {e}")
+        return False
+
+
+def test_execution_plan():
+    """测试两级并行划分：1 / 2 / 多核时交叉验证任务与建树线程的分配，两者之积不超过核心数"""
+    print("\n🔍 测试并行划分...")
+    try:
+        import joblib
+        from rf_core import ExecutionPlan, ForestTuner
+
+        def plan(n_tasks, n_estimators, n_samples, n_cores):
+            p = ExecutionPlan.plan(n_tasks, n_estimators, n_samples, n_cores=n_cores)
+            return p.cv_jobs, p.tree_jobs
+
+        # 单核：不论任务多少都是 1 × 1
+        for n_tasks in (1, 5, 100):
+            assert plan(n_tasks, 500, 1_000_000, 1) == (1, 1)
+        # 两核：任务足够时外层优先；只有一个任务时，样本多才把第二个核心给建树
+        assert plan(10, 100, 100_000, 2) == (2, 1)
+        assert plan(1, 100, 100_000, 2) == (1, 2)
+        assert plan(1, 100, 500, 2) == (1, 1)
+        # 多核：任务数不少于核心数时每个任务单线程，否则剩余核心分给建树
+        assert plan(60, 300, 100_000, 32) == (32, 1)
+        assert plan(5, 300, 100_000, 32) == (5, 6)
+        # 每个建树线程至少 MIN_TREE_WORK_PER_THREAD / 样本数 棵树：1000 个样本时每线程 50 棵
+        assert plan(3, 200, 1_000, 32) == (3, 4)
+        assert plan(3, 20, 1_000, 32) == (3, 1)
+        assert plan(0, 100, 0, 8) == (1, 1)
+
+        for n_cores in (1, 2, 3, 4, 7, 8, 16, 64):
+            for n_tasks in (1, 2, 3, 5, 8, 15, 40, 100):
+                for n_estimators, n_samples in ((10, 100), (100, 1_000), (500, 50_000), (1_000, 1_000_000)):
+                    p = ExecutionPlan.plan(n_tasks, n_estimators, n_samples, n_cores=n_cores)
+                    assert 1 <= p.cv_jobs <= min(n_tasks, n_cores) and p.tree_jobs >= 1
+                    assert p.threads == p.cv_jobs * p.tree_jobs <= n_cores, (n_cores, n_tasks, p)
+        assert ExecutionPlan.plan(1, 100, 100_000).n_cores == joblib.cpu_count()
+
+        # 搜索按策略给出任务数：warm_start 网格与 halving 按（其余参数组合, 折），random / bayes 只有各折
+        tuner = ForestTuner({"n_estimators": [50, 400], "max_depth": [3, 6, None]}, cv=5, n_jobs=8)
+        for strategy, engine, n_tasks in (("grid", "warm_start", 15), ("grid", "sklearn", 30),
+                                          ("halving", "warm_start", 15), ("random", "warm_start", 5)):
+            p = tuner.plan_execution(strategy, 200_000, engine)
+            assert (p.cv_jobs, p.tree_jobs) == plan(n_tasks, 400, 160_000, 8), (strategy, engine, p)
+        assert tuner.plan_execution("random", 200_000).threads == 5
+        fixed = ExecutionPlan(n_cores=4, cv_jobs=2, tree_jobs=2)
+        assert ForestTuner({"n_estimators": [5]}, execution=fixed).plan_execution("grid", 100) is fixed
+
+        print("✅ 并行划分正常")
+        return True
+    except Exception as e:
+        print(f"❌ 并行划分失败: {e}")
+        return False
+
+
+def test_permutation_importance():
+    """测试置换重要性：固定种子时结果可复现（与并行方式无关），同一模型哈希命中磁盘缓存"""
+    print("\n🔍 测试置换重要性...")
+    try:
+        import copy
+        import tempfile
+        import joblib
+        import numpy as np
+        from sklearn.ensemble import RandomForestClassifier
+        from importance_core import PermutationImportance
+
+        X, y = make_dataset(n_samples=800, random_state=9)
+        X_train, X_test, y_train, y_test = X[:500], X[500:], y[:500], y[500:]
+        model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X_train, y_train)
+
+        serial = PermutationImportance(n_repeats=5, random_state=1, n_jobs=1).compute(model, X_test, y_test)
+        threaded = PermutationImportance(n_repeats=5, random_state=1, n_jobs=4).compute(
+            model, X_test, y_test, baseline_pred=model.predict(X_test))
+        assert serial.importances.shape == (X.shape[1], 5) and not serial.cached
+        assert np.array_equal(serial.importances, threaded.importances)
+        assert serial.baseline_score == threaded.baseline_score == np.mean(model.predict(X_test) == y_test)
+        assert serial.feature_names == list(X.columns)
+        other = PermutationImportance(n_repeats=5, random_state=2, n_jobs=1).compute(model, X_test, y_test)
+        assert not np.array_equal(serial.importances, other.importances)
+        frame = serial.to_frame()
+        assert frame["importance"].is_monotonic_decreasing and set(frame["feature"]) == set(X.columns)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            importance = PermutationImportance(n_repeats=5, random_state=1, n_jobs=1, cache_dir=tmp)
+            first = importance.compute(model, X_test, y_test)
+            assert not first.cached and np.array_equal(first.importances, serial.importances)
+
+            # 同一训练结果的另一个对象（如从磁盘加载、n_jobs 不同）哈希相同，直接读取缓存
+            clone = copy.deepcopy(model).set_params(n_jobs=3)
+            assert PermutationImportance.model_hash(clone) == PermutationImportance.model_hash(model)
+            joblib.dump(model, os.path.join(tmp, "model.joblib"))
+            loaded = joblib.load(os.path.join(tmp, "model.joblib"))
+            assert PermutationImportance.model_hash(loaded) == PermutationImportance.model_hash(model)
+            again = PermutationImportance(n_repeats=5, random_state=1, n_jobs=2, cache_dir=tmp).compute(
+                clone, X_test, y_test)
+            assert again.cached and np.array_equal(again.importances, first.importances)
+            assert again.elapsed == first.elapsed
+
+            # 不同的模型、重复次数或测试集不命中
+            retrained = RandomForestClassifier(n_estimators=20, random_state=1).fit(X_train, y_train)
+            assert PermutationImportance.model_hash(retrained) != PermutationImportance.model_hash(model)
+            assert not importance.compute(retrained, X_test, y_test).cached
+            assert not PermutationImportance(n_repeats=3, random_state=1, cache_dir=tmp).compute(
+                model, X_test, y_test).cached
+            assert not importance.compute(model, X_test[:200], y_test[:200]).cached
+            assert len(os.listdir(os.path.join(tmp, "importance"))) == 4
+
+        print(f"✅ 置换重要性正常 (最重要的波段 {frame['feature'][0]})")
+        return True
+    except Exception as e:
+        print(f"❌ 置换重要性失败: {e}")
+        return False
+
+
+def test_sample_reader():
+    """测试样本读取：只读所选列，波段为 float32、标签为类别编号，三种格式结果相同"""
+    print("\n🔍 测试样本读取...")
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        import data_core
+        from data_core import SampleReader
+
+        X, y = make_dataset(n_samples=200, random_state=3)
+        labels = np.array(["water", "forest", "urban"])[y]
+        frame = X.assign(**{
+            "system:index": [f"0000{i:04d}_0" for i in range(len(X))],
+            "label": labels,
+            # 未选择的列：无法按数值解析，若被读取会报错或占内存
+            "note": ["not a number"] * len(X),
+            ".geo": [f'{{"type":"Point","coordinates":[{116 + i / 1000},{39 + i / 1000}]}}' for i in range(len(X))],
+        })
+        frame.loc[5, "B2"] = np.nan
+        frame.loc[7, "label"] = None
+        frame.loc[9, ".geo"] = '{"type":"Point"}'
+        bands = ["B1", "B3", "B4"]
+        # B2 未被选择，第 5 行不因它的空值被删除
+        kept = frame.drop(index=[7]).reset_index(drop=True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {"csv": os.path.join(tmp, "samples.csv"), "parquet": os.path.join(tmp, "samples.parquet"),
+                     "feather": os.path.join(tmp, "samples.feather")}
+            frame.to_csv(paths["csv"], index=False)
+            frame.to_parquet(paths["parquet"], index=False)
+            frame.to_feather(paths["feather"])
+
+            tables = {}
+            for fmt, path in paths.items():
+                reader = SampleReader(path)
+                assert reader.format == fmt and "note" in reader.columns
+                assert reader._read_columns(bands, "label").columns.tolist() == [*bands, "label"]
+                table = reader.read(bands, "label")
+                assert list(table.X.columns) == bands, table.X.columns
+                assert all(dtype == np.float32 for dtype in table.X.dtypes)
+                assert table.y.dtype == np.uint8 and table.y.name == "label"
+                assert table.n_rows == len(frame) and table.n_dropped == 1 and table.coords is None
+                assert table.class_names == ["forest", "urban", "water"]
+                assert table.classes[table.y].tolist() == kept["label"].tolist()
+                assert np.array_equal(table.X.to_numpy(), kept[bands].to_numpy(np.float32))
+                # 字节内容（上传的文件）与路径读取结果相同
+                with open(path, "rb") as f:
+                    uploaded = SampleReader(f.read(), name=os.path.basename(path)).read(bands, "label")
+                assert uploaded.file_hash == table.file_hash
+                assert uploaded.X.equals(table.X) and uploaded.y.equals(table.y)
+                tables[fmt] = reader.read(bands, "label", coords=True)
+
+            # 没有 pyarrow 时 CSV 由 pandas 读取，结果相同
+            arrow, data_core.pa = data_core.pa, None
+            try:
+                tables["pandas"] = SampleReader(paths["csv"]).read(bands, "label", coords=True)
+            finally:
+                data_core.pa = arrow
+
+        reference = tables.pop("csv")
+        # 坐标无法解析的第 9 行一并删除
+        assert len(reference) == len(frame) - 2 and reference.coords.dtype == np.float64
+        rows = frame.index.drop([7, 9]).to_numpy()
+        assert np.allclose(reference.coords, np.column_stack([116 + rows / 1000, 39 + rows / 1000]))
+        for fmt, table in tables.items():
+            assert table.X.equals(reference.X), fmt
+            assert table.y.equals(reference.y) and np.array_equal(table.classes, reference.classes), fmt
+            assert np.array_equal(table.coords, reference.coords), fmt
+
+        print(f"✅ 样本读取正常 (CSV / Parquet / Feather 各 {len(reference)} 行)")
+        return True
+    except Exception as e:
+        print(f"❌ 样本读取失败: {e}")
+        return False
+
+
+def test_parse_points():
+    """测试 .geo 点坐标解析：GEE 导出的写法与无法解析的行"""
+    print("\n🔍 测试点坐标解析...")
+    try:
+        import numpy as np
+        import data_core
+        from data_core import parse_points
+
+        geo = [
+            '{"type":"Point","coordinates":[116.391,39.907]}',
+            '{"geodesic":false,"type":"Point","coordinates":[-70.5,-33.25]}',
+            '{ "type": "Point", "coordinates": [ 1.5e2 , -4E-1 ] }',
+            '{"type":"Point","coordinates":[+12,7]}',
+            '{"type":"Point"}',
+            "not geojson",
+            "",
+            None,
+        ]
+        expected = np.array([[116.391, 39.907], [-70.5, -33.25], [150.0, -0.4], [12.0, 7.0]]
+                            + [[np.nan, np.nan]] * 4)
+
+        results = [parse_points(geo)]
+        arrow, data_core.pa = data_core.pa, None
+        try:
+            results.append(parse_points(geo))
+        finally:
+            data_core.pa = arrow
+        for points in results:
+            assert points.shape == (len(geo), 2) and points.dtype == np.float64
+            assert np.allclose(points, expected, equal_nan=True), points
+
+        print("✅ 点坐标解析正常 (pyarrow / pandas)")
+        return True
+    except Exception as e:
+        print(f"❌ 点坐标解析失败: {e}")
+        return False
+
+
+def test_spatial_blocks():
+    """测试空间分块与分组交叉验证：块的大小正确，同一块不同时出现在训练折与验证折"""
+    print("\n🔍 测试空间分块交叉验证...")
+    try:
+        import numpy as np
+        from rf_core import KM_PER_DEGREE, ForestTuner, spatial_blocks
+
+        # 赤道附近 10 × 10 个 0.01° 的格子，每格 4 个点
+        rng = np.random.default_rng(5)
+        cells = np.array([(i, j) for i in range(10) for j in range(10) for _ in range(4)], dtype=np.float64)
+        offsets = rng.uniform(0.05, 0.95, cells.shape)
+        # 只有原点恰在格子角上（作为分块的起点），其余点都在格子内部
+        offsets[0] = 0.0
+        coords = (cells + offsets) * 0.01 + np.array([30.0, -0.045])
+        groups = spatial_blocks(coords, block_km=0.01 * KM_PER_DEGREE)
+        assert groups.shape == (len(coords),) and groups.dtype.kind == "i"
+        assert sorted(np.unique(groups)) == list(range(100))
+        assert np.all(np.bincount(groups) == 4)
+        _, expected = np.unique(cells, axis=0, return_inverse=True)
+        assert np.array_equal(groups, expected.ravel())
+
+        # 纬度 60° 处经度方向的块宽为 0.02°：两列格子合为一块
+        high = coords + np.array([0.0, 60.0])
+        high_groups = spatial_blocks(high, block_km=0.01 * KM_PER_DEGREE)
+        assert len(np.unique(high_groups)) == 50 and np.all(np.bincount(high_groups) == 8)
+        merged = np.column_stack([cells[:, 0] // 2, cells[:, 1]])
+        _, expected = np.unique(merged, axis=0, return_inverse=True)
+        assert np.array_equal(high_groups, expected.ravel())
+        # 块边长加倍，块数减为四分之一
+        assert len(np.unique(spatial_blocks(coords, block_km=0.02 * KM_PER_DEGREE))) == 25
+
+        # 分组交叉验证：每个块只出现在一折的验证集中
+        X, y = make_dataset(n_samples=len(coords), random_state=6)
+        grid = {"n_estimators": [5, 15], "max_depth": [3, None]}
+        tuner = ForestTuner(grid, cv=4, n_jobs=1)
+        warm = tuner.search("grid", X, y, groups=groups)
+        seen = []
+        for train, test in tuner.splits:
+            assert not set(groups[train]) & set(groups[test])
+            seen.extend(np.unique(groups[test]))
+        assert sorted(seen) == list(range(100))
+        assert tuner.cv_description(groups) != tuner.cv_description()
+
+        # 与按相同分组划分的 GridSearchCV 一致
+        reference = tuner.search("grid", X, y, groups=groups, engine="sklearn")
+        assert warm.best_params == reference.best_params
+        assert np.allclose(warm.cv_results["mean_test_score"], reference.cv_results["mean_test_score"])
+
+        # 块数少于折数时给出明确的错误
+        try:
+            tuner.search("grid", X, y, groups=groups % 3)
+            raise AssertionError("块数少于折数时应报错")
+        except ValueError:
+            pass
+
+        print("✅ 空间分块交叉验证正常 (100 个块, 4 折)")
+        return True
+    except Exception as e:
+        print(f"❌ 空间分块交叉验证失败: {e}")
+        return False
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🚀 开始运行测试...")
+    print("=" * 60)
+
+    tests = [
+        test_warm_start_grid,
+        test_search_cache,
+        test_flat_forest,
+        test_search_strategies,
+        test_search_cancel,
+        test_execution_plan,
+        test_permutation_importance,
+        test_sample_reader,
+        test_parse_points,
+        test_spatial_blocks,
+    ]
+
+    results = []
+    for test in tests:
+        results.append(test())
+
+    print("\n" + "=" * 60)
+    print("📊 测试结果统计")
+    print("=" * 60)
+
+    passed = sum(results)
+    total = len(results)
+
+    print(f"通过: {passed}/{total}")
+    print(f"失败: {total - passed}/{total}")
+    print(f"成功率: {passed/total*100:.1f}%")
+
+    if passed == total:
+        print("\n🎉 所有测试通过！代码运行正常。")
+    else:
+        print("\n⚠️ 部分测试失败，请检查错误信息。")
+
+    return passed == total
+
+
+if __name__ == "__main__":
+    # 检查依赖
+    print("检查依赖包...")
+    try:
+        import sklearn
+        import pandas
+        import joblib
+        print("✅ 所有依赖包已安装\n")
+    except ImportError as e:
+        print(f"❌ 缺少依赖包: {e}")
+        print("请运行: pip install -r requirements.txt\n")
+        sys.exit(1)
+
+    # 运行测试
+    success = run_all_tests()
+    sys.exit(0 if success else 1)